@@ -0,0 +1,99 @@
+from __future__ import absolute_import  # local types.py and builtin types
+
+from multiprocessing.pool import ThreadPool
+import threading
+from types import GeneratorType
+
+from kaiso.persistence import Manager
+
+
+class AsyncManager(object):
+    """ Runs Manager calls on a pool of worker threads, so that callers
+    don't block on the graph database.
+
+    Each method mirrors the ``Manager`` method of the same name, but
+    returns a ``multiprocessing.pool.AsyncResult``. Its ``get`` method
+    waits for and returns the result (re-raising any exception), and
+    results that would be generators are returned as lists.
+
+    Each worker thread uses its own Manager, so the type registry cache
+    is shared between them but calls never share a Manager. After
+    changing types, call ``reload_types`` to make all workers pick up the
+    change.
+
+    Usage:
+        async_manager = AsyncManager(uri, workers=10)
+        result = async_manager.get(Thing, id=thing_id)
+        ...
+        thing = result.get()
+        async_manager.close()
+    """
+    def __init__(self, connection_uri, workers=10, **manager_kwargs):
+        """
+        Args:
+            connection_uri: A URI used to connect to the graph database.
+            workers: (Optional) The number of worker threads, i.e. the
+                maximum number of concurrent calls.
+            manager_kwargs: (Optional) Passed to each worker's Manager.
+        """
+        self._connection_uri = connection_uri
+        self._manager_kwargs = manager_kwargs
+        self._local = threading.local()
+        self._types_generation = 0
+        self._pool = ThreadPool(workers)
+
+    def _get_manager(self):
+        """ Return the Manager of the current worker thread, making sure
+        its type registry is at least as recent as the last
+        ``reload_types``.
+        """
+        local = self._local
+        manager = getattr(local, 'manager', None)
+        generation = self._types_generation
+
+        if manager is None:
+            manager = local.manager = Manager(
+                self._connection_uri, **self._manager_kwargs)
+        elif local.types_generation != generation:
+            manager.reload_types()
+
+        local.types_generation = generation
+        return manager
+
+    def _call(self, method_name, *args, **kwargs):
+        def run():
+            manager = self._get_manager()
+            result = getattr(manager, method_name)(*args, **kwargs)
+            if isinstance(result, GeneratorType):
+                result = list(result)
+            return result
+
+        return self._pool.apply_async(run)
+
+    def save(self, persistable):
+        return self._call('save', persistable)
+
+    def get(self, cls, **attr_filter):
+        return self._call('get', cls, **attr_filter)
+
+    def get_by_unique_attr(self, cls, attr_name, values):
+        return self._call('get_by_unique_attr', cls, attr_name, values)
+
+    def delete(self, obj):
+        return self._call('delete', obj)
+
+    def query(self, query, **params):
+        return self._call('query', query, **params)
+
+    def reload_types(self, force=False):
+        def run():
+            self._get_manager().reload_types(force=force)
+            self._types_generation += 1
+
+        return self._pool.apply_async(run)
+
+    def close(self):
+        """ Wait for all pending calls and stop the worker threads.
+        """
+        self._pool.close()
+        self._pool.join()
@@ -21,3 +21,23 @@ def unique(fn):
                 items.add(item)
                 yield item
     return wrapped
+
+
+def chunks(iterable, size):
+    """ Splits an iterable into lists of at most ``size`` items.
+
+    Args:
+        iterable: The iterable to split.
+        size: The maximum number of items per chunk.
+
+    Returns:
+        A generator of lists, in the order of the original items.
+    """
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,129 @@
+import threading
+
+from kaiso.serialize import object_to_db_value
+
+
+class _Batch(object):
+    """ Values of a unique attribute requested within one loading window,
+    and the objects loaded for them.
+    """
+    def __init__(self):
+        self.values = []
+        self.indexes = {}
+        self.results = None
+        self.error = None
+        # set when no more values can be added, so the batch can be loaded
+        # before the end of the window
+        self.full = threading.Event()
+        self.done = threading.Event()
+
+    def add(self, value):
+        """ Add ``value`` to the batch, if it isn't part of it already, and
+        return the index of its result.
+        """
+        if value not in self.indexes:
+            self.indexes[value] = len(self.values)
+            self.values.append(value)
+        return self.indexes[value]
+
+
+class BatchingLoader(object):
+    """ Coalesces concurrent ``Manager.get`` calls for different values of
+    the same unique attribute into a single ``get_by_unique_attr`` request.
+
+    The first caller for a (type, attribute) pair waits for ``window``
+    seconds, collecting the values requested by other callers in the
+    meantime, and then loads all of them at once. A batch that reaches
+    ``max_batch_size`` values is loaded straight away. Every caller gets
+    the object for its own value.
+
+    Calls that can't be batched (e.g. filtering by several or by non-unique
+    attributes) are passed to ``Manager.get``. The manager is only used by
+    one thread at a time.
+
+    Usage:
+        loader = BatchingLoader(manager, window=0.005)
+        # from many threads
+        thing = loader.get(Thing, id=thing_id)
+    """
+    def __init__(self, manager, window=0.005, max_batch_size=1000):
+        """
+        Args:
+            manager: The Manager to load objects with.
+            window: (Optional) Number of seconds to collect requests for
+                before loading them.
+            max_batch_size: (Optional) The maximum number of values loaded
+                with a single request.
+        """
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._manager = manager
+        self._manager_lock = threading.Lock()
+        # open batches by (declaring class, attr name)
+        self._batches = {}
+        self._batches_lock = threading.Lock()
+
+    def _get_batch_key(self, cls, attr_filter):
+        """ Return the (declaring class, attr name) pair identifying the
+        batches for ``attr_filter``, or None if it can't be batched.
+        """
+        if len(attr_filter) != 1:
+            return None
+
+        ((attr_name, value),) = attr_filter.items()
+        if value is None:
+            return None
+
+        registry = self._manager.type_registry
+        for declaring_cls, unique_attr in registry.get_unique_attrs(cls):
+            if unique_attr == attr_name:
+                return declaring_cls, attr_name
+
+        return None
+
+    def get(self, cls, **attr_filter):
+        """ Return the object of type ``cls`` matching ``attr_filter``, like
+        ``Manager.get``, batching the lookup with those of other threads.
+        """
+        key = self._get_batch_key(cls, attr_filter)
+        if key is None:
+            with self._manager_lock:
+                return self._manager.get(cls, **attr_filter)
+
+        declaring_cls, attr_name = key
+        value = object_to_db_value(attr_filter[attr_name])
+
+        with self._batches_lock:
+            batch = self._batches.get(key)
+            is_leader = batch is None
+            if is_leader:
+                batch = self._batches[key] = _Batch()
+
+            index = batch.add(value)
+            if len(batch.values) >= self.max_batch_size:
+                # full; later callers start a new batch
+                del self._batches[key]
+                batch.full.set()
+
+        if is_leader:
+            batch.full.wait(self.window)
+            with self._batches_lock:
+                if self._batches.get(key) is batch:
+                    del self._batches[key]
+            self._load(declaring_cls, attr_name, batch)
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index]
+
+    def _load(self, cls, attr_name, batch):
+        try:
+            with self._manager_lock:
+                batch.results = list(self._manager.get_by_unique_attr(
+                    cls, attr_name, batch.values))
+        except Exception as exc:
+            batch.error = exc
+        finally:
+            batch.done.set()
@@ -0,0 +1,772 @@
+from functools import wraps
+from itertools import count
+import threading
+import uuid
+
+from kaiso.exceptions import NoResultFound
+from kaiso.relationships import IsA
+from kaiso.serialize import (
+    dict_to_db_values_dict, get_type_fingerprint, get_type_relationships)
+from kaiso.types import AttributedBase, get_type_id
+from kaiso.utils import sort_type_hierarchy
+
+
+def synchronized(func):
+    """ Run a method of InMemoryBackend while holding its lock.
+    """
+    @wraps(func)
+    def decorated(self, *args, **kwargs):
+        with self._lock:
+            return func(self, *args, **kwargs)
+    return decorated
+
+
+class _Node(object):
+    def __init__(self, node_id, labels, properties):
+        self.id = node_id
+        self.labels = set(labels)
+        self.properties = dict(properties)
+        self.outgoing = []
+        self.incoming = []
+
+    def matches(self, properties):
+        # like cypher, a property can't be matched against null
+        for key, value in properties.items():
+            if value is None or self.properties.get(key) != value:
+                return False
+        return True
+
+    def get_relationships(self):
+        """ Return all relationships of the node, including relationships
+        to itself only once.
+        """
+        return self.outgoing + [
+            rel for rel in self.incoming if rel.start is not self]
+
+
+class _Relationship(object):
+    def __init__(self, rel_id, rel_type, properties, start, end):
+        self.id = rel_id
+        self.type = rel_type
+        self.properties = dict(properties)
+        self.start = start
+        self.end = end
+
+    def as_tuple(self):
+        return (
+            self.type,
+            self.properties.copy(),
+            self.start.properties.copy(),
+            self.end.properties.copy(),
+        )
+
+
+def update_properties(properties, changes):
+    """ Apply property ``changes`` to ``properties``, removing those set to
+    None, as a cypher SET clause does.
+    """
+    for key, value in changes.items():
+        if value is None:
+            properties.pop(key, None)
+        else:
+            properties[key] = value
+
+
+class InMemoryBackend(object):
+    """ Stores the kaiso graph in memory, e.g. for tests or for tools that
+    don't need a Neo4j server.
+
+    Implements the operations of ``kaiso.persistence.Neo4jBackend`` with
+    the same semantics, so managers sharing an InMemoryBackend behave like
+    managers sharing a database, including type system invalidation. It
+    can't run cypher statements though, so ``Manager.query`` raises
+    NotImplementedError. Unique constraints are recorded, but not
+    enforced.
+
+    Usage:
+        backend = InMemoryBackend()
+        manager = Manager(None, backend=backend)
+    """
+    def __init__(self):
+        # unique per instance, so that managers only share cached type
+        # registries and schemas with managers of the same backend
+        self.key = 'memory:%s' % uuid.uuid4().hex
+        self._lock = threading.RLock()
+        self._ids = count()
+        self._constraints = set()
+        self._clear()
+
+    def _clear(self):
+        self._nodes = {}
+        # node ids by label
+        self._labels = {}
+
+    def execute(self, query, params):
+        raise NotImplementedError(
+            "InMemoryBackend can't run cypher queries")
+
+    def _create_node(self, labels, properties):
+        node = _Node(next(self._ids), labels, properties)
+        self._nodes[node.id] = node
+        for label in node.labels:
+            self._labels.setdefault(label, set()).add(node.id)
+        return node
+
+    def _set_labels(self, node, removed_labels, added_labels):
+        for label in removed_labels:
+            node.labels.discard(label)
+            self._labels.get(label, set()).discard(node.id)
+        for label in added_labels:
+            node.labels.add(label)
+            self._labels.setdefault(label, set()).add(node.id)
+
+    def _delete_node(self, node):
+        """ Delete ``node`` and all of its relationships, returning the
+        number of relationships deleted.
+        """
+        rels = node.get_relationships()
+        for rel in rels:
+            self._delete_relationship(rel)
+
+        del self._nodes[node.id]
+        self._set_labels(node, list(node.labels), ())
+        return len(rels)
+
+    def _create_relationship(self, rel_type, properties, start, end):
+        rel = _Relationship(
+            next(self._ids), rel_type, properties, start, end)
+        start.outgoing.append(rel)
+        end.incoming.append(rel)
+        return rel
+
+    def _delete_relationship(self, rel):
+        rel.start.outgoing.remove(rel)
+        rel.end.incoming.remove(rel)
+
+    def _find_nodes(self, lookup):
+        """ Return the nodes matching the ``(labels, properties)``
+        ``lookup``, in the order they were created.
+        """
+        labels, properties = lookup
+
+        if labels:
+            node_ids = set.intersection(*[
+                self._labels.get(label, set()) for label in labels])
+        else:
+            node_ids = self._nodes.keys()
+
+        return [
+            self._nodes[node_id] for node_id in sorted(node_ids)
+            if self._nodes[node_id].matches(properties)
+        ]
+
+    def _find_node(self, lookup):
+        for node in self._find_nodes(lookup):
+            return node
+        return None
+
+    def _find_instances(self, cls, filters, include_subtypes=True,
+                        ancestor_labels=False):
+        """ Return the instances matched by
+        ``kaiso.queries.get_instances_match_clause``, in the order they
+        were created.
+        """
+        for attr_name in filters:
+            if not hasattr(cls, attr_name):
+                raise ValueError(
+                    "{} has no attribute {}".format(cls, attr_name))
+
+        properties = dict_to_db_values_dict(filters)
+        type_id = get_type_id(cls)
+
+        if include_subtypes and ancestor_labels:
+            return self._find_nodes(((type_id,), properties))
+
+        type_node = self._get_type_node(type_id)
+        if type_node is None:
+            return []
+
+        type_nodes = [type_node]
+        if include_subtypes:
+            pending = [type_node]
+            while pending:
+                for rel in pending.pop().incoming:
+                    if rel.type == 'ISA' and rel.start not in type_nodes:
+                        type_nodes.append(rel.start)
+                        pending.append(rel.start)
+
+        instances = set(
+            rel.start
+            for node in type_nodes
+            for rel in node.incoming
+            if rel.type == 'INSTANCEOF' and rel.start.matches(properties)
+        )
+        return sorted(instances, key=lambda node: node.id)
+
+    def _get_type_node(self, type_id):
+        return self._find_node((('PersistableType',), {'id': type_id}))
+
+    def _get_type_nodes(self):
+        """ Return a dict of all type nodes, by type id.
+        """
+        return dict(
+            (node.properties['id'], node)
+            for node in self._find_nodes((('PersistableType',), {}))
+        )
+
+    def _get_type_system_node(self, type_system_id='TypeSystem'):
+        return self._find_node((('TypeSystem',), {'id': type_system_id}))
+
+    def _get_declared_attributes(self, type_node):
+        return [
+            rel.start for rel in type_node.incoming
+            if rel.type == 'DECLAREDON'
+        ]
+
+    def _get_type_definition(self, type_node):
+        bases = sorted(
+            (rel.properties.get('base_index'), rel.end.properties['id'])
+            for rel in type_node.outgoing
+            if rel.type == 'ISA' and 'PersistableType' in rel.end.labels
+        )
+        return (
+            type_node.properties['id'],
+            tuple(base for (_, base) in bases),
+            type_node.properties.copy(),
+            [
+                attr.properties.copy()
+                for attr in self._get_declared_attributes(type_node)
+            ],
+        )
+
+    @synchronized
+    def get_unique_constraints(self):
+        return set(self._constraints)
+
+    @synchronized
+    def create_unique_constraints(self, constraints):
+        self._constraints.update(constraints)
+
+    @synchronized
+    def drop_unique_constraints(self, constraints):
+        self._constraints.difference_update(constraints)
+
+    @synchronized
+    def clear(self):
+        self._clear()
+
+    @synchronized
+    def get_type_system_state(self, create=False):
+        type_system = self._get_type_system_node()
+        if type_system is None:
+            if not create:
+                raise NoResultFound("TypeSystem not found in db")
+            type_system = self._create_node(
+                ['TypeSystem'], {'id': 'TypeSystem', 'serial': 0})
+
+        properties = type_system.properties
+        return properties.get('version'), properties.get('serial')
+
+    @synchronized
+    def invalidate_types(self, type_ids, reset_fingerprints=True):
+        type_system = self._get_type_system_node()
+        if type_system is None:
+            return
+
+        properties = type_system.properties
+        properties['version'] = uuid.uuid4().hex
+        properties['serial'] = properties.get('serial', 0) + 1
+        if type_ids is None:
+            properties['unstamped_serial'] = properties['serial']
+
+        type_ids = set(type_ids or ())
+        for type_id, type_node in self._get_type_nodes().items():
+            if type_id in type_ids:
+                type_node.properties['__changed__'] = properties['serial']
+                if reset_fingerprints:
+                    type_node.properties.pop('__fingerprint__', None)
+
+    @synchronized
+    def get_type_hierarchy(self, start_type_id=None, assemble=False):
+        type_nodes = self._get_type_nodes()
+
+        subtypes = dict((type_id, set()) for type_id in type_nodes)
+        for type_id, type_node in type_nodes.items():
+            for rel in type_node.incoming:
+                # like the IsA relationships matched by Neo4jBackend, only
+                # ones between types are part of the hierarchy
+                if rel.type == 'ISA' and 'PersistableType' in rel.start.labels:
+                    subtypes[type_id].add(rel.start.properties['id'])
+
+        def get_subtypes(type_ids):
+            found = set()
+            pending = list(type_ids)
+            while pending:
+                for subtype_id in subtypes[pending.pop()]:
+                    if subtype_id not in found:
+                        found.add(subtype_id)
+                        pending.append(subtype_id)
+            return found
+
+        # only types reachable from the TypeSystem are part of the hierarchy
+        roots = set()
+        type_system = self._get_type_system_node()
+        if type_system is not None:
+            roots.update(
+                rel.end.properties['id'] for rel in type_system.outgoing
+                if rel.type == 'DEFINES'
+            )
+        reachable = roots.union(get_subtypes(roots))
+
+        if start_type_id:
+            # like Neo4jBackend, only include the start type if it is a
+            # subtype of a type defined by the TypeSystem
+            if start_type_id in get_subtypes(roots):
+                selected = get_subtypes([start_type_id])
+                selected.add(start_type_id)
+            else:
+                selected = set()
+        else:
+            selected = reachable
+
+        definitions = dict(
+            (type_id, self._get_type_definition(type_nodes[type_id]))
+            for type_id in reachable
+        )
+        hierarchy = sort_type_hierarchy(
+            (type_id, bases, None)
+            for type_id, bases, _, _ in definitions.values()
+        )
+        return [
+            definitions[type_id] for type_id, _, _ in hierarchy
+            if type_id in selected
+        ]
+
+    @synchronized
+    def get_type_definitions(self, type_ids):
+        type_nodes = self._get_type_nodes()
+        return [
+            self._get_type_definition(type_nodes[type_id])
+            for type_id in set(type_ids) if type_id in type_nodes
+        ]
+
+    @synchronized
+    def get_type_stamps(self):
+        stamps = dict(
+            (type_id, type_node.properties.get('__changed__'))
+            for type_id, type_node in self._get_type_nodes().items()
+        )
+        type_system = self._get_type_system_node()
+        if type_system is None:
+            return stamps, None
+        return stamps, type_system.properties.get('unstamped_serial')
+
+    @synchronized
+    def get_type_fingerprints(self, type_ids):
+        type_nodes = self._get_type_nodes()
+        return dict(
+            (type_id, type_nodes[type_id].properties.get('__fingerprint__'))
+            for type_id in type_ids if type_id in type_nodes
+        )
+
+    @synchronized
+    def set_type_fingerprint(self, type_id, fingerprint):
+        type_node = self._get_type_node(type_id)
+        if type_node is not None:
+            type_node.properties['__fingerprint__'] = fingerprint
+
+    @synchronized
+    def get_type(self, type_id):
+        type_node = self._get_type_node(type_id)
+        if type_node is None:
+            return None, None
+
+        attr_names = [
+            attr.properties['name']
+            for attr in self._get_declared_attributes(type_node)
+            if attr.properties.get('name') is not None
+        ]
+        return type_node.properties.copy(), attr_names
+
+    def _merge_type_node(self, cls):
+        properties = {'__type__': type(cls).__name__, 'id': get_type_id(cls)}
+        lookup = ((type(cls).__name__,), properties)
+
+        type_node = self._find_node(lookup)
+        if type_node is None:
+            type_node = self._create_node(*lookup)
+        return type_node
+
+    def _merge_relationship(self, start, rel_type, end):
+        for rel in start.outgoing:
+            if rel.type == rel_type and rel.end is end:
+                return rel
+        return self._create_relationship(rel_type, {}, start, end)
+
+    @synchronized
+    def save_types(self, classes, type_system_id, type_registry):
+        # mirrors kaiso.queries.get_create_types_query
+        type_system = self._get_type_system_node(type_system_id)
+        if type_system is None:
+            return []
+
+        type_nodes = {}
+        for cls in classes:
+            # filter type relationships that we want to persist
+            type_relationships = [
+                (cls1, rel_cls_idx, cls2)
+                for cls1, rel_cls_idx, cls2 in get_type_relationships(cls)
+                if issubclass(cls2, AttributedBase)
+            ]
+
+            is_first = True
+            for cls1, (rel_cls, base_idx), cls2 in type_relationships:
+                node1 = self._merge_type_node(cls1)
+                type_nodes[get_type_id(cls1)] = (cls1, node1)
+
+                if is_first:
+                    is_first = False
+                    self._merge_relationship(type_system, 'DEFINES', node1)
+                    continue
+
+                node2 = self._merge_type_node(cls2)
+                type_nodes[get_type_id(cls2)] = (cls2, node2)
+
+                rel = self._merge_relationship(
+                    node1, get_type_id(rel_cls).upper(), node2)
+                rel.properties = type_registry.object_to_dict(
+                    IsA(base_index=base_idx))
+
+        for cls, type_node in type_nodes.values():
+            descriptor = type_registry.get_descriptor(cls)
+            for attr_name, attr in descriptor.declared_attributes.items():
+                attr_dict = type_registry.object_to_dict(attr, for_db=True)
+                attr_dict['name'] = attr_name
+
+                for attr_node in self._get_declared_attributes(type_node):
+                    if attr_node.matches(attr_dict):
+                        break
+                else:
+                    attr_node = self._create_node([], attr_dict)
+                    self._create_relationship(
+                        'DECLAREDON', {}, attr_node, type_node)
+
+            cls_props = type_registry.object_to_dict(cls, for_db=True)
+            cls_props['__fingerprint__'] = get_type_fingerprint(
+                cls, type_registry)
+            type_node.properties = cls_props
+
+        self.invalidate_types(type_nodes.keys(), reset_fingerprints=False)
+        return [cls for cls, _ in type_nodes.values()]
+
+    @synchronized
+    def update_type(self, type_id, changes, declared_attr_names):
+        type_node = self._get_type_node(type_id)
+        if type_node is None:
+            return
+
+        update_properties(type_node.properties, changes)
+        for attr_node in self._get_declared_attributes(type_node):
+            if attr_node.properties.get('name') not in declared_attr_names:
+                self._delete_node(attr_node)
+
+    @synchronized
+    def delete_declared_attributes(self, type_ids, declared):
+        type_nodes = self._get_type_nodes()
+        for type_id in type_ids:
+            if type_id not in type_nodes:
+                continue
+            for attr_node in self._get_declared_attributes(
+                    type_nodes[type_id]):
+                name = '{}.{}'.format(type_id, attr_node.properties['name'])
+                if name not in declared:
+                    self._delete_node(attr_node)
+
+    @synchronized
+    def delete_type(self, type_id, changed_type_ids):
+        node_count = rel_count = 0
+
+        type_node = self._get_type_node(type_id)
+        if type_node is not None and type_node.get_relationships():
+            # like Neo4jBackend, the attributes aren't counted, but their
+            # relationships to the type are
+            node_count = 1
+            rel_count = len(type_node.get_relationships())
+            for attr_node in self._get_declared_attributes(type_node):
+                self._delete_node(attr_node)
+            self._delete_node(type_node)
+
+        self.invalidate_types(changed_type_ids)
+        return node_count, rel_count
+
+    @synchronized
+    def get_node(self, lookup):
+        node = self._find_node(lookup)
+        if node is None:
+            return None
+        return node.properties.copy()
+
+    @synchronized
+    def get_nodes(self, lookups):
+        return [self.get_node(lookup) for lookup in lookups]
+
+    @synchronized
+    def create_instance(self, labels, properties, type_id, rel_properties):
+        type_node = self._get_type_node(type_id)
+        if type_node is None:
+            return
+
+        node = self._create_node(labels, properties)
+        self._create_relationship(
+            'INSTANCEOF', rel_properties, node, type_node)
+
+    @synchronized
+    def update_node(self, lookup, changes):
+        for node in self._find_nodes(lookup):
+            update_properties(node.properties, changes)
+
+    @synchronized
+    def delete_node(self, lookup):
+        node_count = rel_count = 0
+        for node in self._find_nodes(lookup):
+            # like Neo4jBackend, only nodes with relationships are deleted
+            if node.get_relationships():
+                node_count += 1
+                rel_count += self._delete_node(node)
+        return node_count, rel_count
+
+    def _find_relationships(self, start, rel_type, end):
+        end_nodes = self._find_nodes(end)
+        return [
+            rel
+            for start_node in self._find_nodes(start)
+            for rel in start_node.outgoing
+            if rel.end in end_nodes
+            and (rel_type is None or rel.type == rel_type)
+        ]
+
+    @synchronized
+    def get_relationship(self, start, rel_type, end):
+        for rel in self._find_relationships(start, rel_type, end):
+            return rel.as_tuple()
+        return None
+
+    def _create_relationships(self, start, rel_type, properties, end):
+        """ Create a relationship between each of the nodes matching
+        ``start`` and ``end``, returning the number created.
+        """
+        start_nodes = self._find_nodes(start)
+        end_nodes = self._find_nodes(end)
+        for start_node in start_nodes:
+            for end_node in end_nodes:
+                self._create_relationship(
+                    rel_type, properties, start_node, end_node)
+        return len(start_nodes) * len(end_nodes)
+
+    @synchronized
+    def create_relationship(self, start, rel_type, properties, end,
+                            invalidate_type_ids=None):
+        self._create_relationships(start, rel_type, properties, end)
+
+        if invalidate_type_ids is not None:
+            self.invalidate_types(invalidate_type_ids)
+
+    @synchronized
+    def update_relationship(self, start, rel_type, end, changes):
+        for rel in self._find_relationships(start, rel_type, end):
+            update_properties(rel.properties, changes)
+
+    @synchronized
+    def delete_relationships(self, start, end, invalidate_type_ids=None):
+        rels = self._find_relationships(start, None, end)
+        for rel in rels:
+            self._delete_relationship(rel)
+
+        if invalidate_type_ids is not None:
+            self.invalidate_types(invalidate_type_ids)
+        return len(rels)
+
+    @synchronized
+    def get_related(self, lookup, rel_type, outgoing):
+        related = []
+        for node in self._find_nodes(lookup):
+            if outgoing:
+                rels = node.outgoing
+            else:
+                rels = node.incoming
+
+            for rel in rels:
+                if rel.type != rel_type:
+                    continue
+                if outgoing:
+                    other = rel.end
+                else:
+                    other = rel.start
+                related.append((other.properties.copy(), rel.as_tuple()))
+        return related
+
+    @synchronized
+    def update_instances(self, cls, filters, values, limit,
+                         ancestor_labels=False):
+        def is_pending(node):
+            for key, value in values.items():
+                if value is None:
+                    if key in node.properties:
+                        return True
+                elif node.properties.get(key) != value:
+                    return True
+            return False
+
+        instances = self._find_instances(
+            cls, filters, ancestor_labels=ancestor_labels)
+        pending = [node for node in instances if is_pending(node)][:limit]
+        for node in pending:
+            update_properties(node.properties, values)
+        return len(pending)
+
+    @synchronized
+    def delete_instances(self, cls, filters, limit, ancestor_labels=False):
+        instances = self._find_instances(
+            cls, filters, ancestor_labels=ancestor_labels)[:limit]
+
+        rel_count = 0
+        for node in instances:
+            # a relationship between two deleted nodes is only counted
+            # once, as it's gone by the time the second one is deleted
+            rel_count += self._delete_node(node)
+        return len(instances), rel_count
+
+    @synchronized
+    def delete_nodes(self, lookups):
+        results = []
+        for lookup in lookups:
+            nodes = self._find_nodes(lookup)
+            rel_count = 0
+            for node in nodes:
+                rel_count += self._delete_node(node)
+            results.append((len(nodes), rel_count))
+        return results
+
+    @synchronized
+    def create_relationships(self, relationships):
+        return [
+            bool(self._create_relationships(*relationship))
+            for relationship in relationships
+        ]
+
+    def _set_instance_of(self, node, type_node, rel_properties):
+        """ Replace the INSTANCEOF relationships of ``node`` with one to
+        ``type_node``, unless it has none (as matching them in cypher
+        would fail), returning whether it was replaced.
+        """
+        old_rels = [rel for rel in node.outgoing if rel.type == 'INSTANCEOF']
+        if not old_rels:
+            return False
+
+        for rel in old_rels:
+            self._delete_relationship(rel)
+        self._create_relationship(
+            'INSTANCEOF', rel_properties, node, type_node)
+        return True
+
+    @synchronized
+    def set_instance_type(self, lookup, type_id, properties, rel_properties,
+                          removed_labels, added_labels):
+        node = self._find_node(lookup)
+        type_node = self._get_type_node(type_id)
+        if node is None or type_node is None:
+            return None
+
+        if not self._set_instance_of(node, type_node, rel_properties):
+            return None
+
+        node.properties = dict(properties)
+        self._set_labels(node, removed_labels, added_labels)
+        return node.properties.copy()
+
+    def _change_instance_type(self, node, type_node, change):
+        """ Apply the ``InstanceTypeChange`` ``change`` to ``node``,
+        returning whether it was changed.
+        """
+        if not self._set_instance_of(node, type_node, change.rel_properties):
+            return False
+
+        properties = node.properties
+        properties['__type__'] = change.type_id
+        properties.update(change.values)
+        for key, value in change.defaults.items():
+            properties.setdefault(key, value)
+        for key in change.removed_attrs:
+            properties.pop(key, None)
+
+        self._set_labels(node, change.removed_labels, change.added_labels)
+        return True
+
+    @synchronized
+    def change_instance_types(self, changes):
+        results = []
+        for lookup, change in changes:
+            type_node = self._get_type_node(change.type_id)
+            changed = 0
+            if type_node is not None:
+                for node in self._find_nodes(lookup):
+                    if self._change_instance_type(node, type_node, change):
+                        changed += 1
+            results.append(changed)
+        return results
+
+    @synchronized
+    def change_instance_types_where(self, cls, filters, change, limit):
+        instances = self._find_instances(
+            cls, filters, include_subtypes=False)[:limit]
+        type_node = self._get_type_node(change.type_id)
+        if type_node is None:
+            return 0
+
+        changed = 0
+        for node in instances:
+            if self._change_instance_type(node, type_node, change):
+                changed += 1
+        return changed
+
+    def _relabel_instances(self, type_id, removed_labels, added_labels):
+        type_node = self._get_type_node(type_id)
+        if type_node is None:
+            return 0
+
+        instances = [
+            rel.start for rel in type_node.incoming
+            if rel.type == 'INSTANCEOF'
+        ]
+        for node in instances:
+            self._set_labels(node, removed_labels, added_labels)
+        return len(instances)
+
+    @synchronized
+    def relabel_instances(self, relabels):
+        return [self._relabel_instances(*relabel) for relabel in relabels]
+
+    @synchronized
+    def update_type_bases(self, type_id, base_ids, changed_type_ids,
+                          relabels=()):
+        type_node = self._get_type_node(type_id)
+        base_nodes = [self._get_type_node(base_id) for base_id in base_ids]
+
+        old_rels = []
+        if type_node is not None:
+            old_rels = [rel for rel in type_node.outgoing if rel.type == 'ISA']
+
+        # like Neo4jBackend, the type must have bases to be matched
+        found = bool(old_rels) and None not in base_nodes
+        if found:
+            for rel in old_rels:
+                self._delete_relationship(rel)
+            for index, base_node in enumerate(base_nodes):
+                self._create_relationship(
+                    'ISA', {'base_index': index}, type_node, base_node)
+
+            for relabel in relabels:
+                self._relabel_instances(*relabel)
+
+        self.invalidate_types(changed_type_ids)
+        return found
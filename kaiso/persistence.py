@@ -1,34 +1,1192 @@
 from __future__ import unicode_literals
 
+from collections import OrderedDict, namedtuple
 from logging import getLogger
+from multiprocessing.pool import ThreadPool
+import threading
+import time
 import uuid
 
 from py2neo import cypher, neo4j
+from py2neo.packages.httpstream import http
 
-from kaiso.attributes import Outgoing, Incoming, String
+from kaiso.attributes import Outgoing, String
 from kaiso.exceptions import (
     UnknownType, CannotUpdateType, UnsupportedTypeError,
     TypeNotPersistedError, NoResultFound, NoUniqueAttributeError)
+from kaiso.iter_helpers import chunks
 from kaiso.queries import (
-    get_create_types_query, get_create_relationship_query, get_match_clause,
-    join_lines, parameter_map)
+    get_create_types_query, get_instances_match_clause,
+    get_lookup_match_clause, get_node_lookup, join_lines)
 from kaiso.references import set_store_for_object
 from kaiso.relationships import InstanceOf, IsA, DeclaredOn
 from kaiso.serialize import (
-    dict_to_db_values_dict, get_changes, object_to_db_value)
+    dict_to_db_values_dict, get_changes, get_type_fingerprint,
+    object_to_db_value)
 from kaiso.types import (
-    INTERNAL_CLASS_ATTRS, Descriptor, Persistable, PersistableType,
-    Relationship, TypeRegistry, AttributedBase, get_type_id,
-    get_neo4j_relationship_name,
+    INTERNAL_CLASS_ATTRS, AttributeBase, DefaultableAttribute, Descriptor,
+    Persistable, PersistableType, Relationship, TypeRegistry, AttributedBase,
+    get_type_id, get_neo4j_relationship_name,
 )
-from kaiso.utils import dict_difference
+from kaiso.utils import dict_difference, sort_type_hierarchy
 
 
 log = getLogger(__name__)
 
 
+# connections by uri, shared by all managers in this process
+_connections = {}
+_connections_lock = threading.Lock()
+
+
 def get_connection(uri):
-    return neo4j.GraphDatabaseService(uri)
+    """ Return the connection to the graph database at ``uri``.
+
+    Connections are created once per process and uri and shared, so that
+    a new Manager doesn't have to rediscover the database's service
+    endpoints. The underlying HTTP connections are kept alive and reused
+    per host by py2neo.
+    """
+    with _connections_lock:
+        conn = _connections.get(uri)
+        if conn is None:
+            conn = _connections[uri] = neo4j.GraphDatabaseService(uri)
+    return conn
+
+
+def set_socket_timeout(timeout):
+    """ Set the timeout, in seconds, of the sockets used to talk to the
+    graph database. None means requests never time out.
+
+    This is a py2neo setting, so it applies to the connections to all
+    databases in this process, not just those of a single uri.
+    """
+    http.socket_timeout = timeout
+
+
+class Neo4jBackend(object):
+    """ Stores the kaiso graph in a Neo4j server, using py2neo.
+
+    This is the storage interface used by Manager. Its operations work on
+    plain property dicts, and node lookups given as ``(labels,
+    properties)`` tuples (see ``kaiso.queries.get_node_lookup``), so that
+    other backends implementing them can be passed to Manager instead.
+
+    Relationships are returned as ``(relationship type, properties, start
+    node properties, end node properties)`` tuples.
+
+    Only ``Manager.query`` runs cypher statements directly, with
+    ``execute``.
+    """
+    def __init__(self, uri):
+        """
+        Args:
+            uri: A URI used to connect to the graph database.
+        """
+        # identifies the database; managers with backends of the same key
+        # share their cached type registry and schema
+        self.key = uri
+        self.conn = get_connection(uri)
+
+    def execute(self, query, params):
+        """ Run a single cypher ``query``.
+
+        Returns:
+            A list of rows.
+        """
+        # 2.0 compatibility as we transition
+        query = "CYPHER 2.0 {}".format(query)
+
+        log.debug('running query:\n%s\n\nwith params %s', query, params)
+
+        rows, _ = cypher.execute(self.conn, query, params)
+        return rows
+
+    def submit(self, statements, read_only=False):
+        """ Run (query, params) ``statements`` as a single batch request.
+        Unless ``read_only``, the batch runs in a single transaction.
+
+        Returns:
+            A list with the result of each statement: None if there are no
+            rows, the value or row if there is a single one, or a list of
+            rows.
+        """
+        if read_only:
+            batch = neo4j.ReadBatch(self.conn)
+        else:
+            batch = neo4j.WriteBatch(self.conn)
+
+        for query, params in statements:
+            query = "CYPHER 2.0 {}".format(query)
+            log.debug('running query:\n%s\n\nwith params %s', query, params)
+            batch.append_cypher(query, params=params)
+        return batch.submit()
+
+    def get_unique_constraints(self):
+        """ Return the set of (label, attr name) unique constraints that
+        exist in the database.
+        """
+        # NB. we assume all indexes are from constraints (only use-case for
+        # kaiso)
+        schema = self.conn.schema
+        return set(
+            (label, key)
+            for label in self.conn.node_labels
+            for key in schema.get_indexed_property_keys(label)
+        )
+
+    def create_unique_constraints(self, constraints):
+        """ Create the given (label, attr name) unique ``constraints``, in a
+        single batch.
+        """
+        self.submit([
+            (
+                """
+                    CREATE CONSTRAINT ON (type:{type_id})
+                    ASSERT type.{attr_name} IS UNIQUE
+                """.format(
+                    type_id=label,
+                    attr_name=attr_name,
+                ),
+                {}
+            )
+            for label, attr_name in sorted(constraints)
+        ])
+
+    def drop_unique_constraints(self, constraints):
+        """ Drop the given (label, attr name) unique ``constraints``, in a
+        single batch.
+        """
+        self.submit([
+            (
+                """
+                    DROP CONSTRAINT ON (type:{type_id})
+                    ASSERT type.{attr_name} IS UNIQUE
+                """.format(
+                    type_id=label,
+                    attr_name=attr_name,
+                ),
+                {}
+            )
+            for label, attr_name in sorted(constraints)
+        ])
+
+    def clear(self):
+        """ Remove all nodes and relationships.
+        """
+        self.conn.clear()
+
+    def get_type_system_state(self, create=False):
+        """ Return the ``(version, serial)`` of the type system (see
+        ``Manager._type_system_state``).
+
+        Args:
+            create: (Optional) If True, the TypeSystem node is created if
+                it doesn't exist yet.
+
+        Raises:
+            NoResultFound if there is no TypeSystem node.
+        """
+        if create:
+            query = """
+                MERGE (ts:TypeSystem {id: "TypeSystem"})
+                ON CREATE SET ts.serial = 0
+                RETURN ts.version, ts.serial
+            """
+        else:
+            query = """
+                MATCH (ts:TypeSystem {id: "TypeSystem"})
+                RETURN ts.version, ts.serial
+            """
+
+        rows = self.execute(query, {})
+        if not rows:
+            raise NoResultFound("TypeSystem not found in db")
+        (version, serial) = rows[0]
+        return version, serial
+
+    def _get_invalidate_types_query(self, type_ids, reset_fingerprints):
+        """ Return the query (and its parameters) used by
+        ``invalidate_types``.
+        """
+        query = join_lines(
+            'MATCH (ts:TypeSystem {id: "TypeSystem"})',
+            'SET ts.version = {new_version},',
+            '    ts.serial = coalesce(ts.serial, 0) + 1',
+        )
+        if type_ids is None:
+            query = join_lines(
+                query,
+                'WITH ts',
+                'SET ts.unstamped_serial = ts.serial',
+            )
+        elif type_ids:
+            query = join_lines(
+                query,
+                'WITH ts',
+                'MATCH (type:PersistableType)',
+                'WHERE type.id IN {type_ids}',
+                'SET type.__changed__ = ts.serial',
+            )
+            if reset_fingerprints:
+                query = join_lines(query, 'REMOVE type.__fingerprint__')
+
+        params = {
+            'new_version': uuid.uuid4().hex,
+            'type_ids': list(type_ids or ()),
+        }
+        return query, params
+
+    def invalidate_types(self, type_ids, reset_fingerprints=True,
+                         statements=()):
+        """ Set a new type system version, and stamp the ``type_ids`` types
+        with a new type system serial (see ``Manager.invalidate_type_system``).
+
+        Args:
+            type_ids: The ids of the changed types, or None if they aren't
+                known, in which case the new serial is recorded as
+                ``unstamped_serial`` of the type system.
+            reset_fingerprints: (Optional) If True, the fingerprints of the
+                ``type_ids`` types are removed.
+            statements: (Optional) (query, params) tuples making the
+                change, run in the same transaction before the
+                invalidation.
+
+        Returns:
+            A list with the result of each of ``statements``, like
+            ``submit``.
+        """
+        statements = list(statements)
+        statements.append(
+            self._get_invalidate_types_query(type_ids, reset_fingerprints))
+
+        # batch requests are executed in a single transaction
+        return self.submit(statements)[:-1]
+
+    def get_type_hierarchy(self, start_type_id=None, assemble=False):
+        """ Return the types defined by the TypeSystem, or the subtypes of
+        ``start_type_id``, as ``(type_id, bases, class properties,
+        attribute properties)`` tuples, where ``bases`` are type ids
+        ordered like the bases of the type, and ``attribute properties``
+        is a list with the properties of each declared attribute.
+
+        Types are guaranteed to appear after all of their bases.
+
+        Args:
+            start_type_id: (Optional) The type to return subtypes of.
+            assemble: (Optional) See ``Manager.assemble_type_hierarchy``.
+
+        Returns:
+            An iterable of tuples.
+        """
+        if assemble:
+            return self._assemble_type_hierarchy(start_type_id)
+        return self._query_type_hierarchy(start_type_id)
+
+    def _query_type_hierarchy(self, start_type_id):
+        if start_type_id:
+            match = """
+                p = (
+                    (ts:TypeSystem {id: "TypeSystem"})-[:DEFINES]->()<-
+                        [:ISA*]-(opt)<-[:ISA*0..]-(tpe)
+                )
+                WHERE opt.id = {start_id}
+                """
+            query_args = {'start_id': start_type_id}
+        else:
+            match = """
+                p=(
+                    (ts:TypeSystem {id: "TypeSystem"})-[:DEFINES]->()<-
+                        [:ISA*0..]-(tpe)
+                )
+                """
+            query_args = {}
+
+        query = join_lines(
+            'MATCH',
+            match,
+            """
+            WITH tpe, max(length(p)) AS level
+            OPTIONAL MATCH
+                tpe <-[:DECLAREDON*]- attr
+            OPTIONAL MATCH
+                tpe -[isa:ISA]-> base
+
+            WITH tpe.id AS type_id, level, tpe AS class_attrs,
+                filter(
+                    idx_base in collect(DISTINCT [isa.base_index, base.id])
+                    WHERE not(LAST(idx_base) is NULL)
+                ) AS bases,
+
+                collect(DISTINCT attr) AS attrs
+
+            ORDER BY level
+            RETURN type_id, bases, class_attrs, attrs
+            """)
+
+        params = dict_to_db_values_dict(query_args)
+
+        for row in self.execute(query, params):
+            yield self._parse_type_hierarchy_row(row)
+
+    def _assemble_type_hierarchy(self, start_type_id):
+        """ Load the type hierarchy with three flat queries (types, IsA
+        relationships and attributes) and order it in python.
+
+        Yields the same types as ``_query_type_hierarchy``, ordered by
+        their level in the hierarchy.
+        """
+        rows = self.execute("""
+            MATCH (tpe:PersistableType)
+            OPTIONAL MATCH
+                (ts:TypeSystem {id: "TypeSystem"}) -[defines:DEFINES]-> tpe
+            RETURN tpe, count(defines)
+        """, {})
+        class_attrs = {}
+        roots = set()
+        for type_node, defined in rows:
+            properties = type_node._properties.copy()
+            type_id = properties['id']
+            class_attrs[type_id] = properties
+            if defined:
+                roots.add(type_id)
+
+        rows = self.execute("""
+            MATCH (tpe:PersistableType) -[isa:ISA]-> (base:PersistableType)
+            RETURN tpe.id, isa.base_index, base.id
+        """, {})
+        indexed_bases = dict((type_id, []) for type_id in class_attrs)
+        subtypes = dict((type_id, set()) for type_id in class_attrs)
+        for type_id, base_index, base_id in rows:
+            indexed_bases[type_id].append((base_index, base_id))
+            subtypes[base_id].add(type_id)
+
+        rows = self.execute("""
+            MATCH (attr) -[:DECLAREDON]-> (tpe:PersistableType)
+            RETURN tpe.id, attr
+        """, {})
+        instance_attrs = dict((type_id, []) for type_id in class_attrs)
+        for type_id, attr_node in rows:
+            instance_attrs[type_id].append(attr_node._properties.copy())
+
+        # only types reachable from the TypeSystem are part of the hierarchy
+        def get_subtypes(type_ids):
+            found = set()
+            pending = list(type_ids)
+            while pending:
+                type_id = pending.pop()
+                for subtype_id in subtypes[type_id]:
+                    if subtype_id not in found:
+                        found.add(subtype_id)
+                        pending.append(subtype_id)
+            return found
+
+        reachable = roots.union(get_subtypes(roots))
+
+        if start_type_id:
+            # like _query_type_hierarchy, only include the start type if
+            # it is a subtype of a type defined by the TypeSystem
+            if start_type_id in get_subtypes(roots):
+                selected = get_subtypes([start_type_id])
+                selected.add(start_type_id)
+            else:
+                selected = set()
+        else:
+            selected = reachable
+
+        hierarchy = []
+        for type_id in reachable:
+            # the bases are sorted using their index on the IsA relationship
+            bases = tuple(base for (_, base) in sorted(indexed_bases[type_id]))
+            hierarchy.append((type_id, bases, class_attrs[type_id]))
+
+        for type_id, bases, properties in sort_type_hierarchy(hierarchy):
+            if type_id in selected:
+                yield type_id, bases, properties, instance_attrs[type_id]
+
+    def get_type_definitions(self, type_ids):
+        """ Return the tuples returned by ``get_type_hierarchy`` for the
+        types with the given ids, in no particular order.
+        """
+        if not type_ids:
+            return []
+
+        query = """
+            MATCH (tpe:PersistableType)
+            WHERE tpe.id IN {type_ids}
+            OPTIONAL MATCH
+                tpe <-[:DECLAREDON*]- attr
+            OPTIONAL MATCH
+                tpe -[isa:ISA]-> base
+
+            WITH tpe.id AS type_id, tpe AS class_attrs,
+                filter(
+                    idx_base in collect(DISTINCT [isa.base_index, base.id])
+                    WHERE not(LAST(idx_base) is NULL)
+                ) AS bases,
+
+                collect(DISTINCT attr) AS attrs
+
+            RETURN type_id, bases, class_attrs, attrs
+            """
+
+        rows = self.execute(query, {'type_ids': list(type_ids)})
+        return [self._parse_type_hierarchy_row(row) for row in rows]
+
+    def _parse_type_hierarchy_row(self, row):
+        type_id, bases, class_attrs, instance_attrs = row
+
+        # the bases are sorted using their index on the IsA relationship
+        bases = tuple(base for (_, base) in sorted(bases))
+        attrs = [attr._properties.copy() for attr in instance_attrs]
+        return type_id, bases, class_attrs._properties.copy(), attrs
+
+    def get_type_stamps(self):
+        """ Return a dict with the type system serial each type was last
+        stamped with (see ``invalidate_types``), by type id, and the last
+        serial the types were invalidated with without being stamped.
+
+        Returns:
+            A ``(stamps, unstamped_serial)`` tuple.
+        """
+        rows = self.execute("""
+            MATCH (ts:TypeSystem {id: "TypeSystem"})
+            OPTIONAL MATCH (type:PersistableType)
+            RETURN ts.unstamped_serial, type.id, type.__changed__
+        """, {})
+        unstamped_serial = rows[0][0] if rows else None
+        stamps = dict(
+            (type_id, stamp) for _, type_id, stamp in rows
+            if type_id is not None
+        )
+        return stamps, unstamped_serial
+
+    def get_type_fingerprints(self, type_ids):
+        """ Return a dict with the stored fingerprints of the types with
+        the given ids, by type id.
+        """
+        rows = self.execute(
+            'MATCH (tpe:PersistableType) WHERE tpe.id IN {type_ids} '
+            'RETURN tpe.id, tpe.__fingerprint__',
+            {'type_ids': list(type_ids)}
+        )
+        return dict(rows)
+
+    def set_type_fingerprint(self, type_id, fingerprint):
+        """ Store the ``fingerprint`` of the type with the given id.
+        """
+        self.execute(
+            'MATCH (tpe:PersistableType {id: {type_id}}) '
+            'SET tpe.__fingerprint__ = {fingerprint}',
+            {'type_id': type_id, 'fingerprint': fingerprint}
+        )
+
+    def get_type(self, type_id):
+        """ Return the properties of the type with the given id, and the
+        names of the attributes declared on it, or ``(None, None)`` if it
+        doesn't exist.
+        """
+        query = """
+            MATCH
+                (cls:PersistableType {id: {type_id}})
+            OPTIONAL MATCH
+                (attr)-[:DECLAREDON*0..]->(cls)
+            RETURN
+                cls, collect(attr.name)
+        """
+        rows = self.execute(query, {'type_id': type_id})
+        if not rows:
+            return None, None
+
+        cls_node, attr_names = rows[0]
+        return cls_node._properties.copy(), attr_names
+
+    def save_types(self, classes, type_system_id, type_registry):
+        """ Create or update the type hierarchies of ``classes`` in a single
+        statement, as done by ``kaiso.queries.get_create_types_query``, and
+        invalidate the types in the same transaction (without resetting
+        their fingerprints, which are stored with them).
+
+        Returns:
+            The classes that type nodes were saved for.
+        """
+        query, objects, query_args = get_create_types_query(
+            classes, type_system_id, type_registry)
+
+        type_ids = [get_type_id(obj) for obj in objects]
+        self.invalidate_types(
+            type_ids, reset_fingerprints=False,
+            statements=[(query, query_args)])
+        return objects
+
+    def update_type(self, type_id, changes, declared_attr_names):
+        """ Set the class attribute ``changes`` of the type with the given
+        id (removing those set to None), and delete its attributes not in
+        ``declared_attr_names``.
+        """
+        query_args = {'type_id': type_id}
+        set_clauses = []
+        for key, value in changes.items():
+            set_clauses.append('n.%s={%s}' % (key, key))
+            query_args[key] = value
+
+        where = []
+        for attr_name in declared_attr_names:
+            where.append('attr.name = {attr_%s}' % attr_name)
+            query_args['attr_%s' % attr_name] = attr_name
+
+        query = join_lines(
+            'MATCH (n:PersistableType)',
+            'WHERE n.id = {type_id}',
+            'SET %s' % ', '.join(set_clauses) if set_clauses else '',
+            'WITH n',
+            'MATCH attr -[r:DECLAREDON]-> n',
+            'WHERE not(%s)' % ' OR '.join(where) if where else '',
+            'DELETE attr, r',
+        )
+        self.execute(query, query_args)
+
+    def delete_declared_attributes(self, type_ids, declared):
+        """ Delete the attributes declared on the types with the given ids,
+        except those in ``declared``, given as ``"<type_id>.<name>"``.
+        """
+        query = join_lines(
+            'MATCH attr -[r:DECLAREDON]-> (type:PersistableType)',
+            'WHERE type.id IN {type_ids}',
+            'AND NOT (type.id + "." + attr.name) IN {declared}',
+            'DELETE attr, r',
+        )
+        self.execute(
+            query, {'type_ids': list(type_ids), 'declared': declared})
+
+    def delete_type(self, type_id, changed_type_ids):
+        """ Delete the type with the given id, its attributes and all of its
+        relationships, and invalidate the ``changed_type_ids`` types in the
+        same transaction.
+
+        Returns:
+            A tuple: with (number of nodes removed, number of rels removed)
+        """
+        query = join_lines(
+            'MATCH (obj:PersistableType {id: {type_id}})',
+            'OPTIONAL MATCH attr -[:DECLAREDON]-> obj',
+            'DELETE attr',
+            'WITH obj',
+            'MATCH obj -[rel]- ()',
+            'DELETE obj, rel',
+            'RETURN count(DISTINCT obj), count(rel)'
+        )
+        (result,) = self.invalidate_types(
+            changed_type_ids, statements=[(query, {'type_id': type_id})])
+        return tuple(result)
+
+    def get_node(self, lookup):
+        """ Return the properties of the node matching ``lookup``, or None.
+        """
+        match_clause, params = get_lookup_match_clause(lookup, 'n')
+        rows = self.execute('MATCH %s RETURN n' % match_clause, params)
+        if not rows:
+            return None
+
+        (node,) = rows[0]
+        return node._properties.copy()
+
+    def get_nodes(self, lookups):
+        """ Return the properties of the nodes matching each of the unique
+        ``lookups`` (or None), with a single read only batch request.
+        """
+        statements = []
+        for lookup in lookups:
+            match_clause, params = get_lookup_match_clause(lookup, 'n')
+            statements.append(('MATCH %s RETURN n' % match_clause, params))
+
+        nodes = []
+        for result in self.submit(statements, read_only=True):
+            node = get_batch_value(result)
+            if node is not None:
+                node = node._properties.copy()
+            nodes.append(node)
+        return nodes
+
+    def create_instance(self, labels, properties, type_id, rel_properties):
+        """ Create a node with the given ``labels`` and ``properties``, and
+        an INSTANCEOF relationship with ``rel_properties`` to the type
+        with the given id.
+        """
+        if labels:
+            node_declaration = 'n:' + ':'.join(sorted(labels))
+        else:
+            node_declaration = 'n'
+
+        query = """
+            MATCH (cls:PersistableType)
+            WHERE cls.id = {type_id}
+            CREATE (%s {props})-[:INSTANCEOF {rel_props}]->(cls)
+            RETURN n
+        """ % node_declaration
+
+        self.execute(query, {
+            'type_id': type_id,
+            'props': properties,
+            'rel_props': rel_properties,
+        })
+
+    def update_node(self, lookup, changes):
+        """ Set the property ``changes`` of the node matching ``lookup``,
+        removing those set to None.
+        """
+        match_clause, params = get_lookup_match_clause(lookup, 'n')
+
+        set_clauses = []
+        for key, value in changes.items():
+            set_clauses.append('n.%s={%s}' % (key, key))
+            params[key] = value
+
+        self.execute(join_lines(
+            'MATCH %s' % match_clause,
+            'SET %s' % ', '.join(set_clauses),
+        ), params)
+
+    def delete_node(self, lookup):
+        """ Delete the node matching ``lookup`` and all of its
+        relationships.
+
+        Returns:
+            A tuple: with (number of nodes removed, number of rels removed)
+        """
+        match_clause, params = get_lookup_match_clause(lookup, 'obj')
+        query = join_lines(
+            'MATCH %s,' % match_clause,
+            'obj -[rel]- ()',
+            'DELETE obj, rel',
+            'RETURN count(DISTINCT obj), count(rel)'
+        )
+        (result,) = self.execute(query, params)
+        return tuple(result)
+
+    def _get_relationship_match_clause(self, start, rel_type, end):
+        start_clause, params = get_lookup_match_clause(start, 'n1')
+        end_clause, end_params = get_lookup_match_clause(end, 'n2')
+        params.update(end_params)
+
+        clause = '%s, %s, (n1)-[r%s]->(n2)' % (
+            start_clause, end_clause, ':%s' % rel_type if rel_type else '')
+        return clause, params
+
+    def get_relationship(self, start, rel_type, end):
+        """ Return the relationship of type ``rel_type`` from the node
+        matching ``start`` to the one matching ``end``, or None.
+        """
+        match_clause, params = self._get_relationship_match_clause(
+            start, rel_type, end)
+        rows = self.execute('MATCH %s RETURN r' % match_clause, params)
+        if not rows:
+            return None
+
+        (rel,) = rows[0]
+        return get_relationship_tuple(rel)
+
+    def create_relationship(self, start, rel_type, properties, end,
+                            invalidate_type_ids=None):
+        """ Create a relationship of type ``rel_type`` with ``properties``
+        from the node matching ``start`` to the one matching ``end``.
+
+        Args:
+            invalidate_type_ids: (Optional) If not None, the types with
+                these ids are invalidated in the same transaction (see
+                ``invalidate_types``).
+        """
+        start_clause, params = get_lookup_match_clause(start, 'n1')
+        end_clause, end_params = get_lookup_match_clause(end, 'n2')
+        params.update(end_params)
+        params['props'] = properties
+
+        query = 'MATCH %s, %s CREATE n1 -[r:%s {props}]-> n2 RETURN r' % (
+            start_clause, end_clause, rel_type)
+
+        if invalidate_type_ids is None:
+            self.execute(query, params)
+        else:
+            self.invalidate_types(
+                invalidate_type_ids, statements=[(query, params)])
+
+    def update_relationship(self, start, rel_type, end, changes):
+        """ Set the property ``changes`` of the relationships of type
+        ``rel_type`` from the node matching ``start`` to the one matching
+        ``end``, removing those set to None.
+        """
+        match_clause, params = self._get_relationship_match_clause(
+            start, rel_type, end)
+
+        set_clauses = []
+        for key, value in changes.items():
+            set_clauses.append('r.%s={%s}' % (key, key))
+            params[key] = value
+
+        self.execute(join_lines(
+            'MATCH %s' % match_clause,
+            'SET %s' % ', '.join(set_clauses),
+        ), params)
+
+    def delete_relationships(self, start, end, invalidate_type_ids=None):
+        """ Delete all relationships from the node matching ``start`` to
+        the one matching ``end``.
+
+        Args:
+            invalidate_type_ids: (Optional) If not None, the types with
+                these ids are invalidated in the same transaction (see
+                ``invalidate_types``).
+
+        Returns:
+            The number of relationships removed.
+        """
+        match_clause, params = self._get_relationship_match_clause(
+            start, None, end)
+        query = join_lines(
+            'MATCH %s' % match_clause,
+            'DELETE r',
+            'RETURN count(r)'
+        )
+
+        if invalidate_type_ids is None:
+            (result,) = self.execute(query, params)
+        else:
+            (result,) = self.invalidate_types(
+                invalidate_type_ids, statements=[(query, params)])
+
+        return get_batch_value(result) or 0
+
+    def get_related(self, lookup, rel_type, outgoing):
+        """ Return the nodes related to the node matching ``lookup`` by
+        relationships of type ``rel_type``.
+
+        Args:
+            outgoing: If True, relationships from the matched node are
+                followed, otherwise relationships to it.
+
+        Returns:
+            A list of (related node properties, relationship) tuples.
+        """
+        match_clause, params = get_lookup_match_clause(lookup, 'n')
+
+        if outgoing:
+            rel_query = '(n)-[relation:%s]->(related)'
+        else:
+            rel_query = '(n)<-[relation:%s]-(related)'
+
+        query = join_lines(
+            'MATCH %s, %s' % (match_clause, rel_query % rel_type),
+            'RETURN related, relation',
+        )
+
+        return [
+            (related._properties.copy(), get_relationship_tuple(rel))
+            for related, rel in self.execute(query, params)
+        ]
+
+    def update_instances(self, cls, filters, values, limit,
+                         ancestor_labels=False):
+        """ Set the property ``values`` of up to ``limit`` instances of
+        ``cls`` (including instances of its subtypes) whose attributes
+        equal the given ``filters``, removing those set to None.
+
+        Only instances that don't have all of the ``values`` yet are
+        updated, so that repeated calls make progress.
+
+        Args:
+            ancestor_labels: (Optional) See ``Manager.ancestor_labels``.
+
+        Returns:
+            The number of instances updated.
+        """
+        match_clause, params = get_instances_match_clause(
+            cls, 'n', filters, ancestor_labels=ancestor_labels)
+
+        set_clauses = []
+        remove_clauses = []
+        pending = []
+        for attr_name, value in sorted(values.items()):
+            if value is None:
+                remove_clauses.append('n.%s' % attr_name)
+                pending.append('has(n.%s)' % attr_name)
+                continue
+
+            param_name = 'value__%s' % attr_name
+            params[param_name] = value
+            set_clauses.append('n.%s = {%s}' % (attr_name, param_name))
+            pending.append('NOT has(n.{0}) OR n.{0} <> {{{1}}}'.format(
+                attr_name, param_name))
+
+        if not pending:
+            return 0
+
+        query = join_lines(
+            match_clause,
+            'WITH DISTINCT n',
+            'WHERE %s' % ' OR '.join('(%s)' % p for p in pending),
+            'WITH n LIMIT {limit}',
+            'SET %s' % ', '.join(set_clauses) if set_clauses else '',
+            'REMOVE %s' % ', '.join(remove_clauses) if remove_clauses else '',
+            'RETURN count(n)',
+        )
+        params['limit'] = limit
+
+        ((count,),) = self.execute(query, params)
+        return count
+
+    def delete_instances(self, cls, filters, limit, ancestor_labels=False):
+        """ Delete up to ``limit`` instances of ``cls`` (including instances
+        of its subtypes) whose attributes equal the given ``filters``,
+        along with all of their relationships.
+
+        Args:
+            ancestor_labels: (Optional) See ``Manager.ancestor_labels``.
+
+        Returns:
+            A tuple: with (number of nodes removed, number of rels removed)
+        """
+        match_clause, params = get_instances_match_clause(
+            cls, 'n', filters, ancestor_labels=ancestor_labels)
+        query = join_lines(
+            match_clause,
+            'WITH DISTINCT n LIMIT {limit}',
+            'OPTIONAL MATCH n -[rel]- ()',
+            'DELETE rel, n',
+            # a relationship between two deleted nodes is matched from
+            # both ends
+            'RETURN count(DISTINCT n), count(DISTINCT rel)',
+        )
+        params['limit'] = limit
+
+        (result,) = self.execute(query, params)
+        return tuple(result)
+
+    def delete_nodes(self, lookups):
+        """ Delete the nodes matching each of the ``lookups``, along with
+        all of their relationships, with a single batch request.
+
+        Unlike ``delete_node``, nodes without any relationships are
+        deleted too.
+
+        Returns:
+            A list with a (number of nodes removed, number of rels removed)
+            tuple for each lookup.
+        """
+        statements = []
+        for lookup in lookups:
+            match_clause, params = get_lookup_match_clause(lookup, 'n')
+            query = join_lines(
+                'MATCH %s' % match_clause,
+                'OPTIONAL MATCH n -[rel]- ()',
+                'DELETE rel, n',
+                'RETURN count(DISTINCT n), count(rel)',
+            )
+            statements.append((query, params))
+
+        return [tuple(result) for result in self.submit(statements)]
+
+    def create_relationships(self, relationships):
+        """ Create relationships given as ``(start, rel_type, properties,
+        end)`` tuples, where ``start`` and ``end`` are node lookups, with
+        a single batch request.
+
+        Returns:
+            A list of booleans corresponding to ``relationships``, which
+            are False for relationships whose start or end node could not
+            be found.
+        """
+        statements = []
+        for start, rel_type, properties, end in relationships:
+            start_clause, params = get_lookup_match_clause(start, 'n1')
+            end_clause, end_params = get_lookup_match_clause(end, 'n2')
+            params.update(end_params)
+            params['props'] = properties
+
+            query = join_lines(
+                'MATCH %s, %s' % (start_clause, end_clause),
+                'CREATE n1 -[r:%s {props}]-> n2' % rel_type,
+                'RETURN count(r)',
+            )
+            statements.append((query, params))
+
+        return [
+            bool(get_batch_value(result))
+            for result in self.submit(statements)
+        ]
+
+    def set_instance_type(self, lookup, type_id, properties, rel_properties,
+                          removed_labels, added_labels):
+        """ Make the node matching ``lookup`` an instance of the type with
+        the given id, replacing its properties with ``properties`` and its
+        INSTANCEOF relationship with one with ``rel_properties``.
+
+        Returns:
+            The properties of the changed node, or None if it (or the type)
+            wasn't found.
+        """
+        if removed_labels:
+            remove_labels_statement = 'REMOVE obj:' + ':'.join(
+                sorted(removed_labels))
+        else:
+            remove_labels_statement = ''
+
+        if added_labels:
+            add_labels_statement = 'SET obj :' + ':'.join(
+                sorted(added_labels))
+        else:
+            add_labels_statement = ''
+
+        match_clause, params = get_lookup_match_clause(lookup, 'obj')
+        params.update({
+            'type_id': type_id,
+            'properties': properties,
+            'rel_props': rel_properties,
+        })
+
+        query = join_lines(
+            'MATCH %s,' % match_clause,
+            '(type:PersistableType {id: {type_id}}),',
+            '(obj)-[old_rel:INSTANCEOF]->()',
+            'DELETE old_rel',
+            'CREATE (obj)-[new_rel:INSTANCEOF {rel_props}]->(type)',
+            'SET obj={properties}',
+            remove_labels_statement,
+            add_labels_statement,
+            'RETURN obj',
+        )
+
+        rows = self.execute(query, params)
+        if not rows:
+            return None
+
+        (node,) = rows[0]
+        return node._properties.copy()
+
+    def _get_type_change_lines(self, change):
+        """ Return the update clauses (and their parameters) that apply the
+        ``InstanceTypeChange`` ``change`` to a matched ``obj``, whose
+        INSTANCEOF relationship is matched as ``old_rel``, given the new
+        type matched as ``new_type``.
+        """
+        params = {
+            'new_type_id': change.type_id,
+            'rel_props': change.rel_properties,
+        }
+        set_clauses = ['obj.__type__ = {new_type_id}']
+
+        for attr_name, value in sorted(change.values.items()):
+            param_name = 'value__%s' % attr_name
+            set_clauses.append('obj.%s = {%s}' % (attr_name, param_name))
+            params[param_name] = value
+
+        for attr_name, value in sorted(change.defaults.items()):
+            param_name = 'value__%s' % attr_name
+            set_clauses.append('obj.%s = coalesce(obj.%s, {%s})' % (
+                attr_name, attr_name, param_name))
+            params[param_name] = value
+
+        lines = [
+            'DELETE old_rel',
+            'CREATE (obj)-[new_rel:INSTANCEOF {rel_props}]->(new_type)',
+            'SET %s' % ', '.join(set_clauses),
+        ]
+        if change.removed_attrs:
+            lines.append('REMOVE %s' % ', '.join(
+                'obj.%s' % attr_name
+                for attr_name in sorted(change.removed_attrs)))
+        if change.removed_labels:
+            lines.append(
+                'REMOVE obj:' + ':'.join(sorted(change.removed_labels)))
+        if change.added_labels:
+            lines.append('SET obj :' + ':'.join(sorted(change.added_labels)))
+
+        return lines, params
+
+    def change_instance_types(self, changes):
+        """ Apply ``(lookup, change)`` tuples, where ``change`` is an
+        ``InstanceTypeChange``, to the nodes matching each lookup, with a
+        single batch request.
+
+        Returns:
+            A list with the number of instances changed for each tuple.
+        """
+        # changes are usually shared by many instances of the same type
+        change_lines = {}
+        statements = []
+        for lookup, change in changes:
+            if id(change) not in change_lines:
+                change_lines[id(change)] = self._get_type_change_lines(change)
+            lines, params = change_lines[id(change)]
+
+            match_clause, obj_params = get_lookup_match_clause(lookup, 'obj')
+            obj_params.update(params)
+
+            query = join_lines(
+                'MATCH %s,' % match_clause,
+                '(new_type:PersistableType {id: {new_type_id}}),',
+                '(obj)-[old_rel:INSTANCEOF]->()',
+                (lines, ''),
+                'RETURN count(obj)',
+            )
+            statements.append((query, obj_params))
+
+        return [
+            get_batch_value(result) or 0
+            for result in self.submit(statements)
+        ]
+
+    def change_instance_types_where(self, cls, filters, change, limit):
+        """ Apply the ``InstanceTypeChange`` ``change`` to up to ``limit``
+        direct instances of ``cls`` whose attributes equal the given
+        ``filters``.
+
+        Returns:
+            The number of instances changed.
+        """
+        lines, params = self._get_type_change_lines(change)
+
+        match_clause, match_params = get_instances_match_clause(
+            cls, 'obj', filters, include_subtypes=False)
+        params.update(match_params)
+        params['limit'] = limit
+
+        query = join_lines(
+            match_clause,
+            'WITH DISTINCT obj LIMIT {limit}',
+            'MATCH (new_type:PersistableType {id: {new_type_id}}),',
+            '(obj)-[old_rel:INSTANCEOF]->()',
+            (lines, ''),
+            'RETURN count(obj)',
+        )
+
+        ((count,),) = self.execute(query, params)
+        return count
+
+    def _get_relabel_statement(self, type_id, removed_labels, added_labels):
+        lines = [
+            'MATCH (type:PersistableType {id: {type_id}})',
+            '    <-[:INSTANCEOF]- (n)',
+        ]
+        if removed_labels:
+            lines.append('REMOVE n:' + ':'.join(sorted(removed_labels)))
+        if added_labels:
+            lines.append('SET n :' + ':'.join(sorted(added_labels)))
+        lines.append('RETURN count(n)')
+
+        return join_lines(*lines), {'type_id': type_id}
+
+    def relabel_instances(self, relabels):
+        """ Remove and add labels of the direct instances of types, given
+        as ``(type_id, removed labels, added labels)`` tuples, with a
+        single batch request.
+
+        Returns:
+            A list with the number of instances of each type.
+        """
+        statements = [
+            self._get_relabel_statement(*relabel) for relabel in relabels]
+        return [
+            get_batch_value(result) or 0
+            for result in self.submit(statements)
+        ]
+
+    def update_type_bases(self, type_id, base_ids, changed_type_ids,
+                          relabels=()):
+        """ Replace the IsA relationships of the type with the given id
+        with ones to the types with ``base_ids``, and invalidate the
+        ``changed_type_ids`` types in the same transaction.
+
+        Args:
+            relabels: (Optional) Tuples like the ones taken by
+                ``relabel_instances``, applied in the same transaction.
+
+        Returns:
+            False if the type or one of its bases wasn't found.
+        """
+        match_clauses = ['(type:PersistableType {id: {type_id}})']
+        create_clauses = []
+        params = {'type_id': type_id}
+
+        for index, base_id in enumerate(base_ids):
+            name = 'base_{}'.format(index)
+            match_clauses.append(
+                '(%s:PersistableType {id: {%s_id}})' % (name, name))
+            create_clauses.append(
+                'type -[:ISA {%s_props}]-> %s' % (name, name))
+            params['%s_id' % name] = base_id
+            params['%s_props' % name] = {'base_index': index}
+
+        query = join_lines(
+            "MATCH",
+            (match_clauses, ','),
+            ", type -[r:ISA]-> ()",
+            "DELETE r",
+            "CREATE",
+            (create_clauses, ','),
+            "RETURN type")
+
+        statements = [(query, params)]
+        statements.extend(
+            self._get_relabel_statement(*relabel) for relabel in relabels)
+
+        results = self.invalidate_types(
+            changed_type_ids, statements=statements)
+        return results[0] is not None
+
+
+def get_relationship_tuple(rel):
+    """ Return the ``(relationship type, properties, start node properties,
+    end node properties)`` of a py2neo relationship.
+    """
+    # prefetching start and end-nodes as they don't have
+    # their properties loaded yet
+    rel.start_node.get_properties()
+    rel.end_node.get_properties()
+
+    return (
+        rel.type,
+        rel._properties.copy(),
+        rel.start_node._properties.copy(),
+        rel.end_node._properties.copy(),
+    )
+
+
+def get_related_type_ids(rel):
+    """ Return the ids of the types at either end of a type-hierarchy
+    relationship, such as IsA or DeclaredOn.
+    """
+    return [
+        get_type_id(end) for end in (rel.start, rel.end)
+        if isinstance(end, PersistableType)
+    ]
+
+
+def get_batch_value(result):
+    """ Return the single value from the result of a batched cypher query
+    returning a single row and column, e.g. a count.
+    """
+    if isinstance(result, list):
+        result = result[0] if result else None
+    return result
+
+
+TypeRegistryCacheEntry = namedtuple('TypeRegistryCacheEntry', [
+    'registry',  # the cached type registry
+    'version',  # type system version the registry was loaded for
+    'serial',  # type system serial the registry was loaded for
+    'validated_at',  # time of the last version check
+])
+
+
+InstanceTypeChange = namedtuple('InstanceTypeChange', [
+    'type_id',  # id of the new type
+    'rel_properties',  # properties of the new INSTANCEOF relationship
+    'values',  # property values to set
+    'defaults',  # property values to set unless the instance has one
+    'removed_attrs',  # names of the properties to remove
+    'removed_labels',  # labels to remove
+    'added_labels',  # labels to add
+])
 
 
 class TypeSystem(AttributedBase):
@@ -51,36 +1209,112 @@ class Manager(object):
     InstanceOf and IsA relationships are automatically generated
     when persisting an object.
     """
-    _type_registry_cache = None
-
-    def __init__(self, connection_uri, skip_setup=False):
+    # TypeRegistryCacheEntries by (backend key, type system id), least
+    # recently used first
+    _type_registry_caches = OrderedDict()
+
+    # maximum number of databases to keep a cached type registry for
+    type_registry_cache_size = 8
+
+    # guards _type_registry_caches and _type_registry_locks
+    _type_registry_caches_lock = threading.RLock()
+
+    # locks by (backend key, type system id), held while reloading the
+    # type registry, so that concurrent reloads only hit the database once
+    _type_registry_locks = {}
+
+    # number of seconds for which a cached type registry is trusted without
+    # checking the type system version again
+    type_cache_ttl = 0
+
+    # if True, get_type_hierarchy fetches types, their bases and their
+    # attributes as flat lists and orders them in python, rather than
+    # enumerating all paths through the type hierarchy in the database,
+    # which gets expensive for hierarchies using a lot of multiple inheritance
+    assemble_type_hierarchy = False
+
+    # backend keys (see ``Neo4jBackend.key``) of the databases for which
+    # this process has already created the constraints kaiso relies on
+    _initialised_databases = set()
+
+    # unique constraints known to exist, as sets of (label, attr name)
+    # tuples per backend key; read from the schema on first use
+    _schema_constraints = {}
+
+    # if True, instances are labelled with each of their persisted ancestor
+    # types (rather than just those declaring unique attributes), so that
+    # instances of a type and its subtypes can be found with a label scan.
+    # all managers of a database should agree on this; existing instances
+    # can be labelled with ``add_ancestor_labels``
+    ancestor_labels = False
+
+    # number of chunks of a bulk operation that are sent concurrently, using
+    # thread pools shared by all managers; 1 sends them one after another
+    chunk_workers = 1
+
+    # thread pools used to send chunks, by number of workers
+    _chunk_pools = {}
+    _chunk_pools_lock = threading.Lock()
+
+    def __init__(self, connection_uri, skip_setup=False, type_cache_ttl=None,
+                 ancestor_labels=None, chunk_workers=None, backend=None):
         """ Initializes a Manager object.
 
         Args:
             connection_uri: A URI used to connect to the graph database.
+                Ignored if a ``backend`` is given.
+            skip_setup: (Optional) If True, neither the database nor the
+                type registry are initialised.
+            type_cache_ttl: (Optional) Number of seconds for which a
+                cached type registry is used without checking the type
+                system version in the database. Defaults to
+                ``Manager.type_cache_ttl``.
+            ancestor_labels: (Optional) Whether instances are labelled
+                with all of their ancestor types. Defaults to
+                ``Manager.ancestor_labels``.
+            chunk_workers: (Optional) Number of chunks of bulk operations
+                sent concurrently. Defaults to ``Manager.chunk_workers``.
+            backend: (Optional) The backend storing the graph (see
+                ``Neo4jBackend``). Defaults to a ``Neo4jBackend`` for
+                ``connection_uri``.
         """
-        self._conn = get_connection(connection_uri)
+        if backend is None:
+            backend = Neo4jBackend(connection_uri)
+        self._backend = backend
 
         self.type_system = TypeSystem(id='TypeSystem')
         self.type_registry = TypeRegistry()
 
+        if type_cache_ttl is not None:
+            self.type_cache_ttl = type_cache_ttl
+
+        if ancestor_labels is not None:
+            self.ancestor_labels = ancestor_labels
+
+        if chunk_workers is not None:
+            self.chunk_workers = chunk_workers
+
         if skip_setup:
             return
 
-        batch = neo4j.WriteBatch(self._conn)
-        batch.append_cypher("""
-            CREATE CONSTRAINT ON (typesystem:TypeSystem)
-            ASSERT typesystem.id IS UNIQUE
-        """)
-        batch.append_cypher("""
-            CREATE CONSTRAINT ON (type:PersistableType)
-            ASSERT type.id IS UNIQUE
-        """)
-        batch.run()
+        cached_registry = self._get_recently_validated_registry()
+        if cached_registry is not None:
+            self.type_registry = cached_registry.clone()
+            return
+
+        if backend.key not in Manager._initialised_databases:
+            backend.create_unique_constraints([
+                ('TypeSystem', 'id'),
+                ('PersistableType', 'id'),
+            ])
+            Manager._initialised_databases.add(backend.key)
+
         # can't be in batch: "Cannot perform data updates in a transaction that
         # has performed schema updates"
-        self.query('MERGE (ts:TypeSystem {id: "TypeSystem"})')
-        self.reload_types()
+        # the version is read in the same statement, so that a warm type
+        # registry cache makes this the only round trip
+        version, serial = backend.get_type_system_state(create=True)
+        self._load_types(version, serial)
 
     def _execute(self, query, **params):
         """ Runs a cypher query returning only raw rows of data.
@@ -92,14 +1326,37 @@ class Manager(object):
         Returns:
             A generator with the raw rows returned by the connection.
         """
-        # 2.0 compatibility as we transition
-        query = "CYPHER 2.0 {}".format(query)
+        rows = self._backend.execute(query, params)
 
-        log.debug('running query:\n%s\n\nwith params %s', query, params)
+        return (row for row in rows)
+
+    def _get_chunk_pool(self):
+        """ Return the thread pool with ``chunk_workers`` threads.
+        """
+        with Manager._chunk_pools_lock:
+            pool = Manager._chunk_pools.get(self.chunk_workers)
+            if pool is None:
+                pool = ThreadPool(self.chunk_workers)
+                Manager._chunk_pools[self.chunk_workers] = pool
+        return pool
+
+    def _map_chunks(self, function, items, chunk_size):
+        """ Call ``function`` with chunks of up to ``chunk_size`` of the
+        given ``items``, with up to ``chunk_workers`` calls running
+        concurrently.
 
-        rows, _ = cypher.execute(self._conn, query, params)
+        Returns:
+            A list of the items of the lists returned by ``function``, in
+            the same order.
+        """
+        item_chunks = list(chunks(items, chunk_size))
+        if self.chunk_workers > 1 and len(item_chunks) > 1:
+            # map returns the results in order
+            chunk_results = self._get_chunk_pool().map(function, item_chunks)
+        else:
+            chunk_results = map(function, item_chunks)
 
-        return (row for row in rows)
+        return [result for results in chunk_results for result in results]
 
     def _convert_value(self, value):
         """ Converts a py2neo primitive(Node, Relationship, basic object)
@@ -113,36 +1370,42 @@ class Manager(object):
             The converted value.
         """
 
-        if isinstance(value, (neo4j.Node, neo4j.Relationship)):
-            properties = value._properties.copy()
-
-            if isinstance(value, neo4j.Relationship):
-                # inject __type__ based on the relationship type in case it's
-                # missing. makes it easier to add relationship with cypher
-                neo4j_rel_name = value.type
-                type_id = self.type_registry.get_relationship_type_id(
-                    neo4j_rel_name)
-                properties['__type__'] = type_id
-
-            obj = self.type_registry.dict_to_object(properties)
-
-            if isinstance(value, neo4j.Relationship):
-                # prefetching start and end-nodes as they don't have
-                # their properties loaded yet
-                value.start_node.get_properties()
-                value.end_node.get_properties()
-
-                obj.start = self._convert_value(value.start_node)
-                obj.end = self._convert_value(value.end_node)
-            else:
-                set_store_for_object(obj, self)
-            return obj
+        if isinstance(value, neo4j.Relationship):
+            return self._convert_relationship(get_relationship_tuple(value))
+
+        elif isinstance(value, neo4j.Node):
+            return self._convert_node(value._properties.copy())
 
         elif isinstance(value, list):
             return [self._convert_value(v) for v in value]
 
         return value
 
+    def _convert_node(self, properties):
+        """ Converts the ``properties`` of a node, as returned by the
+        backend, to an object.
+        """
+        obj = self.type_registry.dict_to_object(properties)
+        set_store_for_object(obj, self)
+        return obj
+
+    def _convert_relationship(self, relationship):
+        """ Converts a relationship, as returned by the backend (see
+        ``Neo4jBackend``), to a Relationship object.
+        """
+        rel_type, properties, start_properties, end_properties = (
+            relationship)
+
+        # inject __type__ based on the relationship type in case it's
+        # missing. makes it easier to add relationship with cypher
+        type_id = self.type_registry.get_relationship_type_id(rel_type)
+        properties['__type__'] = type_id
+
+        obj = self.type_registry.dict_to_object(properties)
+        obj.start = self._convert_node(start_properties)
+        obj.end = self._convert_node(end_properties)
+        return obj
+
     def _convert_row(self, row):
         for value in row:
             if isinstance(value, list):
@@ -150,57 +1413,322 @@ class Manager(object):
             else:
                 yield self._convert_value(value)
 
+    def _convert_value_to_dict(self, value):
+        """ Converts a py2neo primitive(Node, Relationship, basic object)
+        to a plain dict of its properties, without hydrating any objects.
+
+        Unlike ``_convert_value``, the type registry is not consulted, so
+        the ``__type__`` key is only present if it was stored on the node
+        or relationship.
+
+        Args:
+            value: The value to convert.
+
+        Returns:
+            The converted value.
+        """
+        if isinstance(value, (neo4j.Node, neo4j.Relationship)):
+            return value._properties.copy()
+
+        elif isinstance(value, list):
+            return [self._convert_value_to_dict(v) for v in value]
+
+        return value
+
     def _type_system_version(self):
-        query = 'MATCH (ts:TypeSystem {id: "TypeSystem"}) RETURN ts.version'
-        rows = self._execute(query)
-        (version,) = next(rows)
+        version, _ = self._type_system_state()
         return version
 
-    def invalidate_type_system(self):
-        query = """
-            MATCH (ts:TypeSystem {id: "TypeSystem"})
-            SET ts.version = {new_version}
+    def _type_system_state(self):
+        """ Return the ``(version, serial)`` of the type system.
+
+        The version identifies a state of the type hierarchy, whereas the
+        serial is incremented by every change made through kaiso, and is
+        used to stamp the types touched by that change.
+        """
+        return self._backend.get_type_system_state()
+
+    def invalidate_type_system(self, type_ids=(), reset_fingerprints=True):
+        """ Bump the type system version, so that other managers reload their
+        type registries.
+
+        Args:
+            type_ids: (Optional) ids of the types that have (possibly)
+                changed. These are stamped with the new type system serial,
+                which allows other managers to only reload those types.
+                Without ``type_ids``, other managers reload the entire
+                type hierarchy.
+            reset_fingerprints: (Optional) If True (the default), the
+                fingerprints of the ``type_ids`` types are removed, so that
+                saving them again isn't skipped. Only pass False if the
+                fingerprints were written together with the change.
+        """
+        self._backend.invalidate_types(
+            list(type_ids) or None, reset_fingerprints)
+        Manager.expire_type_registry_cache(self._backend.key)
+
+    @classmethod
+    def expire_type_registry_cache(cls, connection_uri=None):
+        """Force the next ``reload_types`` (or new Manager) to check the type
+        system version, regardless of ``type_cache_ttl``.
+
+        Use this as a hook when notified of type changes made elsewhere.
+
+        Args:
+            connection_uri: (Optional) Only expire the cached type registry
+                of this database, given by its uri (or the ``key`` of
+                another backend). Defaults to expiring all of them.
+        """
+        with Manager._type_registry_caches_lock:
+            caches = Manager._type_registry_caches
+            for key, cache in caches.items():
+                if connection_uri is None or key[0] == connection_uri:
+                    caches[key] = cache._replace(validated_at=None)
+
+    def _get_type_registry_cache_key(self):
+        return (self._backend.key, self.type_system.id)
+
+    def _get_type_registry_cache(self):
+        """Return the TypeRegistryCacheEntry for this manager's database,
+        or None if there is none.
+        """
+        key = self._get_type_registry_cache_key()
+
+        with Manager._type_registry_caches_lock:
+            caches = Manager._type_registry_caches
+            cache = caches.pop(key, None)
+            if cache is not None:
+                # mark as most recently used
+                caches[key] = cache
+        return cache
+
+    def _set_type_registry_cache(self, cache):
+        """Store ``cache`` as the TypeRegistryCacheEntry for this manager's
+        database, evicting the least recently used entries beyond
+        ``type_registry_cache_size``.
         """
-        new_version = uuid.uuid4().hex
-        self.query(query, new_version=new_version)
+        key = self._get_type_registry_cache_key()
+
+        with Manager._type_registry_caches_lock:
+            caches = Manager._type_registry_caches
+            caches.pop(key, None)
+            caches[key] = cache
+            while len(caches) > self.type_registry_cache_size:
+                caches.popitem(last=False)
+
+    def _get_type_registry_lock(self):
+        """Return the lock held while reloading the type registry for this
+        manager's database.
+        """
+        key = self._get_type_registry_cache_key()
+
+        with Manager._type_registry_caches_lock:
+            return Manager._type_registry_locks.setdefault(
+                key, threading.Lock())
+
+    def _get_recently_validated_registry(self):
+        """Return the cached type registry if its version was checked
+        within the last ``type_cache_ttl`` seconds, otherwise None.
+        """
+        cache = self._get_type_registry_cache()
+        if not cache:
+            return None
+
+        if cache.validated_at is None:
+            return None
+
+        if time.time() - cache.validated_at < self.type_cache_ttl:
+            log.debug('using recently validated type registry, version: %s',
+                      cache.version)
+            return cache.registry
 
-    def reload_types(self):
+        return None
+
+    def reload_types(self, force=False):
         """Reload the type registry for this instance from the graph
         database.
+
+        Args:
+            force: (Optional) If True, always check the type system version,
+                even if the cached type registry was validated less than
+                ``type_cache_ttl`` seconds ago.
         """
-        current_version = self._type_system_version()
-        if Manager._type_registry_cache:
-            cached_registry, version = Manager._type_registry_cache
-            if current_version == version:
-                log.debug(
-                    'using cached type registry, version: %s', current_version)
+        if not force:
+            cached_registry = self._get_recently_validated_registry()
+            if cached_registry is not None:
                 self.type_registry = cached_registry.clone()
                 return
 
-        self.type_registry = TypeRegistry()
-        registry = self.type_registry
+        self._load_types(*self._type_system_state())
 
-        for type_id, bases, attrs in self.get_type_hierarchy():
-            try:
-                cls = registry.get_class_by_id(type_id)
+    def _load_types(self, current_version, current_serial):
+        """Load the type registry for ``current_version`` of the type system,
+        using the cached type registry if it is still up to date.
+
+        If the cached type registry is out of date, but the types changed
+        since were stamped (see ``invalidate_type_system``), only those
+        types are reloaded.
+
+        Only one thread per database reloads the type registry at a time.
+        Other threads needing a reload wait for it to finish, and then use
+        its result.
+        """
+        cache = self._get_type_registry_cache()
+        if cache and current_version == cache.version:
+            self._use_type_registry_cache(cache)
+            return
+
+        with self._get_type_registry_lock():
+            latest = self._get_type_registry_cache()
+            if latest and latest.version == current_version:
+                # another thread reloaded the type registry while we
+                # were waiting for the lock
+                self._use_type_registry_cache(latest)
+                return
+
+            self._reload_type_registry(
+                latest, current_version, current_serial)
+
+    def _use_type_registry_cache(self, cache):
+        log.debug('using cached type registry, version: %s', cache.version)
+        self._set_type_registry_cache(
+            cache._replace(validated_at=time.time()))
+        self.type_registry = cache.registry.clone()
+
+    def _reload_type_registry(self, cache, current_version, current_serial):
+        """Reload the type registry from the database, incrementally if
+        possible, and cache the result.
+        """
+        if (
+            cache and
+            cache.serial is not None and
+            current_serial is not None and
+            current_serial > cache.serial
+        ):
+            log.debug(
+                'reloading types changed since serial %s', cache.serial)
+            registry = self._load_changed_types(cache.registry, cache.serial)
+        else:
+            registry = None
+
+        if registry is None:
+            registry = TypeRegistry()
+            for type_id, bases, attrs in self.get_type_hierarchy():
+                self._load_type(registry, type_id, bases, attrs)
+                registry._types_in_db.add(type_id)
+
+        self.type_registry = registry
+
+        self._set_type_registry_cache(TypeRegistryCacheEntry(
+            registry=self.type_registry.clone(),
+            version=current_version,
+            serial=current_serial,
+            validated_at=time.time(),
+        ))
 
-                # static types also get loaded into dynamic registry
-                # to allow them to be augmented
-                if registry.is_static_type(cls):
-                    cls = None
-            except UnknownType:
+    def _load_type(self, registry, type_id, bases, attrs):
+        try:
+            cls = registry.get_class_by_id(type_id)
+
+            # static types also get loaded into dynamic registry
+            # to allow them to be augmented
+            if registry.is_static_type(cls):
                 cls = None
+        except UnknownType:
+            cls = None
 
-            if cls is None:
-                bases = tuple(registry.get_class_by_id(base) for base in bases)
-                registry.create_type(str(type_id), bases, attrs)
+        if cls is None:
+            bases = tuple(registry.get_class_by_id(base) for base in bases)
+            registry.create_type(str(type_id), bases, attrs)
 
-            registry._types_in_db.add(type_id)
+    def _load_changed_types(self, cached_registry, since_serial):
+        """ Return a copy of ``cached_registry`` in which only the types
+        stamped after ``since_serial`` (and their subtypes) are reloaded.
+        Unchanged dynamic types are reused.
 
-        Manager._type_registry_cache = (
-            self.type_registry.clone(),
-            current_version
-        )
+        Returns None if types were invalidated without being stamped after
+        ``since_serial``, since the changed types can't be determined.
+        """
+        stamps, unstamped_serial = self._backend.get_type_stamps()
+        if unstamped_serial is not None and unstamped_serial > since_serial:
+            return None
+
+        types_in_db = cached_registry._types_in_db
+        deleted = types_in_db.difference(stamps)
+        candidates = [
+            type_id for type_id, stamp in stamps.items()
+            if type_id not in types_in_db or stamp > since_serial
+        ]
+
+        # types are stamped when they may have changed, e.g. all bases of
+        # a type are stamped when the type is saved, so check which ones
+        # actually did
+        changed = set(deleted)
+        definitions = {}
+        for type_id, bases, attrs in self._get_type_definitions(candidates):
+            if self._type_definition_changed(
+                    cached_registry, type_id, bases, attrs):
+                changed.add(type_id)
+                definitions[type_id] = (type_id, bases, attrs)
+
+        # subtypes of changed types need to be recreated with the new bases
+        reload_ids = set(definitions)
+        dynamic_descriptors = cached_registry._dynamic_descriptors
+        for type_id, descriptor in dynamic_descriptors.items():
+            if type_id in changed:
+                continue
+            mro_ids = set(get_type_id(cls) for cls in descriptor.cls.__mro__)
+            if mro_ids.intersection(changed):
+                reload_ids.add(type_id)
+
+        missing_ids = reload_ids.difference(definitions).difference(deleted)
+        for entry in self._get_type_definitions(missing_ids):
+            definitions[entry[0]] = entry
+
+        registry = cached_registry.clone()
+        for type_id in reload_ids.union(deleted):
+            registry.unregister(type_id)
+
+        for type_id, bases, attrs in sort_type_hierarchy(
+                definitions.values()):
+            self._load_type(registry, type_id, bases, attrs)
+
+        registry._types_in_db = set(stamps)
+        return registry
+
+    def _type_definition_changed(self, registry, type_id, bases, attrs):
+        """ Determine whether the definition of a type as loaded from the
+        database differs from the dynamic type in ``registry``
+        """
+        try:
+            descriptor = registry._dynamic_descriptors[type_id]
+        except KeyError:
+            return True
+
+        # types without bases in the database are created with
+        # bases == (object,)
+        cls = descriptor.cls
+        cached_bases = tuple(
+            get_type_id(base) for base in cls.__bases__ if base is not object)
+        if cached_bases != bases:
+            return True
+
+        cached_attrs = descriptor.declared_class_attributes.copy()
+        cached_attrs.update(descriptor.declared_attributes)
+        if set(cached_attrs) != set(attrs):
+            return True
+
+        for name, value in attrs.items():
+            cached_value = cached_attrs[name]
+            if isinstance(value, AttributeBase):
+                if not isinstance(cached_value, AttributeBase):
+                    return True
+                value = registry.object_to_dict(value)
+                cached_value = registry.object_to_dict(cached_value)
+            if value != cached_value:
+                return True
+
+        return False
 
     def _get_changes(self, persistable):
         changes = {}
@@ -214,30 +1742,28 @@ class Manager(object):
                 # not stored in the db; must be static
                 return None, {}
 
-            query = """
-                MATCH
-                    {}
-                OPTIONAL MATCH
-                    (attr)-[:DECLAREDON*0..]->(cls)
-                RETURN
-                    cls, collect(attr.name)
-            """.format(get_match_clause(persistable, 'cls', registry))
-
-            # don't use self.query since we don't want to convert the py2neo
-            # node into an object
-            rows = self._execute(query)
-            cls_node, attrs = next(rows, (None, None))
-
-            if cls_node is None:
+            # don't use self.get since we don't want to convert the
+            # type properties into an object
+            cls_properties, attrs = self._backend.get_type(
+                get_type_id(persistable))
+
+            if cls_properties is None:
                 # have not found the cls
                 return None, {}
 
-            existing_cls_attrs = cls_node._properties
+            # internal attributes, such as change stamps, are managed
+            # by the manager and are not part of the class definition
+            existing_cls_attrs = dict(
+                (key, value) for key, value in cls_properties.items()
+                if key not in INTERNAL_CLASS_ATTRS
+            )
 
             # Make sure we get a clean view of current data.
             registry.refresh_type(persistable)
 
             new_cls_attrs = registry.object_to_dict(persistable)
+            for internal_attr in INTERNAL_CLASS_ATTRS:
+                new_cls_attrs.pop(internal_attr, None)
 
             # If any existing keys in "new" are missing in "old", add `None`s.
             # Unlike instance attributes, we just need to remove the properties
@@ -271,13 +1797,9 @@ class Manager(object):
             existing = registry.get_descriptor_by_id(type_id).cls
         else:
             try:
-                query = 'MATCH {} RETURN obj'.format(
-                    get_match_clause(persistable, 'obj', registry)
-                )
+                existing = self._get_existing(persistable)
             except NoUniqueAttributeError:
                 existing = None
-            else:
-                existing = self.query_single(query)
 
             if existing is not None:
                 existing_props = registry.object_to_dict(existing)
@@ -290,93 +1812,187 @@ class Manager(object):
 
         return existing, changes
 
-    def _update_types(self, cls):
-        query, objects, query_args = get_create_types_query(
-            cls, self.type_system.id, self.type_registry)
+    def _get_relationship_lookups(self, rel):
+        """ Return the node lookups (see ``get_node_lookup``) of the start
+        and end of the relationship ``rel``.
+        """
+        if rel.start is None or rel.end is None:
+            raise NoUniqueAttributeError(
+                "{} is missing a start or end node".format(rel)
+            )
+
+        registry = self.type_registry
+        return (
+            get_node_lookup(rel.start, registry),
+            get_node_lookup(rel.end, registry),
+        )
 
-        self._execute(query, **query_args)
+    def _get_existing(self, obj):
+        """ Return the stored version of the instance or relationship
+        ``obj``, looked up by its unique attributes (or its start and end
+        nodes), or None.
+        """
+        if isinstance(obj, Relationship):
+            start, end = self._get_relationship_lookups(obj)
+            relationship = self._backend.get_relationship(
+                start, get_neo4j_relationship_name(type(obj)), end)
+            if relationship is None:
+                return None
+            return self._convert_relationship(relationship)
+
+        properties = self._backend.get_node(
+            get_node_lookup(obj, self.type_registry))
+        if properties is None:
+            return None
+        return self._convert_node(properties)
+
+    def _update_types(self, classes):
+        """ Create or update the type hierarchies of all ``classes`` in a
+        single statement, followed by a single batch of constraints and one
+        type system invalidation.
+        """
+        objects = self._backend.save_types(
+            classes, self.type_system.id, self.type_registry)
+        Manager.expire_type_registry_cache(self._backend.key)
 
+        constraints = []
         for obj in objects:
-            type_id = get_type_id(obj)
-            self.type_registry._types_in_db.add(type_id)
-            type_constraints = self.type_registry.get_constraints_for_type(obj)
-            for constraint_type_id, constraint_attr_name in type_constraints:
-                self.query(
-                    """
-                        CREATE CONSTRAINT ON (type:{type_id})
-                        ASSERT type.{attr_name} IS UNIQUE
-                    """.format(
-                        type_id=constraint_type_id,
-                        attr_name=constraint_attr_name,
-                    )
-                )
+            self.type_registry._types_in_db.add(get_type_id(obj))
+            constraints.extend(
+                self.type_registry.get_constraints_for_type(obj))
+
+        # can't be combined with saving the types: "Cannot perform data
+        # updates in a transaction that has performed schema updates"
+        self._ensure_constraints(constraints)
+
+    def _get_schema_constraints(self):
+        """ Return the set of (label, attr name) unique constraints that
+        exist in the database, reading the schema only on first use for
+        each backend key.
+        """
+        key = self._backend.key
+        constraints = Manager._schema_constraints.get(key)
+        if constraints is None:
+            constraints = self._backend.get_unique_constraints()
+            Manager._schema_constraints[key] = constraints
+        return constraints
+
+    def _ensure_constraints(self, constraints):
+        """ Create those of the given (label, attr name) unique
+        ``constraints`` that don't exist yet, in a single batch.
+        """
+        existing = self._get_schema_constraints()
 
-        # we can't tell whether the CREATE UNIQUE from get_create_types_query
-        # will have any effect, so we must invalidate.
-        self.invalidate_type_system()
-        return cls
+        missing = set(constraints) - existing
+        if not missing:
+            return
 
-    def _update(self, persistable, existing, changes):
+        self._backend.create_unique_constraints(sorted(missing))
+        existing.update(missing)
 
+    def _delete_stale_declared_attributes(self, classes):
+        """ Delete stored attributes of ``classes`` that are no longer
+        declared on them.
+        """
         registry = self.type_registry
 
-        set_clauses = ', '.join([
-            'n.%s={%s}' % (key, key) for key, value in changes.items()
-            if not isinstance(value, dict)
-        ])
+        declared = []
+        for cls in classes:
+            type_id = get_type_id(cls)
+            descriptor = registry.get_descriptor(cls)
+            for attr_name in descriptor.declared_attributes:
+                declared.append('{}.{}'.format(type_id, attr_name))
+
+        self._backend.delete_declared_attributes(
+            map(get_type_id, classes), declared)
+
+    def _get_changed_type_ids(self, rel):
+        """ Return the ids of the types affected by adding or removing the
+        type-hierarchy relationship ``rel``, including subtypes, which
+        inherit the change.
+        """
+        type_ids = get_related_type_ids(rel)
+        for end in (rel.start, rel.end):
+            if isinstance(end, PersistableType):
+                type_ids.extend(self._get_subtype_ids(end))
+        return type_ids
+
+    def _get_labels_for_type(self, cls):
+        """ Return the set of labels instances of ``cls`` are stored with.
+        See ``ancestor_labels``.
+        """
+        registry = self.type_registry
 
-        if set_clauses:
-            set_clauses = 'SET %s' % set_clauses
-        else:
-            set_clauses = ''
+        labels = set(registry.get_labels_for_type(cls))
+        if self.ancestor_labels:
+            labels.update(registry.get_ancestor_labels_for_type(cls))
+        return labels
 
-        if isinstance(persistable, type):
+    def _get_subtype_ids(self, cls):
+        """ Return the ids of all known (strict) subtypes of ``cls``.
+        """
+        descendant_ids = self.type_registry.get_descendant_ids(cls)
+        return sorted(descendant_ids - set([get_type_id(cls)]))
+
+    def _get_unsaved_types(self, classes):
+        """ Return those of ``classes`` that have not been saved with their
+        current definition, by comparing their fingerprints with the ones
+        stored on their type nodes.
+        """
+        registry = self.type_registry
+
+        fingerprints = {}
+        for cls in classes:
+            # Make sure we get a clean view of current data.
+            registry.refresh_type(cls)
+            fingerprints[get_type_id(cls)] = get_type_fingerprint(
+                cls, registry)
+
+        saved_fingerprints = self._backend.get_type_fingerprints(
+            fingerprints.keys())
+
+        unsaved = []
+        for cls in classes:
+            type_id = get_type_id(cls)
+            if saved_fingerprints.get(type_id) == fingerprints[type_id]:
+                registry._types_in_db.add(type_id)
+            else:
+                unsaved.append(cls)
+        return unsaved
+
+    def _update(self, persistable, existing, changes):
 
-            query_args = {'type_id': get_type_id(persistable)}
-            class_attr_changes = {k: v for k, v in changes.items()
-                                  if k != 'attributes'}
-            query_args.update(class_attr_changes)
+        registry = self.type_registry
 
-            where = []
+        # dicts describe changes of related nodes, i.e. the attributes
+        # declared on a type, rather than of properties
+        property_changes = dict(
+            (key, value) for key, value in changes.items()
+            if not isinstance(value, dict)
+        )
 
+        if isinstance(persistable, type):
             descr = registry.get_descriptor(persistable)
-            for attr_name in descr.declared_attributes.keys():
-                where.append('attr.name = {attr_%s}' % attr_name)
-                query_args['attr_%s' % attr_name] = attr_name
+            self._backend.update_type(
+                get_type_id(persistable), property_changes,
+                descr.declared_attributes.keys())
 
-            if where:
-                where = ' OR '.join(where)
-                where = 'WHERE not(%s)' % where
-            else:
-                where = ''
+            # only invalidate the type system once the type has been
+            # updated, so that other managers can't load a stale version
+            self._update_types([persistable])
 
-            query = join_lines(
-                'MATCH (n:PersistableType)',
-                'WHERE n.id = {type_id}',
-                set_clauses,
-                'WITH n',
-                'MATCH attr -[r:DECLAREDON]-> n',
-                where,
-                'DELETE attr, r',
-                'RETURN n',
-            )
-            self._update_types(persistable)
-        else:
-            match_clause = get_match_clause(existing, 'n', registry)
-            query = join_lines(
-                'MATCH %s' % match_clause,
-                set_clauses,
-                'RETURN n'
-            )
-            query_args = changes
+        elif isinstance(persistable, Relationship):
+            if property_changes:
+                start, end = self._get_relationship_lookups(existing)
+                self._backend.update_relationship(
+                    start, get_neo4j_relationship_name(type(persistable)),
+                    end, property_changes)
 
-        try:
-            (result,) = next(self._execute(query, **query_args))
-        except StopIteration:
-            # this can happen, if no attributes where changed on a type
-            result = persistable
+        elif property_changes:
+            self._backend.update_node(
+                get_node_lookup(existing, registry), property_changes)
 
-        return result
+        return persistable
 
     def _add(self, obj):
         """ Adds an object to the data store.
@@ -386,20 +2002,30 @@ class Manager(object):
         """
 
         type_registry = self.type_registry
-        query_args = {}
-        invalidates_types = False
 
         if isinstance(obj, PersistableType):
             # object is a type; create the type and its hierarchy
-            return self._update_types(obj)
+            self._update_types([obj])
+            return obj
+
+        properties = type_registry.object_to_dict(obj, for_db=True)
 
-        elif isinstance(obj, Relationship):
+        if isinstance(obj, Relationship):
             # object is a relationship
             obj_type = type(obj)
 
             if obj_type in (IsA, DeclaredOn):
-                invalidates_types = True
-            query = get_create_relationship_query(obj, type_registry)
+                changed_type_ids = self._get_changed_type_ids(obj)
+            else:
+                changed_type_ids = None
+
+            start, end = self._get_relationship_lookups(obj)
+            self._backend.create_relationship(
+                start, get_neo4j_relationship_name(obj_type), properties,
+                end, invalidate_type_ids=changed_type_ids)
+
+            if changed_type_ids is not None:
+                Manager.expire_type_registry_cache(self._backend.key)
 
         else:
             # object is an instance
@@ -408,31 +2034,13 @@ class Manager(object):
             if type_id not in type_registry._types_in_db:
                 raise TypeNotPersistedError(type_id)
 
-            labels = type_registry.get_labels_for_type(obj_type)
-            if labels:
-                node_declaration = 'n:' + ':'.join(labels)
-            else:
-                node_declaration = 'n'
-
-            query = """
-                MATCH (cls:PersistableType)
-                WHERE cls.id = {type_id}
-                CREATE (%s {props})-[:INSTANCEOF {rel_props}]->(cls)
-                RETURN n
-            """ % node_declaration
-
-            query_args = {
-                'type_id': get_type_id(obj_type),
-                'rel_props': type_registry.object_to_dict(
+            self._backend.create_instance(
+                sorted(self._get_labels_for_type(obj_type)),
+                properties,
+                type_id,
+                type_registry.object_to_dict(
                     InstanceOf(None, None), for_db=True),
-            }
-
-        query_args['props'] = type_registry.object_to_dict(
-            obj, for_db=True)
-
-        (node_or_rel,) = next(self._execute(query, **query_args))
-        if invalidates_types:
-            self.invalidate_type_system()
+            )
 
         set_store_for_object(obj, self)
         return obj
@@ -441,72 +2049,43 @@ class Manager(object):
         """ Returns the entire type hierarchy defined in the database
         if start_type_id is None, else returns from that type.
 
+        Types are guaranteed to appear after all of their bases.
+        See ``assemble_type_hierarchy`` for how the hierarchy is loaded.
+
         Returns: A generator yielding tuples of the form
         ``(type_id, bases, attrs)`` where
             - ``type_id`` identifies the type
             - ``bases`` lists the type_ids of the type's bases
             - ``attrs`` lists the attributes defined on the type
         """
+        definitions = self._backend.get_type_hierarchy(
+            start_type_id, assemble=self.assemble_type_hierarchy)
+        return (
+            self._parse_type_definition(*definition)
+            for definition in definitions
+        )
 
-        if start_type_id:
-            match = """
-                p = (
-                    (ts:TypeSystem {id: "TypeSystem"})-[:DEFINES]->()<-
-                        [:ISA*]-(opt)<-[:ISA*0..]-(tpe)
-                )
-                WHERE opt.id = {start_id}
-                """
-            query_args = {'start_id': start_type_id}
-        else:
-            match = """
-                p=(
-                    (ts:TypeSystem {id: "TypeSystem"})-[:DEFINES]->()<-
-                        [:ISA*0..]-(tpe)
-                )
-                """
-            query_args = {}
-
-        query = join_lines(
-            'MATCH',
-            match,
-            """
-            WITH tpe, max(length(p)) AS level
-            OPTIONAL MATCH
-                tpe <-[:DECLAREDON*]- attr
-            OPTIONAL MATCH
-                tpe -[isa:ISA]-> base
-
-            WITH tpe.id AS type_id, level, tpe AS class_attrs,
-                filter(
-                    idx_base in collect(DISTINCT [isa.base_index, base.id])
-                    WHERE not(LAST(idx_base) is NULL)
-                ) AS bases,
-
-                collect(DISTINCT attr) AS attrs
-
-            ORDER BY level
-            RETURN type_id, bases, class_attrs, attrs
-            """)
-
-        # we can't use self.query since we don't want to convert the
-        # class_attrs dict
-        params = dict_to_db_values_dict(query_args)
-
-        for row in self._execute(query, **params):
-            type_id, bases, class_attrs, instance_attrs = row
-
-            # the bases are sorted using their index on the IsA relationship
-            bases = tuple(base for (_, base) in sorted(bases))
-            class_attrs = class_attrs._properties
-            for internal_attr in INTERNAL_CLASS_ATTRS:
-                class_attrs.pop(internal_attr)
-            instance_attrs = [self._convert_value(v) for v in instance_attrs]
-            instance_attrs = {attr.name: attr for attr in instance_attrs}
-
-            attrs = class_attrs
-            attrs.update(instance_attrs)
+    def _get_type_definitions(self, type_ids):
+        """ Returns the ``(type_id, bases, attrs)`` tuples, as returned by
+        ``get_type_hierarchy``, for the types with the given ids, in no
+        particular order.
+        """
+        return [
+            self._parse_type_definition(*definition)
+            for definition in self._backend.get_type_definitions(type_ids)
+        ]
+
+    def _parse_type_definition(self, type_id, bases, class_attrs,
+                               instance_attrs):
+        attrs = dict(
+            (key, value) for key, value in class_attrs.items()
+            if key not in INTERNAL_CLASS_ATTRS
+        )
+        for properties in instance_attrs:
+            attr = self._convert_node(properties)
+            attrs[attr.name] = attr
 
-            yield (type_id, bases, attrs)
+        return (type_id, bases, attrs)
 
     def serialize(self, obj, for_db=False):
         """ Serialize ``obj`` to a dictionary.
@@ -566,35 +2145,84 @@ class Manager(object):
         if existing_attrs != base_attrs:
             raise CannotUpdateType("Inherited attributes are not identical")
 
-        match_clauses = [get_match_clause(tpe, 'type', self.type_registry)]
-        create_clauses = []
-        query_args = {}
+        if self.ancestor_labels:
+            relabels = self._get_relabels(tpe, bases)
+        else:
+            relabels = ()
+
+        changed_type_ids = [get_type_id(tpe)] + self._get_subtype_ids(tpe)
+        found = self._backend.update_type_bases(
+            get_type_id(tpe), map(get_type_id, bases), changed_type_ids,
+            relabels=relabels)
+        Manager.expire_type_registry_cache(self._backend.key)
+        if not found:
+            raise CannotUpdateType("Type or bases not found in the database.")
 
-        for index, base in enumerate(bases):
-            name = 'base_{}'.format(index)
-            match = get_match_clause(base, name, self.type_registry)
-            create = "type -[:ISA {%s_props}]-> %s" % (name, name)
+        self.reload_types()
 
-            query_args["{}_props".format(name)] = {'base_index': index}
-            match_clauses.append(match)
-            create_clauses.append(create)
+    def _get_relabels(self, tpe, bases):
+        """ Return the (type_id, removed labels, added labels) tuples (see
+        ``Neo4jBackend.relabel_instances``) updating the ancestor labels
+        (see ``ancestor_labels``) of the instances of ``tpe`` and its
+        subtypes, for when the bases of ``tpe`` are changed to ``bases``.
+        """
+        registry = self.type_registry
 
-        query = join_lines(
-            "MATCH",
-            (match_clauses, ','),
-            ", type -[r:ISA]-> ()",
-            "DELETE r",
-            "CREATE",
-            (create_clauses, ','),
-            "RETURN type")
+        affected = [tpe] + [
+            registry.get_class_by_id(type_id)
+            for type_id in self._get_subtype_ids(tpe)
+        ]
+        # a subclass always has a longer mro than any of its bases, so
+        # the new ancestors of each type's bases are known before its own
+        affected.sort(key=lambda cls: len(cls.__mro__))
+
+        new_ancestors = {}
+        relabels = []
+        for cls in affected:
+            if cls is tpe:
+                cls_bases = bases
+            else:
+                cls_bases = cls.__bases__
+
+            ancestors = set([get_type_id(cls)])
+            for base in cls_bases:
+                if base in new_ancestors:
+                    ancestors.update(new_ancestors[base])
+                else:
+                    ancestors.update(
+                        registry.get_ancestor_labels_for_type(base))
+            new_ancestors[cls] = ancestors
+
+            old_labels = self._get_labels_for_type(cls)
+            removed_labels = old_labels - ancestors
+            added_labels = ancestors - old_labels
+            if removed_labels or added_labels:
+                relabels.append(
+                    (get_type_id(cls), removed_labels, added_labels))
+
+        return relabels
+
+    def add_ancestor_labels(self, cls):
+        """ Label all instances of ``cls`` and its subtypes with each of
+        their ancestor types, e.g. before enabling ``ancestor_labels`` for
+        a database with existing instances.
 
-        try:
-            next(self._execute(query, **query_args))
-            self.invalidate_type_system()
-        except StopIteration:
-            raise CannotUpdateType("Type or bases not found in the database.")
+        Args:
+            cls: The type to label instances of.
 
-        self.reload_types()
+        Returns:
+            The number of instances labelled.
+        """
+        registry = self.type_registry
+
+        type_ids = [get_type_id(cls)] + self._get_subtype_ids(cls)
+
+        relabels = [
+            (type_id, (), registry.get_ancestor_labels_for_type(
+                registry.get_class_by_id(type_id)))
+            for type_id in type_ids
+        ]
+        return sum(self._backend.relabel_instances(relabels))
 
     def save(self, persistable):
         """ Stores the given ``persistable`` in the graph database.
@@ -604,6 +2232,10 @@ class Manager(object):
         if not isinstance(persistable, Persistable):
             raise TypeError('cannot persist %s' % persistable)
 
+        if isinstance(persistable, PersistableType):
+            if not self._get_unsaved_types([persistable]):
+                return persistable
+
         existing, changes = self._get_changes(persistable)
 
         if existing is None:
@@ -612,18 +2244,45 @@ class Manager(object):
         # we always want relationships to go through, even if there
         # are no changes in the properties, e.g. start or end have changed
         elif not changes and not isinstance(persistable, Relationship):
+            if isinstance(persistable, PersistableType):
+                # the stored fingerprint is missing or stale, but the type
+                # is unchanged; store the current one so that the next save
+                # is a single lookup again
+                self._store_type_fingerprint(persistable)
             return persistable
         else:
             return self._update(persistable, existing, changes)
 
+    def _store_type_fingerprint(self, cls):
+        """ Store the fingerprint of the current definition of ``cls`` on
+        its type node, without invalidating the type system.
+        """
+        registry = self.type_registry
+        type_id = get_type_id(cls)
+
+        self._backend.set_type_fingerprint(
+            type_id, get_type_fingerprint(cls, registry))
+        registry._types_in_db.add(type_id)
+
     def save_collected_classes(self, collection):
+        """ Register and store all classes of the given ``collection``,
+        e.g. as gathered by ``kaiso.types.collector``.
+
+        All changed classes are stored in a single statement, so shared
+        bases are only merged once and the type system is only invalidated
+        once.
+        """
         classes = collection.values()
 
         for cls in classes:
             self.type_registry.register(cls)
 
-        for cls in classes:
-            self.save(cls)
+        unsaved = self._get_unsaved_types(classes)
+        if not unsaved:
+            return
+
+        self._delete_stale_declared_attributes(unsaved)
+        self._update_types(unsaved)
 
     def get(self, cls, **attr_filter):
         attr_filter = dict_to_db_values_dict(attr_filter)
@@ -650,18 +2309,76 @@ class Manager(object):
                 ' with filter {}'.format(cls, attr_filter)
             )
 
-        labels = type_registry.get_labels_for_type(cls)
         # since we found an index, we have at least one label
-        node_declaration = 'n:' + ':'.join(labels)
+        labels = tuple(sorted(type_registry.get_labels_for_type(cls)))
+
+        properties = self._backend.get_node((labels, attr_filter))
+        if properties is None:
+            return None
+        return self._convert_node(properties)
+
+    def update_where(self, cls, filters, chunk_size=1000, **new_values):
+        """ Set the given attribute values on all instances of ``cls``
+        (including instances of its subtypes) whose attributes equal the
+        given ``filters``, without loading them.
+
+        Values are encoded and validated like ``save`` does. Setting an
+        attribute to None removes it. Instances are updated in chunks,
+        each in its own transaction.
+
+        Args:
+            cls: The type to update instances of.
+            filters: A dict of attribute values of the instances to update.
+            chunk_size: (Optional) The maximum number of instances updated
+                per transaction.
+            new_values: The attribute values to set.
+
+        Returns:
+            The number of instances updated.
+        """
+        descriptor = self.type_registry.get_descriptor(cls)
+
+        values = {}
+        for attr_name, value in sorted(new_values.items()):
+            attr = descriptor.attributes.get(attr_name)
+            if attr is None:
+                raise ValueError(
+                    "{} has no attribute {}".format(cls, attr_name))
+
+            value = attr.to_primitive(value, for_db=True)
+            if value is not None:
+                # check that to_python will work, as object_to_dict does
+                try:
+                    attr.to_python(value)
+                except ValueError as ex:
+                    raise ValueError(
+                        "{!r} is not a valid value for {}: {}".format(
+                            new_values[attr_name], type(attr), ex
+                        )
+                    )
+            values[attr_name] = value
+
+        if not values:
+            return 0
+
+        # only instances that haven't been updated yet are updated again,
+        # so that each chunk makes progress
+        updated = 0
+        while True:
+            count = self._backend.update_instances(
+                cls, filters, values, chunk_size,
+                ancestor_labels=self.ancestor_labels)
+            updated += count
+            if count < chunk_size:
+                break
 
-        params = parameter_map(attr_filter, 'params')
-        return self.query_single(
-            "MATCH (%s %s) RETURN n" % (node_declaration, params),
-            params=attr_filter)
+        return updated
 
-    def get_by_unique_attr(self, cls, attr_name, values):
+    def get_by_unique_attr(self, cls, attr_name, values, chunk_size=1000):
         """Bulk load entities from a list of values for a unique attribute
 
+        Values are looked up with a batch request per ``chunk_size`` values.
+
         Returns:
             A generator (obj1, obj2, ...) corresponding to the `values` list
 
@@ -677,25 +2394,66 @@ class Manager(object):
         else:
             raise ValueError("{}.{} is not unique".format(cls, attr_name))
 
-        type_id = get_type_id(cls)
-        query = "MATCH (n:%(label)s {%(attr)s: {id}}) RETURN n" % {
-            'label': type_id,
-            'attr': attr_name,
-        }
-        batch = neo4j.ReadBatch(self._conn)
-        for value in values:
-            db_value = object_to_db_value(value)
-            batch.append_cypher(query, params={'id': db_value})
+        labels = (get_type_id(cls),)
+        lookups = [
+            (labels, {attr_name: object_to_db_value(value)})
+            for value in values
+        ]
 
-        # When upgrading to py2neo 1.6, consider changing this to batch.stream
-        batch_result = batch.submit()
+        nodes = self._map_chunks(self._backend.get_nodes, lookups, chunk_size)
 
-        # `batch_result` is a list of either one element lists (for matches)
-        # or empty lists. Unpack to flatten (and hydrate to Kaiso objects)
-        result = (self._convert_value(row) for row in batch_result)
+        # hydrate to Kaiso objects, keeping None for missing values
+        result = (
+            None if properties is None else self._convert_node(properties)
+            for properties in nodes
+        )
 
         return result
 
+    def create_relationships(self, relationships, chunk_size=1000):
+        """ Create many relationships, sending a single batch request per
+        chunk rather than a lookup and a create query per relationship.
+
+        Start and end nodes are looked up by their unique attributes via
+        query parameters, so relationships of the same type between nodes
+        with the same labels share one query. Unlike ``save``, existing
+        relationships are not looked up, i.e. a new relationship is always
+        created.
+
+        Type hierarchy relationships (IsA, DeclaredOn) are rejected, as
+        chunks are committed separately from the type system invalidation;
+        save them with ``save``.
+
+        Args:
+            relationships: The relationships to create.
+            chunk_size: (Optional) The maximum number of relationships
+                created per request.
+
+        Returns:
+            A list of booleans corresponding to ``relationships``, which
+            are False for relationships whose start or end node could not
+            be found.
+        """
+        registry = self.type_registry
+
+        rel_tuples = []
+        for rel in relationships:
+            if not isinstance(rel, Relationship):
+                raise TypeError('cannot persist %s' % rel)
+            if type(rel) in (IsA, DeclaredOn):
+                raise TypeError('cannot bulk create %s' % rel)
+
+            start, end = self._get_relationship_lookups(rel)
+            rel_tuples.append((
+                start,
+                get_neo4j_relationship_name(type(rel)),
+                registry.object_to_dict(rel, for_db=True),
+                end,
+            ))
+
+        return self._map_chunks(
+            self._backend.create_relationships, rel_tuples, chunk_size)
+
     def change_instance_type(self, obj, type_id, updated_values=None):
         if updated_values is None:
             updated_values = {}
@@ -717,70 +2475,189 @@ class Manager(object):
 
         rel_props = type_registry.object_to_dict(InstanceOf(), for_db=True)
 
-        old_labels = set(type_registry.get_labels_for_type(old_type))
-        new_labels = set(type_registry.get_labels_for_type(new_type))
-        removed_labels = old_labels - new_labels
-        added_labels = new_labels - old_labels
+        old_labels = self._get_labels_for_type(old_type)
+        new_labels = self._get_labels_for_type(new_type)
 
-        if removed_labels:
-            remove_labels_statement = 'REMOVE obj:' + ':'.join(removed_labels)
-        else:
-            remove_labels_statement = ''
+        new_properties = self._backend.set_instance_type(
+            get_node_lookup(obj, type_registry), type_id, properties,
+            rel_props, old_labels - new_labels, new_labels - old_labels)
 
-        if added_labels:
-            add_labels_statement = 'SET obj :' + ':'.join(added_labels)
-        else:
-            add_labels_statement = ''
+        if new_properties is None:
+            raise NoResultFound(
+                "{} not found in db".format(repr(obj))
+            )
 
-        match_clauses = (
-            get_match_clause(obj, 'obj', type_registry),
-            get_match_clause(new_type, 'type', type_registry)
-        )
+        return self._convert_node(new_properties)
 
-        query = join_lines(
-            'MATCH',
-            (match_clauses, ','),
-            ', (obj)-[old_rel:INSTANCEOF]->()',
-            'DELETE old_rel',
-            'CREATE (obj)-[new_rel:INSTANCEOF {rel_props}]->(type)',
-            'SET obj={properties}',
-            remove_labels_statement,
-            add_labels_statement,
-            'RETURN obj',
+    def _get_type_change(self, old_type, new_type, updated_values):
+        """ Return the ``InstanceTypeChange`` that turns a stored instance
+        of ``old_type`` into an instance of ``new_type``, like
+        ``change_instance_type`` does, but without loading the instance.
+
+        Attributes not supported by ``new_type`` are removed, and
+        ``updated_values`` for attributes it does support are set.
+        Attributes only ``new_type`` has are set to their defaults, if
+        they have one that isn't generated per instance.
+
+        Raises ValueError if an attribute of both types has a different
+        type in each, or if an updated value is invalid.
+        """
+        registry = self.type_registry
+
+        old_attrs = registry.get_descriptor(old_type).attributes
+        new_attrs = registry.get_descriptor(new_type).attributes
+
+        values = {}
+        defaults = {}
+        for attr_name, attr in sorted(new_attrs.items()):
+            old_attr = old_attrs.get(attr_name)
+            if old_attr is not None and type(old_attr) is not type(attr):
+                raise ValueError(
+                    "{} is a {} on {} but a {} on {}".format(
+                        attr_name, type(old_attr), old_type,
+                        type(attr), new_type,
+                    )
+                )
+
+            if attr_name in updated_values:
+                value = updated_values[attr_name]
+                try:
+                    attr.to_python(value)
+                except ValueError as ex:
+                    raise ValueError(
+                        "{!r} is not a valid value for {}: {}".format(
+                            value, type(attr), ex
+                        )
+                    )
+                values[attr_name] = value
+            elif (
+                old_attr is None and
+                isinstance(attr, DefaultableAttribute) and
+                attr.default is not None
+            ):
+                defaults[attr_name] = attr.to_primitive(
+                    attr.default, for_db=True)
+
+        old_labels = self._get_labels_for_type(old_type)
+        new_labels = self._get_labels_for_type(new_type)
+
+        return InstanceTypeChange(
+            type_id=get_type_id(new_type),
+            rel_properties=registry.object_to_dict(InstanceOf(), for_db=True),
+            values=values,
+            defaults=defaults,
+            removed_attrs=set(old_attrs) - set(new_attrs),
+            removed_labels=old_labels - new_labels,
+            added_labels=new_labels - old_labels,
         )
 
-        new_obj = self.query_single(
-            query, properties=properties, rel_props=rel_props)
+    def _check_type_persisted(self, type_id):
+        """ Return the type with the given ``type_id``, raising
+        TypeNotPersistedError unless it has been saved.
+        """
+        if type_id not in self.type_registry._types_in_db:
+            raise TypeNotPersistedError(type_id)
+        return self.type_registry.get_class_by_id(type_id)
 
-        if new_obj is None:
-            raise NoResultFound(
-                "{} not found in db".format(repr(obj))
-            )
+    def change_instance_types(self, objects, type_id, updated_values=None,
+                              chunk_size=1000):
+        """ Change the type of many instances to the type with the given
+        ``type_id``, sending a single batch request per chunk.
 
-        set_store_for_object(new_obj, self)
-        return new_obj
+        Unlike ``change_instance_type``, instances aren't loaded and
+        re-serialized. Instead, the required label and property changes
+        are computed once per original type, and applied to the stored
+        instances, so the values of ``objects`` other than their unique
+        attributes are ignored.
 
-    def get_related_objects(self, rel_cls, ref_cls, obj):
+        Args:
+            objects: The instances to change the type of.
+            type_id: The id of the type to change them to.
+            updated_values: (Optional) A dict of attribute values to set
+                on all instances. Attributes unsupported by the new type
+                are ignored.
+            chunk_size: (Optional) The maximum number of instances changed
+                per request.
+
+        Returns:
+            The number of instances whose type was changed.
+        """
+        if updated_values is None:
+            updated_values = {}
 
-        if ref_cls is Outgoing:
-            rel_query = '(n)-[relation:{}]->(related)'
-        elif ref_cls is Incoming:
-            rel_query = '(n)<-[relation:{}]-(related)'
+        new_type = self._check_type_persisted(type_id)
+        registry = self.type_registry
 
-        # TODO: should get the rel name from descriptor?
-        rel_query = rel_query.format(get_neo4j_relationship_name(rel_cls))
+        type_changes = {}
+        changes = []
+        for obj in objects:
+            old_type = type(obj)
+            if old_type not in type_changes:
+                type_changes[old_type] = self._get_type_change(
+                    old_type, new_type, updated_values)
 
-        query = join_lines(
-            'MATCH {idx_lookup}, {rel_query}'
-            'RETURN related, relation'
-        )
+            changes.append(
+                (get_node_lookup(obj, registry), type_changes[old_type]))
+
+        return sum(self._map_chunks(
+            self._backend.change_instance_types, changes, chunk_size))
+
+    def change_instance_type_where(self, cls, type_id, updated_values=None,
+                                   chunk_size=1000, **filters):
+        """ Change the type of all direct instances of ``cls`` whose
+        attributes equal the given ``filters`` to the type with the given
+        ``type_id``.
+
+        Instances are changed in chunks, each in its own transaction, as
+        done by ``change_instance_types``.
+
+        Args:
+            cls: The type to change instances of. Instances of subtypes
+                are not changed.
+            type_id: The id of the type to change them to.
+            updated_values: (Optional) A dict of attribute values to set
+                on all instances. Attributes unsupported by the new type
+                are ignored.
+            chunk_size: (Optional) The maximum number of instances changed
+                per transaction.
+            filters: Attribute values of the instances to change.
+
+        Returns:
+            The number of instances whose type was changed.
+        """
+        if updated_values is None:
+            updated_values = {}
+
+        new_type = self._check_type_persisted(type_id)
+        if new_type is cls:
+            return 0
+
+        change = self._get_type_change(cls, new_type, updated_values)
+
+        changed = 0
+        while True:
+            count = self._backend.change_instance_types_where(
+                cls, filters, change, chunk_size)
+            changed += count
+            if count < chunk_size:
+                break
+
+        return changed
 
-        query = query.format(
-            idx_lookup=get_match_clause(obj, 'n', self.type_registry),
-            rel_query=rel_query
+    def get_related_objects(self, rel_cls, ref_cls, obj):
+
+        # TODO: should get the rel name from descriptor?
+        related = self._backend.get_related(
+            get_node_lookup(obj, self.type_registry),
+            get_neo4j_relationship_name(rel_cls),
+            outgoing=ref_cls is Outgoing,
         )
 
-        return self.query(query)
+        return (
+            (self._convert_node(properties),
+             self._convert_relationship(relationship))
+            for properties, relationship in related
+        )
 
     def delete(self, obj):
         """ Deletes an object from the store.
@@ -791,56 +2668,107 @@ class Manager(object):
         Returns:
             A tuple: with (number of nodes removed, number of rels removed)
         """
-        invalidates_types = False
+        registry = self.type_registry
 
         if isinstance(obj, Relationship):
-            query = join_lines(
-                'MATCH {}, {},',
-                'n1 -[rel]-> n2',
-                'DELETE rel',
-                'RETURN 0, count(rel)'
-            ).format(
-                get_match_clause(obj.start, 'n1', self.type_registry),
-                get_match_clause(obj.end, 'n2', self.type_registry),
-            )
-            rel_type = type(obj)
-            if rel_type in (IsA, DeclaredOn):
-                invalidates_types = True
+            if type(obj) in (IsA, DeclaredOn):
+                changed_type_ids = self._get_changed_type_ids(obj)
+            else:
+                changed_type_ids = None
+
+            start, end = self._get_relationship_lookups(obj)
+            rel_count = self._backend.delete_relationships(
+                start, end, invalidate_type_ids=changed_type_ids)
+
+            if changed_type_ids is not None:
+                Manager.expire_type_registry_cache(self._backend.key)
+            return 0, rel_count
 
         elif isinstance(obj, PersistableType):
-            query = join_lines(
-                'MATCH {}',
-                'OPTIONAL MATCH attr -[:DECLAREDON]-> obj',
-                'DELETE attr',
-                'WITH obj',
-                'MATCH obj -[rel]- ()',
-                'DELETE obj, rel',
-                'RETURN count(obj), count(rel)'
-            ).format(
-                get_match_clause(obj, 'obj', self.type_registry)
-            )
-            invalidates_types = True
-        else:
-            query = join_lines(
-                'MATCH {},',
-                'obj -[rel]- ()',
-                'DELETE obj, rel',
-                'RETURN count(obj), count(rel)'
-            ).format(
-                get_match_clause(obj, 'obj', self.type_registry)
-            )
+            # subtypes inherit from the deleted type, so their fingerprints
+            # no longer describe what is stored. deleted types are picked up
+            # by other managers without stamps
+            result = self._backend.delete_type(
+                get_type_id(obj), self._get_subtype_ids(obj))
+            Manager.expire_type_registry_cache(self._backend.key)
+            return result
 
         # TODO: delete node/rel from indexes
-        res = next(self._execute(query))
-        if invalidates_types:
-            self.invalidate_type_system()
-        return res
+        return self._backend.delete_node(get_node_lookup(obj, registry))
+
+    def delete_many(self, objects, chunk_size=1000):
+        """ Deletes many instances, along with all of their relationships,
+        sending a single batch request per chunk.
+
+        Unlike ``delete``, instances without any relationships are deleted
+        too. Types and relationships can't be deleted with this method.
+
+        Args:
+            objects: The instances to delete.
+            chunk_size: (Optional) The maximum number of instances deleted
+                per request.
+
+        Returns:
+            A tuple: with (number of nodes removed, number of rels removed)
+        """
+        registry = self.type_registry
 
-    def query(self, query, **params):
+        lookups = []
+        for obj in objects:
+            if isinstance(obj, (PersistableType, Relationship)):
+                raise TypeError('cannot bulk delete %s' % obj)
+            lookups.append(get_node_lookup(obj, registry))
+
+        results = self._map_chunks(
+            self._backend.delete_nodes, lookups, chunk_size)
+
+        node_count = rel_count = 0
+        for nodes, rels in results:
+            node_count += nodes
+            rel_count += rels
+
+        return node_count, rel_count
+
+    def delete_where(self, cls, chunk_size=1000, **filters):
+        """ Deletes all instances of ``cls`` (including instances of its
+        subtypes) whose attributes equal the given ``filters``, along with
+        all of their relationships.
+
+        Instances are deleted in chunks, each in its own transaction, so
+        that deleting large numbers of them doesn't build up a huge
+        transaction on the server.
+
+        Args:
+            cls: The type to delete instances of.
+            chunk_size: (Optional) The maximum number of instances deleted
+                per transaction.
+            filters: Attribute values of the instances to delete.
+
+        Returns:
+            A tuple: with (number of nodes removed, number of rels removed)
+        """
+        node_count = rel_count = 0
+        while True:
+            nodes, rels = self._backend.delete_instances(
+                cls, filters, chunk_size,
+                ancestor_labels=self.ancestor_labels)
+            node_count += nodes
+            rel_count += rels
+            if nodes < chunk_size:
+                break
+
+        return node_count, rel_count
+
+    def query(self, query, as_dicts=False, **params):
         """ Queries the store given a parameterized cypher query.
 
         Args:
             query: A parameterized cypher query.
+            as_dicts: (Optional) If True, nodes and relationships are
+                returned as plain property dicts (including ``__type__``)
+                instead of being hydrated into objects. This skips the type
+                registry entirely, which is considerably cheaper for queries
+                that only need the raw data.
             params: query: A parameterized cypher query.
 
         Returns:
@@ -848,13 +2776,19 @@ class Manager(object):
 
         WARNING: If you use this method to modify the type hierarchy (i.e.
         types, their declared attributes or their relationships), ensure
-        to call ``manager.invalidate_type_hierarchy()`` afterwards.
-        Otherwise managers will continue to use cached versions. Instances can
+        to call ``manager.invalidate_type_system()`` afterwards.
+        Otherwise managers will continue to use cached versions. Pass the ids
+        of the changed types as ``type_ids`` to let other managers reload
+        only those types instead of the entire type hierarchy. Instances can
         be modified without changing the type hierarchy.
         """
         params = dict_to_db_values_dict(params)
         result = self._execute(query, **params)
 
+        if as_dicts:
+            convert = self._convert_value_to_dict
+            return (tuple(convert(value) for value in row) for row in result)
+
         return (tuple(self._convert_row(row)) for row in result)
 
     def query_single(self, query, **params):
@@ -871,19 +2805,74 @@ class Manager(object):
             WARNING: This will destroy everything in your Neo4j database.
 
         """
-        self._conn.clear()
+        key = self._backend.key
+        Manager._initialised_databases.discard(key)
+        Manager._schema_constraints.pop(key, None)
+        Manager.expire_type_registry_cache(key)
+        self._backend.clear()
         # NB. we assume all indexes are from constraints (only use-case for
         # kaiso) if any aren't, this will not work
-        batch = neo4j.WriteBatch(self._conn)
-        for label in self._conn.node_labels:
-            for key in self._conn.schema.get_indexed_property_keys(label):
-                batch.append_cypher(
-                    """
-                        DROP CONSTRAINT ON (type:{type_id})
-                        ASSERT type.{attr_name} IS UNIQUE
-                    """.format(
-                        type_id=label,
-                        attr_name=key,
-                    )
-                )
-        batch.run()
+        self._backend.drop_unique_constraints(
+            self._backend.get_unique_constraints())
+
+
+class TypeSystemPoller(object):
+    """ Keeps the cached type registry up to date from a background thread.
+
+    Every ``interval`` seconds, the type system version is checked and the
+    cached type registry is reloaded if it has changed. Combined with a
+    ``type_cache_ttl`` larger than ``interval``, managers in this process
+    can use the cached type registry without checking the version
+    themselves.
+
+    Usage:
+        poller = TypeSystemPoller(uri, interval=5, on_change=callback)
+        poller.start()
+        ...
+        poller.stop()
+    """
+    def __init__(self, connection_uri, interval, on_change=None):
+        """
+        Args:
+            connection_uri: A URI used to connect to the graph database.
+            interval: Number of seconds to wait between version checks.
+            on_change: (Optional) A callable taking the new type system
+                version, called whenever a change has been picked up.
+        """
+        self.interval = interval
+        self.on_change = on_change
+        self._manager = Manager(connection_uri, skip_setup=True)
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """ Check the type system version once, reloading the cached type
+        registry if it has changed.
+        """
+        cache = self._manager._get_type_registry_cache()
+        old_version = cache.version if cache else None
+
+        self._manager.reload_types(force=True)
+
+        new_version = self._manager._get_type_registry_cache().version
+        if new_version != old_version and self.on_change is not None:
+            self.on_change(new_version)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                log.exception('failed to poll type system version')
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -7,7 +7,7 @@ from kaiso.serialize import object_to_db_value, dict_to_db_values_dict
 from kaiso.types import (
     AttributedBase, Relationship, get_type_id, get_neo4j_relationship_name,
     PersistableType)
-from kaiso.serialize import get_type_relationships
+from kaiso.serialize import get_type_fingerprint, get_type_relationships
 
 
 def join_lines(*lines, **kwargs):
@@ -125,82 +125,240 @@ def get_match_clause(obj, name, type_registry):
     )
 
 
-def get_create_types_query(cls, type_system_id, type_registry):
+def get_node_lookup(obj, type_registry):
+    """ Return the labels and unique attribute values identifying the node
+    of a type or an instance, as matched by ``get_match_clause``.
+
+    Args:
+        obj: A type or an instance to create a lookup for.
+    Returns:
+        A tuple (labels, properties), where labels is a sorted tuple
+    """
+    if isinstance(obj, PersistableType):
+        return ('PersistableType',), {'id': get_type_id(obj)}
+
+    if isinstance(obj, Relationship):
+        raise NoUniqueAttributeError(
+            "{} can't be looked up as a node".format(obj)
+        )
+
+    properties = {}
+    label_classes = set()
+    for cls, attr_name in type_registry.get_unique_attrs(type(obj)):
+        value = getattr(obj, attr_name)
+        if value is not None:
+            label_classes.add(cls)
+            properties[attr_name] = object_to_db_value(value)
+    if not properties:
+        raise NoUniqueAttributeError(
+            "{} doesn't have any unique attributes".format(obj)
+        )
+    labels = tuple(sorted(get_type_id(cls) for cls in label_classes))
+    return labels, properties
+
+
+def get_lookup_match_clause(lookup, name):
+    """ Return a node lookup for a match clause from the ``(labels,
+    properties)`` of a node, e.g. as returned by ``get_node_lookup``,
+    referring to the property values through parameters.
+
+    Args:
+        lookup: A tuple (labels, properties).
+        name: The name of the node in the query. Parameter names are
+            prefixed with it.
+    Returns:
+        A tuple (match clause, query parameters)
+    """
+    labels, properties = lookup
+
+    params = {}
+    match_params = []
+    for key, value in properties.items():
+        param_name = '%s__%s' % (name, key)
+        match_params.append('%s: {%s}' % (key, param_name))
+        params[param_name] = value
+
+    clause = '({name}{labels} {{{match_params}}})'.format(
+        name=name,
+        labels=''.join(':%s' % label for label in labels),
+        match_params=', '.join(sorted(match_params)),
+    )
+    return clause, params
+
+
+def get_parameterized_match_clause(obj, name, type_registry):
+    """ Return a node lookup for a match clause like ``get_match_clause``,
+    but referring to the unique attribute values through parameters.
+
+    Objects of the same type with the same unique attributes set result
+    in the same clause, which allows sending the same query for many of
+    them.
+
+    Args:
+        obj: A type or an instance to create a lookup for.
+        name: The name of the object in the query. Parameter names are
+            prefixed with it.
+    Returns:
+        A tuple (match clause, query parameters)
+    """
+    lookup = get_node_lookup(obj, type_registry)
+    return get_lookup_match_clause(lookup, name)
+
+
+def get_instances_match_clause(cls, name, filters=None,
+                               include_subtypes=True, ancestor_labels=False):
+    """ Return a match clause for all instances of ``cls`` (including
+    instances of its subtypes), optionally restricted to those whose
+    attributes equal the given ``filters``.
+
+    Args:
+        cls: The type to match instances of.
+        name: The name of the instances in the query. Parameter names are
+            prefixed with it.
+        filters: (Optional) A dict of attribute values to filter by.
+        include_subtypes: (Optional) If False, only direct instances of
+            ``cls`` are matched.
+        ancestor_labels: (Optional) If True, instances are labelled with
+            all of their ancestor types (see ``Manager.ancestor_labels``),
+            so instances of ``cls`` and its subtypes are matched by label.
+    Returns:
+        A tuple (match clause, query parameters)
+    """
+    if filters is None:
+        filters = {}
+
+    for attr_name in filters:
+        if not hasattr(cls, attr_name):
+            raise ValueError("{} has no attribute {}".format(cls, attr_name))
+
+    params = {}
+
+    where = []
+    for attr_name, value in sorted(dict_to_db_values_dict(filters).items()):
+        param_name = '%s__%s' % (name, attr_name)
+        where.append('{}.{} = {{{}}}'.format(name, attr_name, param_name))
+        params[param_name] = value
+
+    if include_subtypes and ancestor_labels:
+        clause = 'MATCH (%(name)s:`%(type_id)s`)'
+    elif include_subtypes:
+        params['%s__type_id' % name] = get_type_id(cls)
+        clause = join_lines(
+            'MATCH (%(name)s__type:PersistableType {id: {%(name)s__type_id}})',
+            '    <-[:ISA*0..]- () <-[:INSTANCEOF]- (%(name)s)',
+        )
+    else:
+        params['%s__type_id' % name] = get_type_id(cls)
+        clause = join_lines(
+            'MATCH (%(name)s__type:PersistableType {id: {%(name)s__type_id}})',
+            '    <-[:INSTANCEOF]- (%(name)s)',
+        )
+    clause = clause % {'name': name, 'type_id': get_type_id(cls)}
+
+    if where:
+        clause = join_lines(clause, 'WHERE %s' % ' AND '.join(where))
+
+    return clause, params
+
+
+def get_create_types_query(classes, type_system_id, type_registry):
     """ Returns a CREATE UNIQUE query for an entire type hierarchy.
 
     Includes statements that create each type's attributes.
 
     Args:
-        cls: An object to create a type hierarchy for.
+        classes: An object (or a list of objects) to create a type
+            hierarchy for. Types shared between the hierarchies of
+            several objects are only included once.
 
     Returns:
         A tuple containing:
         (cypher query, classes to create nodes for, the object names).
     """
+    if isinstance(classes, type):
+        classes = [classes]
+
+    # The query text isn't cached: saving an unchanged type is skipped by
+    # comparing fingerprints (see ``Manager.save``), so this only runs for
+    # new or changed types, whose cached text would be stale, and building
+    # the parameters takes the same walk over the hierarchy anyway.
     hierarchy_lines = []
     set_lines = []
-    classes = {}
+    seen_lines = set()
+    type_nodes = {}
 
     query_args = {
         'type_system_id': type_system_id,
     }
 
-    # filter type relationships that we want to persist
-    type_relationships = []
-    for cls1, rel_cls_idx, cls2 in get_type_relationships(cls):
-        if issubclass(cls2, AttributedBase):
-            type_relationships.append((cls1, rel_cls_idx, cls2))
-
-    # process type relationships
-    is_first = True
     isa_props_counter = 0
 
-    for cls1, (rel_cls, base_idx), cls2 in type_relationships:
+    for cls in classes:
 
-        name1 = cls1.__name__
-        type1 = type(cls1).__name__
+        # filter type relationships that we want to persist
+        type_relationships = []
+        for cls1, rel_cls_idx, cls2 in get_type_relationships(cls):
+            if issubclass(cls2, AttributedBase):
+                type_relationships.append((cls1, rel_cls_idx, cls2))
 
-        node_for_create = (
-            '(`%(name)s`:%(type)s {'
-            '__type__: {%(name)s__type}, '
-            'id: {%(name)s__id}'
-            '})'
-        ) % {
-            'name': name1,
-            'type': type1,
-        }
-        create_statement = 'MERGE %s' % node_for_create
+        # process type relationships
+        is_first = True
 
-        node_for_ref = '(`%s`)' % name1
+        for cls1, (rel_cls, base_idx), cls2 in type_relationships:
 
-        if name1 not in classes:
-            classes[name1] = cls1
-            hierarchy_lines.append(create_statement)
+            name1 = cls1.__name__
+            type1 = type(cls1).__name__
 
-        if is_first:
-            is_first = False
-            ln = 'MERGE (ts) -[:DEFINES]-> %s' % node_for_ref
-        else:
-            name2 = cls2.__name__
-            classes[name2] = cls2
+            node_for_create = (
+                '(`%(name)s`:%(type)s {'
+                '__type__: {%(name)s__type}, '
+                'id: {%(name)s__id}'
+                '})'
+            ) % {
+                'name': name1,
+                'type': type1,
+            }
+            create_statement = 'MERGE %s' % node_for_create
 
-            rel_name = get_type_id(rel_cls)
-            rel_type = rel_name.upper()
+            node_for_ref = '(`%s`)' % name1
 
-            prop_name = '%s_%d' % (rel_name, isa_props_counter)
-            isa_props_counter += 1
+            if name1 not in type_nodes:
+                type_nodes[name1] = cls1
+                hierarchy_lines.append(create_statement)
 
-            props = type_registry.object_to_dict(IsA(base_index=base_idx))
-            query_args[prop_name] = props
+            if is_first:
+                is_first = False
+                line_key = ('DEFINES', name1)
+                if line_key in seen_lines:
+                    continue
 
-            ln = 'MERGE %s -[%s:%s]-> (`%s`)' % (
-                node_for_ref, prop_name, rel_type, name2)
-            set_lines.append('SET `%s` = {%s}' % (prop_name, prop_name))
+                ln = 'MERGE (ts) -[:DEFINES]-> %s' % node_for_ref
+            else:
+                name2 = cls2.__name__
+                type_nodes[name2] = cls2
 
-        hierarchy_lines.append(ln)
+                line_key = (name1, rel_cls, base_idx, name2)
+                if line_key in seen_lines:
+                    continue
+
+                rel_name = get_type_id(rel_cls)
+                rel_type = rel_name.upper()
+
+                prop_name = '%s_%d' % (rel_name, isa_props_counter)
+                isa_props_counter += 1
+
+                props = type_registry.object_to_dict(IsA(base_index=base_idx))
+                query_args[prop_name] = props
+
+                ln = 'MERGE %s -[%s:%s]-> (`%s`)' % (
+                    node_for_ref, prop_name, rel_type, name2)
+                set_lines.append('SET `%s` = {%s}' % (prop_name, prop_name))
+
+            seen_lines.add(line_key)
+            hierarchy_lines.append(ln)
 
     # process attributes
-    for name, cls in classes.items():
+    for name, cls in type_nodes.items():
 
         descriptor = type_registry.get_descriptor(cls)
         attributes = descriptor.declared_attributes
@@ -219,9 +377,11 @@ def get_create_types_query(cls, type_system_id, type_registry):
             hierarchy_lines.append(ln)
 
     # processing class attributes
-    for key, cls in classes.iteritems():
+    for key, cls in type_nodes.iteritems():
         # all attributes of the class to be set via the query
         cls_props = type_registry.object_to_dict(cls, for_db=True)
+        cls_props['__fingerprint__'] = get_type_fingerprint(
+            cls, type_registry)
         query_args['%s_props' % key] = cls_props
         set_lines.append('SET `%s` = {%s_props}' % (key, key))
 
@@ -230,7 +390,7 @@ def get_create_types_query(cls, type_system_id, type_registry):
         query_args['%s__id' % key] = cls_props['id']
         query_args['%s__type' % key] = cls_props['__type__']
 
-    quoted_names = ('`{}`'.format(cls) for cls in classes.keys())
+    quoted_names = ('`{}`'.format(cls) for cls in type_nodes.keys())
     query = join_lines(
         'MATCH (ts:TypeSystem) WHERE ts.id = {type_system_id}',
         (hierarchy_lines, ''),
@@ -238,7 +398,7 @@ def get_create_types_query(cls, type_system_id, type_registry):
         'RETURN %s' % ', '.join(quoted_names)
     )
 
-    return query, classes.values(), query_args
+    return query, type_nodes.values(), query_args
 
 
 def get_create_relationship_query(rel, type_registry):
@@ -1,6 +1,11 @@
+import hashlib
+import json
+from weakref import WeakKeyDictionary
+
 from kaiso.attributes.bases import get_attibute_for_type
 from kaiso.iter_helpers import unique
 from kaiso.relationships import InstanceOf, IsA
+from kaiso.types import AttributedBase, get_type_id
 
 
 def get_changes(old, new):
@@ -22,9 +27,13 @@ def get_changes(old, new):
     return changes
 
 
-@unique
+# type relationships by class, along with the __mro__ they were computed
+# for, see get_type_relationships
+_type_relationships = WeakKeyDictionary()
+
+
 def get_type_relationships(obj):
-    """ Generates a list of the type relationships of an object.
+    """ Returns the type relationships of an object.
     e.g.
         get_type_relationships(Entity())
 
@@ -37,27 +46,55 @@ def get_type_relationships(obj):
         (Entity, InstanceOf, PersistableType),
         (<Entity object>, InstanceOf, Entity)
 
+    The relationships of classes are computed once, and recomputed if
+    their bases change (or ``forget_type_relationships`` is called).
+
     Args:
         obj:    An object to generate the type relationships for.
 
     Returns:
-        A generator, generating tuples
+        A tuple of tuples
             (object, relatsionship type, related obj)
     """
-    obj_type = type(obj)
+    if not isinstance(obj, type):
+        obj_type = type(obj)
+        return get_type_relationships(obj_type) + (
+            (obj, (InstanceOf, 0), obj_type),
+        )
+
+    cached = _type_relationships.get(obj)
+    if cached is not None:
+        mro, relationships = cached
+        if mro == obj.__mro__:
+            return relationships
+
+    relationships = tuple(_generate_type_relationships(obj))
+    _type_relationships[obj] = (obj.__mro__, relationships)
+    return relationships
+
+
+def forget_type_relationships(cls):
+    """ Drop the type relationships of ``cls`` computed by
+    ``get_type_relationships``, e.g. because its bases have changed.
+    """
+    _type_relationships.pop(cls, None)
+
+
+@unique
+def _generate_type_relationships(cls):
+    cls_type = type(cls)
 
-    if obj_type is not type:
-        for item in get_type_relationships(obj_type):
+    if cls_type is not type:
+        for item in get_type_relationships(cls_type):
             yield item
 
-    if isinstance(obj, type):
-        for base_idx, base in enumerate(obj.__bases__):
-            for item in get_type_relationships(base):
-                yield item
+    for base_idx, base in enumerate(cls.__bases__):
+        for item in get_type_relationships(base):
+            yield item
 
-            yield obj, (IsA, base_idx), base
+        yield cls, (IsA, base_idx), base
 
-    yield obj, (InstanceOf, 0), obj_type
+    yield cls, (InstanceOf, 0), cls_type
 
 
 def object_to_db_value(obj):
@@ -71,3 +108,42 @@ def object_to_db_value(obj):
 
 def dict_to_db_values_dict(data):
     return dict((k, object_to_db_value(v)) for k, v in data.items())
+
+
+def get_type_fingerprint(cls, type_registry):
+    """ Return a fingerprint of the definition of ``cls``, as persisted by
+    ``get_create_types_query``.
+
+    The fingerprint covers the class attributes, declared attributes and
+    bases of ``cls`` and all of its persisted ancestors, so that it changes
+    whenever saving ``cls`` could change the type hierarchy in the database.
+
+    Returns:
+        A hex digest string.
+    """
+    classes = {get_type_id(cls): cls}
+    bases = []
+
+    for cls1, (rel_cls, base_idx), cls2 in get_type_relationships(cls):
+        if issubclass(cls2, AttributedBase):
+            classes[get_type_id(cls1)] = cls1
+            bases.append((
+                get_type_id(cls1), get_type_id(rel_cls), base_idx,
+                get_type_id(cls2)
+            ))
+
+    definitions = []
+    for type_id, type_cls in sorted(classes.items()):
+        descriptor = type_registry.get_descriptor(type_cls)
+        attrs = dict(
+            (name, type_registry.object_to_dict(attr, for_db=True))
+            for name, attr in descriptor.declared_attributes.items()
+        )
+        definitions.append((
+            type_id,
+            type_registry.object_to_dict(type_cls, for_db=True),
+            attrs,
+        ))
+
+    data = json.dumps([bases, definitions], sort_keys=True, default=repr)
+    return hashlib.sha1(data).hexdigest()
@@ -10,7 +10,7 @@ from kaiso.exceptions import (
 
 
 # at some point, rename id to __name__ and just skip all dunder attrs
-INTERNAL_CLASS_ATTRS = ['__type__', 'id']
+INTERNAL_CLASS_ATTRS = ['__type__', 'id', '__changed__', '__fingerprint__']
 CLASS_ATTRIBUTE_TYPES = (basestring, int, bool, list, float)
 
 
@@ -23,6 +23,9 @@ class Persistable(object):
 
 
 class StaticClassCollector(object):
+    # incremented whenever the collected classes change
+    version = 0
+
     def __init__(self):
         self.reset_state()
 
@@ -49,6 +52,7 @@ class StaticClassCollector(object):
 
         self.classes[name] = cls
         self.descriptors[name] = Descriptor(cls)
+        self.version += 1
 
     def dump_state(self):
         return (
@@ -59,6 +63,7 @@ class StaticClassCollector(object):
 
     def load_state(self, state):
         self.classes, self.descriptors, self.relationships = state
+        self.version += 1
         # make sure we reset all descriptor caches
         for descriptor in self.descriptors.values():
             descriptor._clear_cache()
@@ -138,6 +143,9 @@ class TypeRegistry(object):
     def __init__(self):
         self._dynamic_descriptors = {}
         self._types_in_db = set()
+        # (static classes version, ancestor ids, descendant ids), see
+        # _get_type_closures; reset whenever a type is (un)registered
+        self._type_closures = None
 
     @property
     def _static_descriptors(self):
@@ -206,6 +214,13 @@ class TypeRegistry(object):
             raise TypeAlreadyRegistered(cls)
 
         descriptors[name] = Descriptor(cls)
+        self._type_closures = None
+
+    def unregister(self, cls_id):
+        """ Remove the dynamic type with the given ``cls_id``, if any
+        """
+        self._dynamic_descriptors.pop(cls_id, None)
+        self._type_closures = None
 
     def get_class_by_id(self, cls_id):
         """ Return the class for a given ``cls_id``, preferring statically
@@ -228,8 +243,62 @@ class TypeRegistry(object):
             return self.get_descriptor_by_id(cls_id).cls
 
     def refresh_type(self, cls):
+        from kaiso.serialize import forget_type_relationships
+
         descriptor = self.get_descriptor(cls)
         descriptor._clear_cache()
+        forget_type_relationships(cls)
+        self._type_closures = None
+
+    def _get_type_closures(self):
+        """ Return dicts mapping the id of every registered type to
+        frozensets of the ids of its ancestors and of its descendants
+        respectively (both including the type itself).
+
+        They are computed in a single pass over all registered types the
+        first time they're needed after types have been (un)registered.
+        """
+        static_version = collected_static_classes.version
+        closures = self._type_closures
+        if closures is not None and closures[0] == static_version:
+            return closures[1:]
+
+        descriptors = dict(self._static_descriptors)
+        descriptors.update(self._dynamic_descriptors)
+
+        ancestors = {}
+        descendants = {}
+        for type_id, descriptor in descriptors.iteritems():
+            cls_ancestors = _get_ancestor_ids(descriptor.cls)
+            ancestors[type_id] = cls_ancestors
+            for ancestor_id in cls_ancestors:
+                descendants.setdefault(ancestor_id, set()).add(type_id)
+
+        descendants = {
+            type_id: frozenset(type_ids)
+            for type_id, type_ids in descendants.iteritems()
+        }
+
+        self._type_closures = (static_version, ancestors, descendants)
+        return ancestors, descendants
+
+    def get_ancestor_ids(self, cls):
+        """ Return a frozenset of the ids of ``cls`` and all of its
+        persistable ancestors.
+        """
+        ancestors, _ = self._get_type_closures()
+        type_id = get_type_id(cls)
+        if type_id in ancestors and self.get_descriptor(cls).cls is cls:
+            return ancestors[type_id]
+        return _get_ancestor_ids(cls)
+
+    def get_descendant_ids(self, cls):
+        """ Return a frozenset of the ids of ``cls`` and all registered
+        types inheriting from it.
+        """
+        _, descendants = self._get_type_closures()
+        type_id = get_type_id(cls)
+        return descendants.get(type_id, frozenset([type_id]))
 
     def get_relationship_type_id(self, neo4j_rel_name):
         return self._relationships[neo4j_rel_name]
@@ -285,6 +354,12 @@ class TypeRegistry(object):
 
         return labels
 
+    def get_ancestor_labels_for_type(self, cls):
+        """Returns labels for ``cls`` and each of its persisted ancestor
+        types (see ``Manager.ancestor_labels``)"""
+
+        return set(self.get_ancestor_ids(cls))
+
     def get_constraints_for_type(self, cls):
         descr = self.get_descriptor(cls)
         for declaring_class, attr_name in self.get_unique_attrs(cls):
@@ -429,9 +504,17 @@ class TypeRegistry(object):
         clone = TypeRegistry()
         clone._dynamic_descriptors = self._dynamic_descriptors.copy()
         clone._types_in_db = self._types_in_db.copy()
+        clone._type_closures = self._type_closures
         return clone
 
 
+def _get_ancestor_ids(cls):
+    return frozenset(
+        get_type_id(base) for base in cls.__mro__
+        if issubclass(base, AttributedBase)
+    )
+
+
 def get_declaring_class(cls, attr_name, prefer_subclass=True):
     """ Returns the class in the type heirarchy of ``cls`` that defined
         an attribute with name ``attr_name``.
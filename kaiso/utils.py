@@ -6,3 +6,41 @@ def dict_difference(d1, d2):
     sentinel = object()
     return dict(((k, v) for (k, v) in d1.iteritems()
                  if d2.get(k, sentinel) != v))
+
+
+def sort_type_hierarchy(hierarchy):
+    """ Sort ``(type_id, bases, attrs)`` tuples such that every type appears
+    after all of its bases.
+
+    Types are ordered by their level in the hierarchy (the length of the
+    longest chain of bases within ``hierarchy``) and then by type_id. Bases
+    that are not part of ``hierarchy`` are ignored.
+
+    Raises:
+        ValueError if the bases contain a cycle.
+    """
+    entries = dict((entry[0], entry) for entry in hierarchy)
+    levels = {}
+
+    def get_level(type_id, seen):
+        if type_id in levels:
+            return levels[type_id]
+        if type_id in seen:
+            raise ValueError(
+                "Inheritance cycle involving {}".format(type_id))
+        seen.add(type_id)
+
+        _, bases, _ = entries[type_id]
+        level = 0
+        for base in bases:
+            if base in entries:
+                level = max(level, get_level(base, seen) + 1)
+
+        levels[type_id] = level
+        return level
+
+    for type_id in entries:
+        get_level(type_id, set())
+
+    return [entries[type_id] for type_id in sorted(
+        entries, key=lambda type_id: (levels[type_id], type_id))]
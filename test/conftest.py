@@ -14,6 +14,12 @@ def pytest_addoption(parser):
         "--neo4j_cmd", action="store",
         help=("Location of neo4j script that provides installation 'info'"))
 
+    parser.addoption(
+        "--backend", action="store", default="neo4j",
+        choices=["neo4j", "memory"],
+        help=("Backend to store the graph in. With 'memory', tests marked "
+              "with 'neo4j' are skipped."))
+
     parser.addoption(
         "--log-level", action="store",
         default=None,
@@ -21,6 +27,10 @@ def pytest_addoption(parser):
 
 
 def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'neo4j: the test needs a neo4j server, e.g. to run cypher queries')
+
     neo4j_cmd = config.getoption('neo4j_cmd')
     if neo4j_cmd:
         os.environ['NEO4J_CMD'] = neo4j_cmd
@@ -31,13 +41,32 @@ def pytest_configure(config):
         logging.getLogger('py2neo').setLevel(logging.ERROR)
 
 
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('backend') != 'memory':
+        return
+
+    skip = pytest.mark.skip(reason="needs a neo4j server")
+    for item in items:
+        fixturenames = getattr(item, 'fixturenames', ())
+        if 'neo4j' in item.keywords or 'connection' in fixturenames:
+            item.add_marker(skip)
+
+
 @pytest.fixture
 def manager_factory(request):
     from kaiso.persistence import Manager
 
     neo4j_uri = request.config.getoption('neo4j_uri')
 
+    if request.config.getoption('backend') == 'memory':
+        from kaiso.memory_backend import InMemoryBackend
+        # managers of a test share the backend, like they would a database
+        backend = InMemoryBackend()
+    else:
+        backend = None
+
     def make_manager(**kwargs):
+        kwargs.setdefault('backend', backend)
         return Manager(neo4j_uri, **kwargs)
 
     return make_manager
@@ -0,0 +1,102 @@
+import pytest
+
+from kaiso.attributes import String
+from kaiso.types import Entity
+
+
+@pytest.fixture
+def manager(manager_factory):
+    manager_factory(skip_setup=True).destroy()
+    return manager_factory(ancestor_labels=True)
+
+
+@pytest.fixture
+def static_types(manager):
+    class Animal(Entity):
+        name = String(unique=True)
+
+    class Mammal(Animal):
+        pass
+
+    class Bird(Animal):
+        pass
+
+    manager.save(Animal)
+    manager.save(Mammal)
+    manager.save(Bird)
+
+    return {
+        'Animal': Animal,
+        'Mammal': Mammal,
+        'Bird': Bird,
+    }
+
+
+def get_labels(manager, name):
+    (labels,) = next(manager.query(
+        'MATCH (n {name: {name}}) RETURN labels(n)', name=name))
+    return set(labels)
+
+
+@pytest.mark.neo4j
+def test_instances_labelled_with_ancestors(manager, static_types):
+    Mammal = static_types['Mammal']
+
+    manager.save(Mammal(name='dog'))
+
+    assert get_labels(manager, 'dog') == set([
+        'Mammal', 'Animal', 'Entity', 'AttributedBase'])
+
+
+def test_subtype_lookups_use_labels(manager, static_types):
+    Animal = static_types['Animal']
+    Mammal = static_types['Mammal']
+    Bird = static_types['Bird']
+
+    manager.save(Mammal(name='dog'))
+    manager.save(Bird(name='robin'))
+    manager.save(Animal(name='amoeba'))
+
+    assert manager.delete_where(Mammal) == (1, 1)
+    assert manager.delete_where(Animal) == (2, 2)
+
+
+@pytest.mark.neo4j
+def test_change_instance_type_updates_labels(manager, static_types):
+    Mammal = static_types['Mammal']
+
+    dog = Mammal(name='dog')
+    manager.save(dog)
+    manager.change_instance_type(dog, 'Bird')
+
+    assert get_labels(manager, 'dog') == set([
+        'Bird', 'Animal', 'Entity', 'AttributedBase'])
+
+
+@pytest.mark.neo4j
+def test_update_type_updates_labels(manager, static_types):
+    Animal = static_types['Animal']
+    Mammal = static_types['Mammal']
+
+    Whale = manager.create_type('Whale', (Animal,), {})
+    Orca = manager.create_type('Orca', (Whale,), {})
+    manager.save(Orca)
+    manager.save(Orca(name='willy'))
+
+    manager.update_type(Whale, (Mammal,))
+
+    assert get_labels(manager, 'willy') == set([
+        'Orca', 'Whale', 'Mammal', 'Animal', 'Entity', 'AttributedBase'])
+
+
+@pytest.mark.neo4j
+def test_add_ancestor_labels(manager_factory, static_types):
+    Mammal = static_types['Mammal']
+
+    manager = manager_factory(ancestor_labels=False)
+    manager.save(Mammal(name='dog'))
+    assert get_labels(manager, 'dog') == set(['Animal'])
+
+    assert manager.add_ancestor_labels(Mammal) == 1
+    assert get_labels(manager, 'dog') == set([
+        'Mammal', 'Animal', 'Entity', 'AttributedBase'])
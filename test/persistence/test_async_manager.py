@@ -0,0 +1,92 @@
+import pytest
+
+from kaiso.async_manager import AsyncManager
+from kaiso.attributes import Uuid
+from kaiso.types import Entity
+
+
+@pytest.fixture
+def async_manager(request, manager):
+    neo4j_uri = request.config.getoption('neo4j_uri')
+    _async_manager = AsyncManager(
+        neo4j_uri, workers=2, backend=manager._backend)
+    request.addfinalizer(_async_manager.close)
+    return _async_manager
+
+
+@pytest.fixture
+def static_types(manager):
+    class Thing(Entity):
+        id = Uuid(unique=True)
+
+    manager.save(Thing)
+
+    return {
+        'Thing': Thing,
+    }
+
+
+def test_save_and_get(async_manager, static_types):
+    Thing = static_types['Thing']
+
+    thing = Thing()
+    assert async_manager.save(thing).get() is thing
+
+    loaded = async_manager.get(Thing, id=thing.id).get()
+    assert type(loaded) is Thing
+    assert loaded.id == thing.id
+
+
+def test_concurrent_calls(async_manager, static_types):
+    Thing = static_types['Thing']
+
+    things = [Thing() for _ in range(5)]
+    for result in [async_manager.save(thing) for thing in things]:
+        result.get()
+
+    results = [async_manager.get(Thing, id=thing.id) for thing in things]
+    assert [result.get().id for result in results] == [
+        thing.id for thing in things]
+
+    ids = [thing.id for thing in things]
+    loaded = async_manager.get_by_unique_attr(Thing, 'id', ids).get()
+    assert [thing.id for thing in loaded] == ids
+
+
+@pytest.mark.neo4j
+def test_query_and_delete(async_manager, static_types):
+    Thing = static_types['Thing']
+
+    thing = Thing()
+    async_manager.save(thing).get()
+
+    query = 'MATCH (n:Thing) RETURN n'
+    assert len(async_manager.query(query).get()) == 1
+
+    async_manager.delete(thing).get()
+    assert async_manager.query(query).get() == []
+
+
+def test_errors_are_raised_by_get(async_manager, static_types):
+    Thing = static_types['Thing']
+
+    result = async_manager.get(Thing, foo='bar')
+    with pytest.raises(ValueError):
+        result.get()
+
+
+def test_reload_types(manager, async_manager, static_types):
+    Thing = static_types['Thing']
+
+    # make sure the workers have loaded their type registries
+    async_manager.get(Thing).get()
+
+    Other = manager.create_type('Other', (Thing,), {})
+    manager.save(Other)
+
+    async_manager.reload_types().get()
+
+    other = Other()
+    async_manager.save(other).get()
+    loaded = async_manager.get(Thing, id=other.id).get()
+    assert loaded.id == other.id
@@ -1,7 +1,9 @@
 import pytest
 
 from kaiso.attributes import Uuid, Integer
-from kaiso.types import Entity
+from kaiso.exceptions import NoUniqueAttributeError
+from kaiso.relationships import IsA
+from kaiso.types import Entity, Relationship
 
 
 @pytest.fixture
@@ -10,10 +12,15 @@ def static_types(manager):
         id = Uuid(unique=True)
         count = Integer()
 
+    class Related(Relationship):
+        weight = Integer()
+
     manager.save(Thing)
+    manager.save(Related)
 
     return {
         'Thing': Thing,
+        'Related': Related,
     }
 
 
@@ -68,3 +75,177 @@ def test_bad_attr(manager, static_types):
     with pytest.raises(ValueError) as exc:
         manager.get_by_unique_attr(Thing, 'count', '')
     assert "is not unique" in str(exc)
+
+
+@pytest.mark.neo4j
+def test_create_relationships(manager, static_types):
+    Thing = static_types['Thing']
+    Related = static_types['Related']
+
+    thing1 = Thing()
+    thing2 = Thing()
+    unsaved = Thing()
+    manager.save(thing1)
+    manager.save(thing2)
+
+    rels = [
+        Related(thing1, thing2, weight=1),
+        Related(thing2, thing1, weight=2),
+        Related(thing1, unsaved, weight=3),
+    ]
+    result = manager.create_relationships(rels, chunk_size=2)
+    assert result == [True, True, False]
+
+    rows = manager.query("""
+        MATCH (n1:Thing) -[r:RELATED]-> (n2:Thing)
+        RETURN n1.id, r.weight, n2.id
+        ORDER BY r.weight
+    """)
+    assert list(rows) == [
+        (str(thing1.id), 1, str(thing2.id)),
+        (str(thing2.id), 2, str(thing1.id)),
+    ]
+
+
+def test_create_relationships_missing_end(manager, static_types):
+    Thing = static_types['Thing']
+    Related = static_types['Related']
+
+    with pytest.raises(NoUniqueAttributeError):
+        manager.create_relationships([Related(Thing(), None)])
+
+
+def test_create_relationships_rejects_type_hierarchy(manager, static_types):
+    Thing = static_types['Thing']
+
+    with pytest.raises(TypeError):
+        manager.create_relationships([IsA(Thing, Entity)])
+
+
+@pytest.mark.neo4j
+def test_delete_many(manager, static_types):
+    Thing = static_types['Thing']
+    Related = static_types['Related']
+
+    thing1, thing2, thing3 = Thing(), Thing(), Thing()
+    for obj in (thing1, thing2, thing3, Related(thing1, thing2)):
+        manager.save(obj)
+
+    # each instance has an INSTANCEOF relationship to its type
+    result = manager.delete_many([thing1, thing2], chunk_size=1)
+    assert result == (2, 3)
+
+    rows = manager.query('MATCH (n:Thing) RETURN n.id')
+    assert list(rows) == [(str(thing3.id),)]
+
+
+def test_delete_many_rejects_types(manager, static_types):
+    Thing = static_types['Thing']
+
+    with pytest.raises(TypeError):
+        manager.delete_many([Thing])
+
+
+@pytest.mark.neo4j
+def test_delete_where(manager, static_types):
+    Thing = static_types['Thing']
+
+    for _ in range(5):
+        manager.save(Thing(count=1))
+    other = Thing(count=2)
+    manager.save(other)
+
+    result = manager.delete_where(Thing, chunk_size=2, count=1)
+    assert result == (5, 5)
+
+    rows = manager.query('MATCH (n:Thing) RETURN n.id')
+    assert list(rows) == [(str(other.id),)]
+
+
+def test_delete_where_connected_instances(manager, static_types):
+    Thing = static_types['Thing']
+    Related = static_types['Related']
+
+    thing1, thing2 = Thing(count=1), Thing(count=1)
+    for obj in (thing1, thing2, Related(thing1, thing2)):
+        manager.save(obj)
+
+    # both instances are deleted in one chunk; each has an INSTANCEOF
+    # relationship to its type, and the relationship between them is
+    # counted once
+    result = manager.delete_where(Thing, chunk_size=2, count=1)
+    assert result == (2, 3)
+
+
+def test_delete_where_unknown_attr(manager, static_types):
+    Thing = static_types['Thing']
+
+    with pytest.raises(ValueError) as exc:
+        manager.delete_where(Thing, foo=1)
+    assert "has no attribute" in str(exc)
+
+
+@pytest.mark.neo4j
+def test_update_where(manager, static_types):
+    Thing = static_types['Thing']
+
+    things = [Thing(count=1) for _ in range(5)]
+    other = Thing(count=2)
+    for thing in things + [other]:
+        manager.save(thing)
+
+    updated = manager.update_where(Thing, {'count': 1}, chunk_size=2, count=3)
+    assert updated == 5
+
+    rows = manager.query(
+        'MATCH (n:Thing) RETURN n.count, count(n) ORDER BY n.count')
+    assert list(rows) == [(2, 1), (3, 5)]
+
+
+def test_update_where_remove_value(manager, static_types):
+    Thing = static_types['Thing']
+
+    thing = Thing(count=1)
+    manager.save(thing)
+
+    assert manager.update_where(Thing, {}, count=None) == 1
+
+    loaded = manager.get(Thing, id=thing.id)
+    assert loaded.count is None
+
+
+def test_update_where_invalid_value(manager, static_types):
+    Thing = static_types['Thing']
+
+    with pytest.raises(ValueError) as exc:
+        manager.update_where(Thing, {}, count='one')
+    assert "invalid literal" in str(exc)
+
+    with pytest.raises(ValueError) as exc:
+        manager.update_where(Thing, {}, foo=1)
+    assert "has no attribute" in str(exc)
+
+
+def test_parallel_chunks(manager_factory, manager, static_types):
+    Thing = static_types['Thing']
+    Related = static_types['Related']
+
+    parallel_manager = manager_factory(chunk_workers=3)
+
+    things = [Thing() for _ in range(5)]
+    for thing in things:
+        manager.save(thing)
+    unsaved = Thing()
+
+    ids = [thing.id for thing in things] + [unsaved.id]
+    result = parallel_manager.get_by_unique_attr(
+        Thing, 'id', ids, chunk_size=2)
+    assert [obj and obj.id for obj in result] == ids[:5] + [None]
+
+    rels = [Related(thing, unsaved) for thing in things[:2]] + [
+        Related(thing, things[0]) for thing in things[1:]]
+    result = parallel_manager.create_relationships(rels, chunk_size=2)
+    assert result == [False, False, True, True, True, True]
+
+    result = parallel_manager.delete_many(things[1:], chunk_size=1)
+    assert result == (4, 8)
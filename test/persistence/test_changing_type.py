@@ -54,6 +54,7 @@ def get_instance_of_relationship(manager, obj):
     return instance_of
 
 
+@pytest.mark.neo4j
 def test_basic(manager, static_types):
     ThingA = static_types['ThingA']
     ThingB = static_types['ThingB']
@@ -77,6 +78,7 @@ def test_basic(manager, static_types):
     assert type(instance_of_obj) is InstanceOf
 
 
+@pytest.mark.neo4j
 def test_removes_obsoleted_attributes(manager, static_types):
     ThingA = static_types['ThingA']
     ThingB = static_types['ThingB']
@@ -118,6 +120,7 @@ def test_keeps_common_attributes(manager, static_types):
     assert new_obj.id == id_
 
 
+@pytest.mark.neo4j
 def test_gets_updated_values(manager, static_types):
     ThingA = static_types['ThingA']
     ThingB = static_types['ThingB']
@@ -133,6 +136,7 @@ def test_gets_updated_values(manager, static_types):
     assert has_property(manager, new_obj, 'bb')
 
 
+@pytest.mark.neo4j
 def test_skips_mismached_updated_values(manager, static_types):
     ThingA = static_types['ThingA']
     ThingB = static_types['ThingB']
@@ -230,6 +234,7 @@ def test_change_instance_with_no_unique_attr(manager, static_types):
         manager.change_instance_type(thing_c, 'ThingA')
 
 
+@pytest.mark.neo4j
 def test_change_unique_declaration(manager):
     class ThingA(Entity):
         id = Uuid(unique=True)
@@ -264,3 +269,87 @@ def test_change_unique_declaration(manager):
 
     assert by_query('ThingA', thing.id) is None
     assert by_query('ThingB', thing.id)
+
+
+@pytest.mark.neo4j
+def test_change_instance_types(manager, static_types):
+    Thing = static_types['Thing']
+    ThingA = static_types['ThingA']
+
+    class ThingC(Thing):
+        cc = String()
+
+    manager.save(ThingC)
+
+    things = [ThingA(aa='aa') for _ in range(3)]
+    for thing in things:
+        manager.save(thing)
+
+    changed = manager.change_instance_types(
+        things[:2], 'ThingC', {'cc': 'cc', 'dd': 'dd'}, chunk_size=1)
+    assert changed == 2
+
+    for thing in things[:2]:
+        retrieved = manager.get(ThingC, id=thing.id)
+        assert type(retrieved) is ThingC
+        assert retrieved.cc == 'cc'
+        assert not hasattr(retrieved, 'aa')
+        assert not has_property(manager, retrieved, 'aa')
+        assert not has_property(manager, retrieved, 'dd')
+
+        instance_of = get_instance_of_relationship(manager, retrieved)
+        assert instance_of.end is ThingC
+
+    unchanged = manager.get(ThingA, id=things[2].id)
+    assert type(unchanged) is ThingA
+
+
+def test_change_instance_types_unsaved_instance(manager, static_types):
+    ThingA = static_types['ThingA']
+
+    assert manager.change_instance_types([ThingA()], 'Thing') == 0
+
+
+def test_change_instance_types_to_unsaved_type(manager, static_types):
+    ThingA = static_types['ThingA']
+
+    with pytest.raises(TypeNotPersistedError):
+        manager.change_instance_types([ThingA()], 'ThingC')
+
+
+def test_change_instance_types_mismatching_attributes(
+        manager, static_types):
+    ThingA = static_types['ThingA']
+
+    # same_but_different has a different type on ThingB
+    with pytest.raises(ValueError):
+        manager.change_instance_types([ThingA()], 'ThingB')
+
+
+@pytest.mark.neo4j
+def test_change_instance_type_where(manager, static_types):
+    Thing = static_types['Thing']
+    ThingA = static_types['ThingA']
+
+    class ThingC(Thing):
+        cc = String(default='cc')
+
+    manager.save(ThingC)
+
+    things = [ThingA(aa='aa') for _ in range(3)]
+    other = ThingA(aa='other')
+    for thing in things + [other]:
+        manager.save(thing)
+
+    changed = manager.change_instance_type_where(
+        ThingA, 'ThingC', chunk_size=2, aa='aa')
+    assert changed == 3
+
+    for thing in things:
+        retrieved = manager.get(ThingC, id=thing.id)
+        assert type(retrieved) is ThingC
+        assert retrieved.cc == 'cc'
+        assert not has_property(manager, retrieved, 'aa')
+
+    unchanged = manager.get(ThingA, id=other.id)
+    assert type(unchanged) is ThingA
@@ -63,6 +63,7 @@ def test_load_class_attr(manager):
     assert cls.cls_attr == 'ham'
 
 
+@pytest.mark.neo4j
 def test_class_att_overriding(manager):
     with collector() as classes:
         class A(Entity):
@@ -133,6 +134,7 @@ def test_reserved_attribute_name():
             __type__ = String()
 
 
+@pytest.mark.neo4j
 def test_class_attr_class_serialization(manager):
     with collector() as classes:
         class A(Entity):
@@ -297,6 +299,7 @@ def test_delete_class_attrs(manager):
     assert not(hasattr(DynamicThing, 'cls_attr'))
 
 
+@pytest.mark.neo4j
 def test_add_class_attrs_does_not_create_duplicate_types(manager):
     with collector() as classes:
         class DynamicThing(Entity):
@@ -0,0 +1,123 @@
+import threading
+import time
+
+from mock import patch
+import pytest
+
+from kaiso.attributes import Uuid, Integer
+from kaiso.loader import BatchingLoader
+from kaiso.types import Entity
+
+
+@pytest.fixture
+def static_types(manager):
+    class Thing(Entity):
+        id = Uuid(unique=True)
+        count = Integer()
+
+    class SubThing(Thing):
+        pass
+
+    manager.save(Thing)
+    manager.save(SubThing)
+
+    return {
+        'Thing': Thing,
+        'SubThing': SubThing,
+    }
+
+
+def load_concurrently(loader, cls, ids):
+    results = {}
+
+    def load(id_):
+        results[id_] = loader.get(cls, id=id_)
+
+    threads = [threading.Thread(target=load, args=(id_,)) for id_ in ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return [results[id_] for id_ in ids]
+
+
+def test_concurrent_gets_are_batched(manager, static_types):
+    Thing = static_types['Thing']
+    SubThing = static_types['SubThing']
+
+    things = [Thing(), SubThing(), Thing()]
+    for thing in things:
+        manager.save(thing)
+
+    loader = BatchingLoader(manager, window=0.2)
+    ids = [thing.id for thing in things]
+
+    with patch.object(
+        manager, 'get_by_unique_attr', wraps=manager.get_by_unique_attr
+    ) as get_by_unique_attr:
+        loaded = load_concurrently(loader, Thing, ids)
+
+    assert get_by_unique_attr.call_count == 1
+    assert [obj.id for obj in loaded] == ids
+    assert [type(obj) for obj in loaded] == [Thing, SubThing, Thing]
+
+
+def test_missing_and_repeated_values(manager, static_types):
+    Thing = static_types['Thing']
+
+    thing = Thing()
+    manager.save(thing)
+    missing = Thing()
+
+    loader = BatchingLoader(manager, window=0.2)
+    loaded = load_concurrently(loader, Thing, [thing.id, missing.id])
+    assert loaded[0].id == thing.id
+    assert loaded[1] is None
+
+    assert loader.get(Thing, id=thing.id).id == thing.id
+
+
+def test_max_batch_size(manager, static_types):
+    Thing = static_types['Thing']
+
+    things = [Thing() for _ in range(3)]
+    for thing in things:
+        manager.save(thing)
+
+    loader = BatchingLoader(manager, window=0.2, max_batch_size=2)
+    ids = [thing.id for thing in things]
+
+    with patch.object(
+        manager, 'get_by_unique_attr', wraps=manager.get_by_unique_attr
+    ) as get_by_unique_attr:
+        loaded = load_concurrently(loader, Thing, ids)
+
+    assert get_by_unique_attr.call_count == 2
+    assert [obj.id for obj in loaded] == ids
+
+
+def test_full_batch_loads_before_end_of_window(manager, static_types):
+    Thing = static_types['Thing']
+
+    things = [Thing() for _ in range(2)]
+    for thing in things:
+        manager.save(thing)
+
+    loader = BatchingLoader(manager, window=30, max_batch_size=2)
+    ids = [thing.id for thing in things]
+
+    start = time.time()
+    loaded = load_concurrently(loader, Thing, ids)
+    assert time.time() - start < 10
+
+    assert [obj.id for obj in loaded] == ids
+
+
+def test_unbatchable_gets_use_manager(manager, static_types):
+    Thing = static_types['Thing']
+
+    loader = BatchingLoader(manager)
+
+    with pytest.raises(ValueError):
+        loader.get(Thing, count=1)
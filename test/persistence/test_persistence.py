@@ -2,11 +2,14 @@ import decimal
 from uuid import uuid4
 
 import iso8601
+from mock import Mock, patch
+from py2neo.packages.httpstream import http
 import pytest
 
 from kaiso.attributes import (
     Uuid, Bool, Integer, Float, String, Decimal, DateTime, Choice)
 from kaiso.exceptions import TypeNotPersistedError
+from kaiso.persistence import Neo4jBackend, set_socket_timeout
 from kaiso.relationships import Relationship, IsA
 from kaiso.types import PersistableType, Entity, collector
 
@@ -87,6 +90,7 @@ def test_add_fails_on_non_persistable(manager):
     # TODO: need to make sure we don't allow adding base classes
 
 
+@pytest.mark.neo4j
 def test_add_persistable_only_adds_single_node(manager):
 
     manager.save(Entity)
@@ -97,6 +101,7 @@ def test_add_persistable_only_adds_single_node(manager):
     assert result == [(Entity,)]
 
 
+@pytest.mark.neo4j
 def test_only_adds_entity_once(manager):
     manager.save(Entity)
     manager.save(Entity)
@@ -107,6 +112,7 @@ def test_only_adds_entity_once(manager):
     assert result == [(Entity,)]
 
 
+@pytest.mark.neo4j
 def test_only_adds_types_once(manager, static_types):
     Thing = static_types['Thing']
 
@@ -154,6 +160,7 @@ def test_simple_add_and_get_instance(manager, static_types):
     assert queried_thing.id == thing.id
 
 
+@pytest.mark.neo4j
 def test_add_and_get_instance_of_node_with_no_attrs(manager):
 
     # create Thing with no-attrs
@@ -182,6 +189,7 @@ def test_add_and_get_instance_of_node_with_no_attrs(manager):
     assert queried_thing is None
 
 
+@pytest.mark.neo4j
 def test_add_and_get_instance_of_node_with_no_unique_attrs(manager):
 
     # create Thing with one non-unique attr
@@ -281,6 +289,7 @@ def test_get_with_multi_value_attr_filter(manager, static_types):
     assert isinstance(queried_thing, Thing2)
 
 
+@pytest.mark.neo4j
 def test_query_list_values(manager, static_types):
     Related = static_types['Related']
 
@@ -316,6 +325,41 @@ def test_query_list_values(manager, static_types):
     assert isinstance(data[4], Related)
 
 
+@pytest.mark.neo4j
+def test_query_as_dicts(manager, static_types):
+    Related = static_types['Related']
+
+    class ThingA(Entity):
+        attr_a = Integer(unique=True)
+    manager.save(ThingA)
+
+    thing1 = ThingA(attr_a=1)
+    thing2 = ThingA(attr_a=2)
+
+    rel = Related(start=thing1, end=thing2, str_attr='spam')
+    manager.save(thing1)
+    manager.save(thing2)
+    manager.save(rel)
+
+    query = """
+        MATCH (thing1:ThingA)-[rel]->(thing2:ThingA)
+        RETURN thing1, rel, collect(thing2)
+    """
+
+    rows = list(manager.query(query, as_dicts=True))
+    assert rows == [(
+        {'__type__': 'ThingA', 'attr_a': 1},
+        {'__type__': 'Related', 'str_attr': 'spam'},
+        [{'__type__': 'ThingA', 'attr_a': 2}],
+    )]
+
+    result = manager.query_single(
+        'MATCH (n:ThingA {attr_a: {attr_a}}) RETURN n',
+        as_dicts=True, attr_a=2)
+    assert result == {'__type__': 'ThingA', 'attr_a': 2}
+
+
+@pytest.mark.neo4j
 def test_delete_relationship(manager, static_types):
     Thing = static_types['Thing']
     Related = static_types['Related']
@@ -350,6 +394,7 @@ def test_delete_relationship(manager, static_types):
     assert 'Related' not in rels
 
 
+@pytest.mark.neo4j
 def test_delete_instance_types_remain(manager):
     class Thing(Entity):
         id = Uuid(unique=True)
@@ -371,6 +416,21 @@ def test_delete_instance_types_remain(manager):
     assert result == {Thing}
 
 
+def test_delete_instance_counts(manager, static_types):
+    Thing = static_types['Thing']
+    Related = static_types['Related']
+
+    thing1 = Thing()
+    thing2 = Thing()
+    manager.save(thing1)
+    manager.save(thing2)
+    manager.save(Related(thing1, thing2))
+
+    # the instance is counted once, rather than once per relationship
+    assert manager.delete(thing1) == (1, 2)
+
+
+@pytest.mark.neo4j
 def test_delete_class(manager):
     """
     Verify that types can be removed from the database.
@@ -392,6 +452,7 @@ def test_delete_class(manager):
     assert result == {'TypeSystem', 'Entity', str(thing.id)}
 
 
+@pytest.mark.neo4j
 def test_delete_class_without_attributes(manager):
     """
     Verify that types without attributes can be removed from the database.
@@ -418,6 +479,7 @@ def test_delete_class_without_attributes(manager):
     assert str(thing.id) in result
 
 
+@pytest.mark.neo4j
 def test_destroy(manager, static_types):
     Thing = static_types['Thing']
 
@@ -426,14 +488,15 @@ def test_destroy(manager, static_types):
     manager.save(thing1)
 
     # validate test
-    assert manager._conn.schema.get_indexed_property_keys('Thing') == ['id']
+    schema = manager._backend.conn.schema
+    assert schema.get_indexed_property_keys('Thing') == ['id']
 
     manager.destroy()
 
     count = manager.query_single('MATCH (n) RETURN count(n)')
     assert count == 0
 
-    assert manager._conn.schema.get_indexed_property_keys('Thing') == []
+    assert schema.get_indexed_property_keys('Thing') == []
 
 
 def test_attributes(manager, static_types):
@@ -460,6 +523,7 @@ def test_attributes(manager, static_types):
     assert queried_thing.ch_attr == thing.ch_attr
 
 
+@pytest.mark.neo4j
 def test_relationship(manager, static_types):
     Thing = static_types['Thing']
     Related = static_types['Related']
@@ -491,7 +555,10 @@ def test_relationship(manager, static_types):
     assert queried_rel.end.id == thing2.id
 
 
-def test_get_type_hierarchy(manager):
+@pytest.mark.parametrize('assemble', [False, True])
+def test_get_type_hierarchy(manager, assemble):
+    manager.assemble_type_hierarchy = assemble
+
     class Thing(Entity):
         id = Uuid(unique=True)
 
@@ -530,7 +597,10 @@ def test_get_type_hierarchy(manager):
     assert entities[1] == Carmine.__name__
 
 
-def test_get_type_hierarchy_bases_order(manager, beetroot_diamond):
+@pytest.mark.parametrize('assemble', [False, True])
+@pytest.mark.neo4j
+def test_get_type_hierarchy_bases_order(manager, beetroot_diamond, assemble):
+    manager.assemble_type_hierarchy = assemble
     Beetroot = beetroot_diamond['Beetroot']
 
     # before we introduced 'base_index' on IsA, this test would fail because
@@ -563,6 +633,38 @@ def test_get_type_hierarchy_bases_order(manager, beetroot_diamond):
     ))
 
 
+def test_assembled_type_hierarchy_matches_query(manager, beetroot_diamond):
+    manager.save(beetroot_diamond['Beetroot'])
+    manager.save(beetroot_diamond['Carmine'])
+    manager.save(beetroot_diamond['Preservative'])
+
+    def get_hierarchy(start_type_id=None):
+        hierarchy = manager.get_type_hierarchy(start_type_id)
+        return [
+            (type_id, bases, sorted(attrs))
+            for type_id, bases, attrs in hierarchy
+        ]
+
+    def get_levels(hierarchy):
+        levels = {}
+        for type_id, bases, _ in hierarchy:
+            levels[type_id] = max([levels[base] + 1 for base in bases] or [0])
+        return levels
+
+    for start_type_id in (None, 'Colouring'):
+        manager.assemble_type_hierarchy = False
+        queried = get_hierarchy(start_type_id)
+        manager.assemble_type_hierarchy = True
+        assembled = get_hierarchy(start_type_id)
+
+        assert sorted(assembled) == sorted(queried)
+        if start_type_id is None:
+            levels = get_levels(assembled)
+            assert [levels[entry[0]] for entry in assembled] == sorted(
+                levels.values())
+
+
+@pytest.mark.neo4j
 def test_type_hierarchy_object(manager):
     class Thing(Entity):
         id = Uuid(unique=True)
@@ -586,6 +688,7 @@ def test_type_hierarchy_object(manager):
     }
 
 
+@pytest.mark.neo4j
 def test_type_hierarchy_diamond(manager, beetroot_diamond):
     Thing = beetroot_diamond['Thing']
     Colouring = beetroot_diamond['Colouring']
@@ -622,31 +725,60 @@ def test_type_hierarchy_diamond(manager, beetroot_diamond):
     }
 
 
+@pytest.mark.neo4j
 def test_add_type_creates_index(manager, static_types):
     Thing = static_types['Thing']
 
     # Thing has a unique attr so should create an index
     manager.save(Thing)
-    assert manager._conn.schema.get_indexed_property_keys('Thing') == ['id']
+    schema = manager._backend.conn.schema
+    assert schema.get_indexed_property_keys('Thing') == ['id']
+
+
+@pytest.mark.neo4j
+def test_add_type_only_creates_missing_indexes(manager, static_types):
+    Thing = static_types['Thing']
+
+    manager.save(Thing)
+
+    Thing.cls_attr = "changed"
+    with patch.object(
+        manager, '_ensure_constraints', wraps=manager._ensure_constraints
+    ) as ensure_constraints:
+        with patch('kaiso.persistence.neo4j.WriteBatch') as write_batch:
+            manager.save(Thing)
 
+    # the type change is sent with the type system invalidation ...
+    assert write_batch.call_count == 1
+    # ... but the constraint is known to exist, so it isn't created again
+    for call in write_batch.return_value.append_cypher.call_args_list:
+        assert 'CREATE CONSTRAINT' not in call[0][0]
+    assert ensure_constraints.call_count == 1
+    schema = manager._backend.conn.schema
+    assert schema.get_indexed_property_keys('Thing') == ['id']
 
+
+@pytest.mark.neo4j
 def test_add_type_only_creates_indexes_for_unique_attrs(manager, static_types):
     Flavouring = static_types['Flavouring']
 
     manager.save(Flavouring)
 
     # superclass Thing has a unique attr so should create an index
-    assert manager._conn.schema.get_indexed_property_keys('Thing') == ['id']
+    schema = manager._backend.conn.schema
+    assert schema.get_indexed_property_keys('Thing') == ['id']
 
     # but Flavouring has no unique attr so should not create an index
     assert manager.query_single('MATCH (n:Flavouring) RETURN n') is None
 
 
+@pytest.mark.neo4j
 def test_add_type_with_no_unique_attrs(manager, static_types):
     AnotherThing = static_types['AnotherThing']
 
     manager.save(AnotherThing)
-    assert manager._conn.schema.get_indexed_property_keys('AnotherThing') == []
+    schema = manager._backend.conn.schema
+    assert schema.get_indexed_property_keys('AnotherThing') == []
 
     # create an instance
     AnotherThing(name='Foo')
@@ -667,6 +799,7 @@ def count(manager, type_):
     return count
 
 
+@pytest.mark.neo4j
 def test_save(manager, static_types):
     Thing = static_types['Thing']
 
@@ -684,6 +817,7 @@ def test_save_unknown_class(manager):
         manager.save(thing)
 
 
+@pytest.mark.neo4j
 def test_save_new(manager, static_types):
     Thing = static_types['Thing']
 
@@ -694,6 +828,7 @@ def test_save_new(manager, static_types):
     assert count(manager, Thing) == 2
 
 
+@pytest.mark.neo4j
 def test_save_replace(manager, static_types):
     Thing = static_types['Thing']
 
@@ -714,12 +849,13 @@ def test_save_update(manager, static_types):
     manager.save(obj)
 
     obj.str_attr = 'two'
-    manager.save(obj)
+    assert manager.save(obj) is obj
 
     retrieved = manager.get(Thing, id=obj.id)
     assert retrieved.str_attr == 'two'
 
 
+@pytest.mark.neo4j
 def test_persist_attributes(manager):
     """
     Verify persisted attributes maintain their type when added to the
@@ -760,6 +896,7 @@ def test_persist_attributes(manager):
     }
 
 
+@pytest.mark.neo4j
 def test_attribute_creation(manager, static_types):
     """
     Verify that attributes are added to the database when a type is added.
@@ -790,6 +927,7 @@ def test_attribute_creation(manager, static_types):
     }
 
 
+@pytest.mark.neo4j
 def test_attribute_inheritance(manager, beetroot_diamond):
     """
     Verify that attributes are created correctly according to type
@@ -856,6 +994,7 @@ def test_serialize_deserialize(manager):
     assert obj is Entity
 
 
+@pytest.mark.neo4j
 def test_changing_bases_does_not_create_duplicate_types(manager):
     with collector() as classes:
         class ShrubBaseA(Entity):
@@ -897,3 +1036,93 @@ def test_changing_bases_does_not_create_duplicate_types(manager):
         ('ShrubBaseB', 'IsA', 0, 'Entity'),
         ('SubShrub', 'IsA', 0, 'Shrub'),
     ]
+
+
+@pytest.mark.neo4j
+def test_save_collected_classes_single_statement(manager):
+    with collector() as classes:
+        class Plant(Entity):
+            id = Uuid(unique=True)
+
+        class Tree(Plant):
+            pass
+
+        class Shrub(Plant):
+            pass
+
+    with patch.object(
+        manager._backend, 'invalidate_types',
+        wraps=manager._backend.invalidate_types
+    ) as invalidate_types:
+        with patch.object(
+            manager, '_update_types', wraps=manager._update_types
+        ) as update_types:
+            manager.save_collected_classes(classes)
+
+    # the types are created and the type system invalidated in one request
+    assert update_types.call_count == 1
+    assert invalidate_types.call_count == 1
+
+    rows = manager.query(
+        ''' START base = node(*)
+            MATCH tpe -[r:ISA]-> base
+            RETURN tpe.id, base.id
+            ORDER BY tpe.id, base.id
+        ''')
+    assert list(rows) == [
+        ('Plant', 'Entity'),
+        ('Shrub', 'Plant'),
+        ('Tree', 'Plant'),
+    ]
+
+    # saving unchanged classes again doesn't touch the type system
+    with patch.object(manager, '_update_types') as update_types:
+        manager.save_collected_classes(classes)
+    assert not update_types.called
+
+
+@pytest.mark.neo4j
+def test_managers_share_connection(manager_factory):
+    manager1 = manager_factory(skip_setup=True)
+    manager2 = manager_factory(skip_setup=True)
+
+    assert manager1._backend.conn is manager2._backend.conn
+
+
+def test_set_socket_timeout():
+    with patch.object(http, 'socket_timeout', None):
+        set_socket_timeout(5)
+        assert http.socket_timeout == 5
+
+
+@pytest.mark.neo4j
+def test_custom_backend(manager_factory, request):
+    class RecordingBackend(Neo4jBackend):
+        def __init__(self, uri):
+            super(RecordingBackend, self).__init__(uri)
+            self.queries = []
+
+        def execute(self, query, params):
+            self.queries.append(query)
+            return super(RecordingBackend, self).execute(query, params)
+
+    backend = RecordingBackend(request.config.getoption('neo4j_uri'))
+    manager = manager_factory(backend=backend)
+
+    assert manager.query_single('RETURN 1') == 1
+    assert backend.queries[-1].endswith('RETURN 1')
+
+
+def test_managers_with_backend_dont_connect(manager_factory):
+    with patch('kaiso.persistence.get_connection') as get_connection:
+        manager_factory(skip_setup=True, backend=Mock(key='spam'))
+    assert not get_connection.called
+
+
+@pytest.mark.neo4j
+def test_batched_statements_use_cypher_2_0(manager):
+    with patch('kaiso.persistence.neo4j.WriteBatch') as write_batch:
+        manager._backend.submit([('RETURN 1', {})])
+
+    ((query,), _) = write_batch.return_value.append_cypher.call_args
+    assert query == 'CYPHER 2.0 RETURN 1'
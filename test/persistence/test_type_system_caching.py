@@ -1,10 +1,15 @@
+from collections import OrderedDict
+import threading
+import time
 import uuid
 
-from mock import patch
+from mock import Mock, patch
 from py2neo import cypher
 import pytest
 
 from kaiso.attributes import Uuid, String
+from kaiso.exceptions import UnknownType
+from kaiso.persistence import Manager, TypeSystemPoller
 from kaiso.queries import get_match_clause, join_lines
 from kaiso.relationships import Relationship, IsA
 from kaiso.types import Entity, collector, get_type_id
@@ -28,6 +33,7 @@ def static_types(manager):
     }
 
 
+@pytest.mark.neo4j
 def test_type_system_version(manager):
     forced_uuid = uuid.uuid4().hex
 
@@ -216,3 +222,388 @@ def test_cached_type_system_keeps_types_in_db(manager_factory):
 
     foo = Foo()
     manager2.save(foo)
+
+
+@pytest.mark.neo4j
+def test_warm_manager_setup_is_single_round_trip(manager_factory):
+    manager_factory(skip_setup=True).destroy()
+    manager_factory()  # creates constraints and caches the type registry
+
+    with patch('kaiso.persistence.neo4j.WriteBatch') as write_batch:
+        with patch(
+            'kaiso.persistence.cypher.execute', wraps=cypher.execute
+        ) as execute:
+            manager_factory()
+
+    assert not write_batch.called
+    assert execute.call_count == 1
+
+
+def test_destroy_recreates_constraints(manager_factory, connection):
+    manager_factory(skip_setup=True).destroy()
+    manager_factory()
+
+    schema = connection.schema
+    assert schema.get_indexed_property_keys('TypeSystem') == ['id']
+    assert schema.get_indexed_property_keys('PersistableType') == ['id']
+
+
+def test_type_cache_ttl(manager_factory, connection):
+    manager_factory(skip_setup=True).destroy()
+    manager_factory()  # warm the type registry cache
+
+    with patch(
+        'kaiso.persistence.cypher.execute', wraps=cypher.execute
+    ) as execute:
+        manager = manager_factory(type_cache_ttl=60)
+        manager.reload_types()
+    assert execute.call_count == 0
+
+    # bump the version as an external manager would
+    version = manager._get_type_registry_cache().version
+    cypher.execute(
+        connection,
+        'MATCH (ts:TypeSystem) SET ts.version = {version}',
+        {'version': uuid.uuid4().hex}
+    )
+
+    # within the ttl we don't see changes made by other processes ...
+    manager.reload_types()
+    assert manager._get_type_registry_cache().version == version
+
+    # ... unless we force a version check
+    manager.reload_types(force=True)
+    assert manager._get_type_registry_cache().version != version
+
+
+@pytest.mark.neo4j
+def test_expire_type_registry_cache(manager_factory):
+    manager_factory(skip_setup=True).destroy()
+    manager_factory()  # warm the type registry cache
+
+    manager = manager_factory(type_cache_ttl=60)
+    Manager.expire_type_registry_cache()
+
+    with patch(
+        'kaiso.persistence.cypher.execute', wraps=cypher.execute
+    ) as execute:
+        manager.reload_types()
+    assert execute.call_count == 1
+
+
+@pytest.mark.neo4j
+def test_type_system_poller(manager_factory, request):
+    manager_factory(skip_setup=True).destroy()
+    manager = manager_factory()
+
+    neo4j_uri = request.config.getoption('neo4j_uri')
+    changes = []
+    poller = TypeSystemPoller(neo4j_uri, interval=60, on_change=changes.append)
+
+    poller.poll()
+    assert changes == []
+
+    class Foo(Entity):
+        pass
+
+    manager.save(Foo)
+
+    poller.poll()
+    assert changes == [manager._type_system_version()]
+    cache = manager._get_type_registry_cache()
+    assert 'Foo' in cache.registry._types_in_db
+
+
+@pytest.fixture
+def dynamic_types(manager_factory):
+    manager_factory(skip_setup=True).destroy()
+    manager = manager_factory()
+
+    Animal = manager.create_type('Animal', (Entity,), {'id': String()})
+    Horse = manager.create_type('Horse', (Animal,), {})
+    Shrub = manager.create_type('Shrub', (Entity,), {})
+
+    manager.save(Horse)
+    manager.save(Shrub)
+
+    return {
+        'Animal': Animal,
+        'Horse': Horse,
+        'Shrub': Shrub,
+    }
+
+
+def test_new_type_system_starts_at_serial_zero(manager_factory):
+    manager_factory(skip_setup=True).destroy()
+    manager = manager_factory()
+
+    # so that the first type change can already be reloaded incrementally
+    _, serial = manager._type_system_state()
+    assert serial == 0
+
+
+def test_incremental_reload(manager_factory, dynamic_types):
+    manager2 = manager_factory()
+
+    # load independent classes for manager1, as another process would
+    caches = Manager._type_registry_caches
+    Manager._type_registry_caches = OrderedDict()
+    manager1 = manager_factory()
+    Manager._type_registry_caches = caches
+
+    registry = manager2.type_registry
+    Animal = registry.get_class_by_id('Animal')
+    Horse = registry.get_class_by_id('Horse')
+    Shrub = registry.get_class_by_id('Shrub')
+
+    Animal1 = manager1.type_registry.get_class_by_id('Animal')
+    Animal1.name = String()
+    manager1.save(Animal1)
+
+    with patch.object(Manager, 'get_type_hierarchy') as get_type_hierarchy:
+        manager2.reload_types()
+    assert not get_type_hierarchy.called
+
+    registry = manager2.type_registry
+
+    # unchanged types are reused
+    assert registry.get_class_by_id('Shrub') is Shrub
+
+    # changed types and their subtypes are recreated
+    NewAnimal = registry.get_class_by_id('Animal')
+    NewHorse = registry.get_class_by_id('Horse')
+    assert NewAnimal is not Animal
+    assert 'name' in registry.get_descriptor(NewAnimal).declared_attributes
+    assert NewHorse is not Horse
+    assert NewHorse.__bases__ == (NewAnimal,)
+
+
+def test_incremental_reload_deleted_type(manager_factory, dynamic_types):
+    manager1 = manager_factory()
+    manager2 = manager_factory()
+
+    Shrub = manager1.type_registry.get_class_by_id('Shrub')
+    manager1.delete(Shrub)
+
+    with patch.object(Manager, 'get_type_hierarchy') as get_type_hierarchy:
+        manager2.reload_types()
+    assert not get_type_hierarchy.called
+
+    registry = manager2.type_registry
+    assert 'Shrub' not in registry._types_in_db
+    with pytest.raises(UnknownType):
+        registry.get_class_by_id('Shrub')
+
+
+@pytest.mark.neo4j
+def test_unstamped_invalidation_reloads_all_types(
+        manager_factory, dynamic_types, connection):
+    manager1 = manager_factory()
+
+    # change a type as a migration would, without stamping it
+    query = join_lines(
+        'MATCH (type:PersistableType {id: "Shrub"})',
+        'SET type.colour = {colour}',
+    )
+    cypher.execute(connection, query, {'colour': 'green'})
+    manager1.invalidate_type_system()
+
+    manager2 = manager_factory()
+    Shrub = manager2.type_registry.get_class_by_id('Shrub')
+    assert Shrub.colour == 'green'
+
+
+def test_unstamped_type_change_reloads_all_types(
+        manager_factory, dynamic_types):
+    manager1 = manager_factory()
+
+    manager1._backend.update_type('Shrub', {'colour': 'green'}, [])
+    manager1.invalidate_type_system()
+
+    manager2 = manager_factory()
+    Shrub = manager2.type_registry.get_class_by_id('Shrub')
+    assert Shrub.colour == 'green'
+
+
+def test_save_unchanged_type_skips_diff(manager, static_types):
+    Thing = static_types['Thing']
+    version = manager._type_system_version()
+
+    with patch.object(Manager, '_get_changes') as get_changes:
+        manager.save(Thing)
+    assert not get_changes.called
+    assert manager._type_system_version() == version
+
+    Thing.cls_attr = "changed"
+    manager.save(Thing)
+    assert manager._type_system_version() != version
+
+    manager.reload_types()
+    descriptor = manager.type_registry.get_descriptor(Thing)
+    assert descriptor.class_attributes['cls_attr'] == "changed"
+
+
+@pytest.mark.neo4j
+def test_save_unchanged_type_stores_missing_fingerprint(
+        manager, static_types):
+    Thing = static_types['Thing']
+
+    # e.g. a type saved before fingerprints were stored
+    manager.query(
+        'MATCH (type:PersistableType {id: "Thing"}) '
+        'REMOVE type.__fingerprint__')
+    version = manager._type_system_version()
+
+    manager.save(Thing)
+    assert manager._type_system_version() == version
+
+    with patch.object(Manager, '_get_changes') as get_changes:
+        manager.save(Thing)
+    assert not get_changes.called
+
+
+@pytest.mark.neo4j
+def test_type_fingerprint_reset_on_hierarchy_change(
+        manager, dynamic_types):
+    def get_fingerprints():
+        rows = manager.query(
+            'MATCH (type:PersistableType) '
+            'RETURN type.id, type.__fingerprint__')
+        return dict(rows)
+
+    fingerprints = get_fingerprints()
+    assert fingerprints['Horse'] is not None
+    assert fingerprints['Shrub'] is not None
+
+    Animal = manager.type_registry.get_class_by_id('Animal')
+    manager.delete(Animal)
+
+    # subtypes of the deleted type must be saved again
+    fingerprints = get_fingerprints()
+    assert fingerprints['Horse'] is None
+    assert fingerprints['Shrub'] is not None
+
+
+@pytest.mark.neo4j
+def test_type_changes_invalidate_in_same_request(manager_factory,
+                                                 dynamic_types):
+    # dynamic_types destroys the database, so the manager has to be
+    # created after it
+    manager = manager_factory()
+    registry = manager.type_registry
+    Horse = registry.get_class_by_id('Horse')
+    Shrub = registry.get_class_by_id('Shrub')
+
+    version = manager._type_system_version()
+
+    isa = IsA(Horse, Shrub)
+    isa.base_index = 1
+
+    with patch.object(manager, 'invalidate_type_system') as invalidate:
+        manager.save(isa)
+
+    assert not invalidate.called
+    assert manager._type_system_version() != version
+
+    # the changed types are stamped in the same transaction
+    rows = manager.query(
+        'MATCH (type:PersistableType), (ts:TypeSystem) '
+        'WHERE type.__changed__ = ts.serial '
+        'RETURN type.id ORDER BY type.id')
+    assert list(rows) == [('Horse',), ('Shrub',)]
+
+
+def test_type_registry_cache_per_database(manager_factory):
+    manager_factory(skip_setup=True).destroy()
+    manager = manager_factory()
+    cache = manager._get_type_registry_cache()
+
+    # a manager for another database doesn't replace the cached registry
+    other = manager_factory(
+        skip_setup=True,
+        backend=Mock(key='http://other.example.com:7474/db/data/'))
+    other._set_type_registry_cache(cache._replace(version='other'))
+
+    assert manager._get_type_registry_cache() is cache
+    assert other._get_type_registry_cache().version == 'other'
+
+
+def test_type_registry_cache_size(manager_factory):
+    manager_factory(skip_setup=True).destroy()
+    manager = manager_factory()
+    cache = manager._get_type_registry_cache()
+
+    others = []
+    with patch.object(Manager, 'type_registry_cache_size', 2):
+        for index in range(2):
+            other = manager_factory(
+                skip_setup=True,
+                backend=Mock(key='http://other{}:7474/'.format(index)))
+            other._set_type_registry_cache(cache)
+            others.append(other)
+
+    # the least recently used entry was evicted
+    assert manager._get_type_registry_cache() is None
+    assert others[0]._get_type_registry_cache() is cache
+    assert others[1]._get_type_registry_cache() is cache
+
+
+def test_concurrent_reloads_hit_database_once(manager_factory, connection):
+    manager_factory(skip_setup=True).destroy()
+    managers = [manager_factory() for _ in range(4)]
+
+    # bump the version as an external manager would
+    cypher.execute(
+        connection,
+        'MATCH (ts:TypeSystem) SET ts.version = {version}',
+        {'version': uuid.uuid4().hex}
+    )
+
+    get_type_hierarchy = Manager.get_type_hierarchy
+
+    def slow_get_type_hierarchy(self, *args, **kwargs):
+        # make sure all threads ask for a reload before this one finishes
+        time.sleep(0.2)
+        return get_type_hierarchy(self, *args, **kwargs)
+
+    with patch.object(
+        Manager, 'get_type_hierarchy', autospec=True,
+        side_effect=slow_get_type_hierarchy,
+    ) as patched:
+        threads = [
+            threading.Thread(target=manager.reload_types)
+            for manager in managers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert patched.call_count == 1
+
+    versions = set(
+        manager._get_type_registry_cache().version for manager in managers)
+    assert versions == set([managers[0]._type_system_version()])
+
+
+def test_waiting_reload_ignores_stale_registry(manager_factory):
+    manager_factory(skip_setup=True).destroy()
+    manager = manager_factory()
+    cache = manager._get_type_registry_cache()
+    version, serial = manager._type_system_state()
+
+    # while waiting for the lock, another thread cached a registry for a
+    # version other than the one this thread needs
+    stale = cache._replace(version=uuid.uuid4().hex)
+
+    with patch.object(
+        manager, '_get_type_registry_cache', side_effect=[None, stale]
+    ):
+        with patch.object(
+            manager, 'get_type_hierarchy',
+            wraps=manager.get_type_hierarchy,
+        ) as get_type_hierarchy:
+            manager._load_types(version, serial)
+
+    assert get_type_hierarchy.call_count == 1
+    assert manager._get_type_registry_cache().version == version
@@ -1,7 +1,10 @@
+import pytest
+
 from kaiso.attributes import String, Choice
 from kaiso.types import Entity
 
 
+@pytest.mark.neo4j
 def test_get_create_types_query(manager):
 
     attrs = {
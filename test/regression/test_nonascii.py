@@ -1,6 +1,8 @@
 # coding: utf-8
+import pytest
 
 
+@pytest.mark.neo4j
 def test_nonascii(manager):
     assert manager.query(
         "START n=node(*) WHERE n.foo = {foo} RETURN n",
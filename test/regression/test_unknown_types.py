@@ -7,6 +7,7 @@ from kaiso.types import Entity
 fixture = pytest.mark.usefixtures('storage')
 
 
+@pytest.mark.neo4j
 def test_skip_setup(manager, manager_factory):
     # Type loading will fail if the database contains references to an unknown
     # attribute or base (i.e. __type__ refers to a class not known by Python).
@@ -5,6 +5,7 @@ from kaiso.exceptions import UnknownType
 from kaiso.types import Entity
 
 
+@pytest.mark.neo4j
 def test_static_types_can_be_augmented(manager):
     # make sure static-type Entity is in the graph
     manager.save(Entity)
@@ -49,6 +50,7 @@ def test_static_types_can_be_augmented(manager):
     assert loaded2.foo == 'foo'
 
 
+@pytest.mark.neo4j
 def test_save_dynamic_type(manager):
 
     attrs = {'id': String(unique=True)}
@@ -62,6 +64,7 @@ def test_save_dynamic_type(manager):
     assert result is Foobar
 
 
+@pytest.mark.neo4j
 def test_save_dynamic_typed_obj(manager):
 
     attrs = {'id': String(unique=True)}
@@ -77,6 +80,7 @@ def test_save_dynamic_typed_obj(manager):
     assert result.id == foo.id
 
 
+@pytest.mark.neo4j
 def test_add_attr_to_type(manager):
     Foobar = manager.create_type('Foobar', (Entity,), {})
     manager.save(Foobar)
@@ -95,6 +99,7 @@ def test_add_attr_to_type(manager):
     assert count == 1
 
 
+@pytest.mark.neo4j
 def test_remove_attr_from_type(manager):
     attrs = {'ham': String()}
     Foobar = manager.create_type('Foobar', (Entity,), attrs)
@@ -115,6 +120,7 @@ def test_remove_attr_from_type(manager):
     assert count == 0
 
 
+@pytest.mark.neo4j
 def test_removing_attr_from_declared_type_does_not_remove_it(manager):
 
     # the use case:
@@ -147,6 +153,7 @@ def test_removing_attr_from_declared_type_does_not_remove_it(manager):
     assert count == 2
 
 
+@pytest.mark.neo4j
 def test_load_dynamic_types(manager):
     Animal = manager.create_type('Animal', (Entity,), {'id': String()})
     Horse = manager.create_type('Horse', (Animal,), {'hoof': String()})
@@ -190,6 +197,7 @@ def test_load_dynamic_types(manager):
     ]
 
 
+@pytest.mark.neo4j
 def test_add_attr_to_type_via_2nd_manager(manager):
     attrs = {'id': String(unique=True)}
     Shrub = manager.create_type('Shrub', (Entity,), attrs)
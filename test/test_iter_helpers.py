@@ -0,0 +1,7 @@
+from kaiso.iter_helpers import chunks
+
+
+def test_chunks():
+    assert list(chunks(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(chunks(range(4), 2)) == [[0, 1], [2, 3]]
+    assert list(chunks([], 2)) == []
@@ -0,0 +1,338 @@
+import pytest
+
+from kaiso.attributes import Uuid, String, Incoming, Outgoing
+from kaiso.exceptions import CannotUpdateType, NoResultFound
+from kaiso.memory_backend import InMemoryBackend
+from kaiso.persistence import Manager
+from kaiso.relationships import IsA, Relationship
+from kaiso.types import Entity
+
+
+@pytest.fixture
+def backend():
+    return InMemoryBackend()
+
+
+@pytest.fixture
+def manager(backend):
+    return Manager(None, backend=backend)
+
+
+@pytest.fixture
+def static_types(manager):
+    class Contains(Relationship):
+        label = String()
+
+    class Box(Entity):
+        id = Uuid(unique=True)
+        name = String()
+
+        contains = Outgoing(Contains)
+        contained_within = Incoming(Contains)
+
+    class SmallBox(Box):
+        pass
+
+    manager.save(Box)
+    manager.save(SmallBox)
+    manager.save(Contains)
+
+    return {
+        'Box': Box,
+        'SmallBox': SmallBox,
+        'Contains': Contains,
+    }
+
+
+def test_save_and_get(manager, static_types):
+    Box = static_types['Box']
+    SmallBox = static_types['SmallBox']
+
+    box = SmallBox(name='spam')
+    manager.save(box)
+
+    loaded = manager.get(Box, id=box.id)
+    assert type(loaded) is SmallBox
+    assert loaded.name == 'spam'
+
+    box.name = 'ham'
+    manager.save(box)
+    assert manager.get(Box, id=box.id).name == 'ham'
+
+    box.name = None
+    manager.save(box)
+    assert manager.get(Box, id=box.id).name is None
+
+    assert manager.get(Box, id=Box().id) is None
+
+
+def test_get_by_unique_attr(manager, static_types):
+    Box = static_types['Box']
+
+    boxes = [Box() for _ in range(3)]
+    for box in boxes:
+        manager.save(box)
+
+    ids = [box.id for box in boxes] + [Box().id]
+    loaded = list(manager.get_by_unique_attr(Box, 'id', ids, chunk_size=2))
+    assert [box.id for box in loaded[:3]] == ids[:3]
+    assert loaded[3] is None
+
+
+def test_relationships(manager, static_types):
+    Box = static_types['Box']
+    Contains = static_types['Contains']
+
+    box1 = Box()
+    box2 = Box()
+    manager.save(box1)
+    manager.save(box2)
+
+    contains = Contains(box1, box2, label='spam')
+    manager.save(contains)
+
+    assert [box.id for box in box1.contains] == [box2.id]
+    assert box2.contained_within.one().id == box1.id
+    (rel,) = box1.contains.relationships
+    assert rel.label == 'spam'
+    assert rel.start.id == box1.id
+    assert rel.end.id == box2.id
+
+    contains.label = 'ham'
+    manager.save(contains)
+    assert box1.contains.relationships.next().label == 'ham'
+
+    assert manager.delete(contains) == (0, 1)
+    assert list(box1.contains) == []
+
+
+def test_delete_instance(manager, static_types):
+    Box = static_types['Box']
+
+    box = Box()
+    manager.save(box)
+
+    assert manager.delete(box) == (1, 1)
+    assert manager.get(Box, id=box.id) is None
+
+
+def test_dynamic_types(backend, manager, static_types):
+    Box = static_types['Box']
+
+    Crate = manager.create_type('Crate', (Box,), {'size': String()})
+    manager.save(Crate)
+    crate = Crate(size='large')
+    manager.save(crate)
+
+    # a manager sharing the backend picks up the new type
+    other = Manager(None, backend=backend)
+    loaded = other.get(Box, id=crate.id)
+    assert type(loaded).__name__ == 'Crate'
+    assert loaded.size == 'large'
+
+    manager.delete(Crate)
+    other.reload_types()
+    assert 'Crate' not in [
+        type_id for type_id, _, _ in other.get_type_hierarchy()]
+
+
+def test_backends_are_separate(manager, static_types):
+    Box = static_types['Box']
+
+    box = Box()
+    manager.save(box)
+
+    other = Manager(None, backend=InMemoryBackend())
+    assert other._get_type_registry_cache_key() != (
+        manager._get_type_registry_cache_key())
+    assert 'Box' not in [
+        type_id for type_id, _, _ in other.get_type_hierarchy()]
+
+
+def test_cypher_queries_are_not_supported(manager):
+    with pytest.raises(NotImplementedError):
+        list(manager.query('MATCH (n) RETURN n'))
+
+
+def test_destroy(manager, static_types):
+    Box = static_types['Box']
+
+    manager.save(Box())
+    manager.destroy()
+
+    manager = Manager(None, backend=manager._backend)
+    assert list(manager.get_type_hierarchy()) == []
+
+
+def test_delete_instance_with_relationship_to_itself(manager, static_types):
+    Box = static_types['Box']
+    Contains = static_types['Contains']
+
+    box = Box()
+    manager.save(box)
+    manager.save(Contains(box, box))
+
+    # the relationship to itself is counted once, like its INSTANCEOF one
+    assert manager.delete(box) == (1, 2)
+
+
+def test_bulk_operations(manager, static_types):
+    Box = static_types['Box']
+    SmallBox = static_types['SmallBox']
+    Contains = static_types['Contains']
+
+    boxes = [Box(name='spam'), Box(name='ham'), SmallBox(name='spam')]
+    for box in boxes:
+        manager.save(box)
+
+    assert manager.create_relationships([
+        Contains(boxes[0], boxes[1]),
+        Contains(boxes[0], Box()),
+    ], chunk_size=1) == [True, False]
+
+    assert manager.update_where(
+        Box, {'name': 'spam'}, chunk_size=1, name='eggs') == 2
+    assert manager.update_where(Box, {'name': 'spam'}, name='eggs') == 0
+    assert manager.get(Box, id=boxes[2].id).name == 'eggs'
+
+    # two INSTANCEOF relationships and the Contains one
+    assert manager.delete_where(Box, name='eggs') == (2, 3)
+    assert manager.delete_many([boxes[1], Box()]) == (1, 1)
+    assert manager.get(Box, id=boxes[1].id) is None
+
+
+def test_change_instance_types(manager, static_types):
+    Box = static_types['Box']
+    SmallBox = static_types['SmallBox']
+
+    box = Box(name='spam')
+    manager.save(box)
+
+    changed = manager.change_instance_type(box, 'SmallBox')
+    assert type(changed) is SmallBox
+    assert type(manager.get(Box, id=box.id)) is SmallBox
+
+    assert manager.change_instance_types([box], 'Box') == 1
+    assert type(manager.get(Box, id=box.id)) is Box
+
+    assert manager.change_instance_type_where(
+        Box, 'SmallBox', updated_values={'name': 'ham'}, name='spam') == 1
+    loaded = manager.get(Box, id=box.id)
+    assert type(loaded) is SmallBox
+    assert loaded.name == 'ham'
+
+
+def test_update_type_and_ancestor_labels(backend, manager, static_types):
+    Box = static_types['Box']
+
+    Crate = manager.create_type('Crate', (Box,), {})
+    Barrel = manager.create_type('Barrel', (Box,), {})
+    manager.save(Crate)
+    manager.save(Barrel)
+    crate = Crate()
+    manager.save(crate)
+
+    assert manager.add_ancestor_labels(Box) == 1
+    crate_id = manager.serialize(crate, for_db=True)['id']
+    assert backend.get_node((('Box', 'Crate'), {'id': crate_id})) is not None
+
+    manager.update_type(Crate, (Barrel,))
+    other = Manager(None, backend=backend)
+    assert other.type_registry.get_class_by_id('Crate').__bases__ == (
+        other.type_registry.get_class_by_id('Barrel'),)
+
+
+def test_type_hierarchy_from_start_type(manager, static_types):
+    hierarchy = manager.get_type_hierarchy(start_type_id='Box')
+    assert [type_id for type_id, _, _ in hierarchy] == ['Box', 'SmallBox']
+
+    assert list(manager.get_type_hierarchy(start_type_id='Spam')) == []
+
+
+def test_type_hierarchy_relationships(backend, manager, static_types):
+    Box = static_types['Box']
+
+    Crate = manager.create_type('Crate', (Box,), {})
+    Barrel = manager.create_type('Barrel', (Entity,), {})
+    manager.save(Crate)
+    manager.save(Barrel)
+
+    isa = IsA(Crate, Barrel)
+    isa.base_index = 1
+    manager.save(isa)
+
+    other = Manager(None, backend=backend)
+    OtherCrate = other.type_registry.get_class_by_id('Crate')
+    assert [base.__name__ for base in OtherCrate.__bases__] == [
+        'Box', 'Barrel']
+
+    assert manager.delete(isa) == (0, 1)
+    other.reload_types()
+    OtherCrate = other.type_registry.get_class_by_id('Crate')
+    assert [base.__name__ for base in OtherCrate.__bases__] == ['Box']
+
+
+def test_update_where_removes_attributes(manager, static_types):
+    Box = static_types['Box']
+
+    box = Box(name='spam')
+    manager.save(box)
+
+    assert manager.update_where(Box, {}, name=None) == 1
+    assert manager.update_where(Box, {}, name=None) == 0
+    assert manager.get(Box, id=box.id).name is None
+
+    with pytest.raises(ValueError):
+        manager.update_where(Box, {'spam': 'ham'}, name='eggs')
+
+
+def test_ancestor_labels(backend, static_types):
+    Box = static_types['Box']
+    SmallBox = static_types['SmallBox']
+
+    manager = Manager(None, backend=backend, ancestor_labels=True)
+    box = SmallBox(name='spam')
+    manager.save(box)
+
+    assert manager.update_where(Box, {'name': 'spam'}, name='ham') == 1
+    assert manager.delete_where(Box, name='ham') == (1, 1)
+
+
+def test_change_instance_type_attributes(manager, static_types):
+    Box = static_types['Box']
+
+    Crate = manager.create_type('Crate', (Entity,), {
+        'id': Uuid(unique=True),
+        'size': String(default='large'),
+    })
+    manager.save(Crate)
+
+    box = Box(name='spam')
+    manager.save(box)
+
+    assert manager.change_instance_types([box], 'Crate') == 1
+    crate = manager.get(Crate, id=box.id)
+    assert crate.size == 'large'
+    assert not hasattr(crate, 'name')
+
+
+def test_missing_nodes(manager, static_types):
+    Box = static_types['Box']
+
+    with pytest.raises(NoResultFound):
+        manager.change_instance_type(Box(), 'SmallBox')
+    assert manager.change_instance_types([Box()], 'SmallBox') == 0
+
+    Crate = manager.create_type('Crate', (Box,), {})
+    Barrel = manager.create_type('Barrel', (Box,), {})
+    manager.save(Crate)
+    with pytest.raises(CannotUpdateType):
+        manager.update_type(Crate, (Barrel,))
+
+    assert manager.delete(Box()) == (0, 0)
+
+
+def test_missing_type_system(backend):
+    manager = Manager(None, backend=backend, skip_setup=True)
+    with pytest.raises(NoResultFound):
+        manager.reload_types()
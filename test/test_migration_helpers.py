@@ -1,4 +1,5 @@
 import pytest
+from mock import patch
 
 from kaiso.exceptions import UnknownType
 from kaiso.migration_helpers import get_type_registry_with_base_change
@@ -238,3 +239,58 @@ def test_class_attrs(manager):
         'cls_attr_B': 'B',
         'cls_attr_C': 'C'
     }
+
+
+def test_only_recreates_amended_type_and_subclasses(manager):
+    with collector() as collected:
+        class A(Entity):
+            pass
+
+        class B(Entity):
+            pass
+
+        class C(A):
+            pass
+
+        class D(C):
+            pass
+
+    manager.save_collected_classes(collected)
+
+    with patch.object(manager, 'get_type_hierarchy') as get_type_hierarchy:
+        amended_registry = get_type_registry_with_base_change(
+            manager, 'C', ('B',))
+
+    assert not get_type_hierarchy.called
+
+    registry = manager.type_registry
+    for type_id in ['A', 'B']:
+        assert (
+            amended_registry.get_class_by_id(type_id) is
+            registry.get_class_by_id(type_id)
+        )
+
+    AmendedD = amended_registry.get_class_by_id('D')
+    assert [c.__name__ for c in AmendedD.mro()] == [
+        'D', 'C', 'B', 'Entity', 'AttributedBase', 'Persistable', 'object'
+    ]
+
+
+def test_reloads_types_within_cache_ttl(manager):
+    with collector() as collected:
+        class A(Entity):
+            pass
+
+        class B(Entity):
+            pass
+
+    manager.save_collected_classes(collected)
+
+    # the cached type registry may be out of date within the ttl
+    manager.type_cache_ttl = 60
+    with patch.object(
+        manager, 'reload_types', wraps=manager.reload_types
+    ) as reload_types:
+        get_type_registry_with_base_change(manager, 'B', ('A',))
+
+    reload_types.assert_called_once_with(force=True)
@@ -8,7 +8,10 @@ import pytest
 
 from kaiso.attributes import String
 from kaiso.exceptions import NoUniqueAttributeError
-from kaiso.queries import get_match_clause, parameter_map, inline_parameter_map
+from kaiso.queries import (
+    get_create_types_query, get_instances_match_clause,
+    get_lookup_match_clause, get_match_clause, get_node_lookup,
+    parameter_map, inline_parameter_map)
 from kaiso.types import Entity, Relationship, TypeRegistry
 
 
@@ -119,3 +122,93 @@ def test_get_match_clause_for_relationship_non_unique_endpoint(cls):
     with pytest.raises(NoUniqueAttributeError) as exc:
         get_match_clause(rel, 'rel', type_registry)
     assert "doesn't have any unique attributes" in str(exc)
+
+
+def test_get_node_lookup():
+    assert get_node_lookup(IndexableThing, type_registry) == (
+        ('PersistableType',), {'id': 'IndexableThing'})
+
+    obj = TwoUniquesThing(indexable_attr='bar', also_unique='baz')
+    assert get_node_lookup(obj, type_registry) == (
+        ('IndexableThing', 'TwoUniquesThing'),
+        {'indexable_attr': 'bar', 'also_unique': 'baz'},
+    )
+
+
+def test_get_node_lookup_no_uniques():
+    with pytest.raises(NoUniqueAttributeError):
+        get_node_lookup(NotIndexable(), type_registry)
+
+    rel = Connects(start=IndexableThing(indexable_attr='a'))
+    with pytest.raises(NoUniqueAttributeError):
+        get_node_lookup(rel, type_registry)
+
+
+def test_get_lookup_match_clause():
+    lookup = (
+        ('IndexableThing', 'TwoUniquesThing'),
+        {'indexable_attr': 'bar', 'also_unique': 'baz'},
+    )
+    clause, params = get_lookup_match_clause(lookup, 'n')
+
+    assert clause == (
+        '(n:IndexableThing:TwoUniquesThing '
+        '{also_unique: {n__also_unique}, indexable_attr: {n__indexable_attr}})'
+    )
+    assert params == {
+        'n__indexable_attr': 'bar',
+        'n__also_unique': 'baz',
+    }
+
+
+def test_get_instances_match_clause():
+    clause, params = get_instances_match_clause(
+        IndexableThing, 'n', {'indexable_attr': 'bar'})
+
+    assert clause == dedent("""
+        MATCH (n__type:PersistableType {id: {n__type_id}})
+            <-[:ISA*0..]- () <-[:INSTANCEOF]- (n)
+        WHERE n.indexable_attr = {n__indexable_attr}
+    """).strip()
+    assert params == {
+        'n__type_id': 'IndexableThing',
+        'n__indexable_attr': 'bar',
+    }
+
+
+def test_get_instances_match_clause_unknown_attr():
+    with pytest.raises(ValueError) as exc:
+        get_instances_match_clause(IndexableThing, 'n', {'foo': 'bar'})
+    assert "has no attribute" in str(exc)
+
+
+def test_get_instances_match_clause_ancestor_labels():
+    clause, params = get_instances_match_clause(
+        IndexableThing, 'n', {'indexable_attr': 'bar'},
+        ancestor_labels=True)
+
+    assert clause == dedent("""
+        MATCH (n:`IndexableThing`)
+        WHERE n.indexable_attr = {n__indexable_attr}
+    """).strip()
+    assert params == {
+        'n__indexable_attr': 'bar',
+    }
+
+
+def test_get_create_types_query_refreshed_type():
+    registry = TypeRegistry()
+    Foo = registry.create_type(
+        str('Foo'), (Entity,), {'id': String(unique=True)})
+
+    query, _, args = get_create_types_query(Foo, 'ts1', registry)
+
+    Foo.extra = String()
+    registry.refresh_type(Foo)
+
+    changed_query, _, changed_args = get_create_types_query(
+        Foo, 'ts1', registry)
+
+    assert changed_query != query
+    assert 'Foo_extra__name' in changed_args
+    assert 'Foo_extra__name' not in args
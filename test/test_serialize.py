@@ -261,3 +261,27 @@ def test_IsA_and_InstanceOf_type_relationships(temporary_static_types):
         (Foo, (InstanceOf, 0), PersistableType),
         (foo, (InstanceOf, 0), Foo),
     ]
+
+
+def test_get_type_relationships_memoized(type_registry):
+    class Foo(Entity):
+        pass
+
+    class Bar(Entity):
+        pass
+
+    type_registry.register(Foo)
+
+    result = get_type_relationships(Foo)
+    assert isinstance(result, tuple)
+    assert get_type_relationships(Foo) is result
+
+    # changing the bases invalidates the memoized relationships
+    Foo.__bases__ = (Bar,)
+    result = get_type_relationships(Foo)
+    assert (Foo, (IsA, 0), Bar) in result
+    assert get_type_relationships(Foo) is result
+
+    type_registry.refresh_type(Foo)
+    assert get_type_relationships(Foo) is not result
+    assert get_type_relationships(Foo) == result
@@ -160,3 +160,23 @@ def test_get_labels_for_type_includes_unique(type_registry, static_types):
     QuuType = type_registry.create_type("QuuType", (BarType,), {})
     labels = set(type_registry.get_labels_for_type(QuuType))
     assert labels == set(['BarType'])
+
+
+def test_type_closures(type_registry, static_types):
+    AType = static_types['AType']
+    BType = static_types['BType']
+
+    assert type_registry.get_ancestor_ids(BType) == frozenset([
+        'BType', 'AType', 'Entity', 'AttributedBase'])
+    assert type_registry.get_descendant_ids(AType) == frozenset([
+        'AType', 'BType'])
+
+    CType = type_registry.create_type("CType", (BType,), {})
+    assert type_registry.get_ancestor_ids(CType) == frozenset([
+        'CType', 'BType', 'AType', 'Entity', 'AttributedBase'])
+    assert type_registry.get_descendant_ids(AType) == frozenset([
+        'AType', 'BType', 'CType'])
+
+    type_registry.unregister('CType')
+    assert type_registry.get_descendant_ids(AType) == frozenset([
+        'AType', 'BType'])
@@ -1,4 +1,6 @@
-from kaiso.utils import dict_difference
+import pytest
+
+from kaiso.utils import dict_difference, sort_type_hierarchy
 
 
 def test_dict_difference():
@@ -22,3 +24,20 @@ def test_dict_difference():
     e = {1: "2"}
 
     assert dict_difference(d, e) == d
+
+
+def test_sort_type_hierarchy():
+    hierarchy = [
+        ('C', ('B', 'A'), None),
+        ('B', ('A', 'Unknown'), None),
+        ('A', (), None),
+        ('D', ('A',), None),
+    ]
+
+    assert [type_id for type_id, _, _ in sort_type_hierarchy(hierarchy)] == [
+        'A', 'B', 'D', 'C']
+
+
+def test_sort_type_hierarchy_cycle():
+    with pytest.raises(ValueError):
+        sort_type_hierarchy([('A', ('B',), None), ('B', ('A',), None)])